@@ -5,7 +5,7 @@ from setuptools_rust import Binding, RustExtension
 
 setup(
     name="babygiant-lib",
-    version="1.0",
+    version="1.1",
     author='Samuel Steffen, SRI Lab ETH Zurich',
     rust_extensions=[RustExtension("babygiant.babygiant", binding=Binding.RustCPython)],
     packages=["babygiant"],
@@ -1,93 +1,271 @@
 extern crate cpython;
 
-use cpython::{PyResult, Python, py_module_initializer, py_fn};
+use cpython::{PyErr, PyResult, Python, py_module_initializer, py_fn, exc};
 
 py_module_initializer!(babygiant, |py, m| {
     m.add(py, "__doc__", "This module is implemented in Rust.")?;
     m.add(py, "compute_dlog", py_fn!(py, compute_dlog(x: &str, y: &str)))?;
+    m.add(py, "compute_dlog_batch", py_fn!(py, compute_dlog_batch(points: Vec<(String, String)>, dlog_bits: u32, table_bits: u32, table_file: &str)))?;
+    m.add(py, "generate_table", py_fn!(py, generate_table(table_bits: u32, table_file: &str)))?;
     Ok(())
 });
 
+mod table;
+
 use ark_ed_on_bn254::{EdwardsAffine as BabyJubJub, Fr, Fq, EdwardsParameters};
 use ark_ff::{BigInteger256, field_new, PrimeField, BigInteger};
 use ark_ec::{AffineCurve, ProjectiveCurve};
 use ark_ec::twisted_edwards_extended::{GroupProjective, GroupAffine};
 use hex;
 
-use std::collections::HashMap;
+use std::cmp::min;
+use std::path::Path;
+use std::sync::{Arc, Mutex};
+use std::thread;
+
+use table::{FingerprintTable, MAX_TABLE_BITS};
+
+const DEFAULT_DLOG_BITS: u32 = 32;
+const DEFAULT_TABLE_BITS: u32 = 16;
+const MAX_DLOG_BITS: u32 = 63;
+
+// Number of points which are converted to affine coordinates using a single field inversion
+const MAX_NORMALIZATION_BATCH: u64 = 1024;
+
+struct BabyStepTable {
+    table_file: String,
+    baby_steps: FingerprintTable,
+    giant_step: GroupProjective<EdwardsParameters>,
+}
+
+// Baby-step tables are independent of the value whose discrete log is computed,
+// so they are built (or memory-mapped) only once per process and shared by all calls
+static TABLES: Mutex<Vec<Arc<BabyStepTable>>> = Mutex::new(Vec::new());
+
+fn generator() -> GroupAffine<EdwardsParameters> {
+    let gx = field_new!(Fq, "11904062828411472290643689191857696496057424932476499415469791423656658550213");
+    let gy = field_new!(Fq, "9356450144216313082194365820021861619676443907964402770398322487858544118183");
+    BabyJubJub::new(gx, gy)
+}
+
+fn scalar(v: u64) -> Fr {
+    Fr::new(BigInteger256::from(v))
+}
+
+// NOTE: equality and hashing does not perform as expected for projective representation
+// (because coordinates are ambiguous), so the table is keyed by the affine x coordinate
+fn fingerprint(p: &GroupAffine<EdwardsParameters>) -> u64 {
+    p.x.into_repr().0[0]
+}
 
-fn baby_giant(max_bitwidth: u64, a: &GroupAffine<EdwardsParameters>, b: &GroupProjective<EdwardsParameters>) -> u64 {
-    let m = 1u64 << (max_bitwidth / 2);
+impl BabyStepTable {
+    fn new(table_bits: u32) -> BabyStepTable {
+        let g = generator();
+        let m = 1u64 << table_bits;
 
-    let mut table = HashMap::new();
-    for j in 0u64..m {
-        // NOTE: equality and hashing (used for HashMap) does not perform as expected
-        // for projective representation (because coordinates are ambiguous), so switching
-        // to affine coordinates here
-        let v = a.mul(Fr::new(BigInteger256::from(j))).into_affine();
-        table.insert(v, j);
+        let mut baby_steps = FingerprintTable::with_table_bits(table_bits);
+        let mut v = g.mul(scalar(0));
+        let mut j = 0u64;
+        while j < m {
+            let n = min(MAX_NORMALIZATION_BATCH, m - j);
+            let mut batch = Vec::with_capacity(n as usize);
+            for _ in 0..n {
+                batch.push(v);
+                v.add_assign_mixed(&g);
+            }
+            for (k, p) in GroupProjective::<EdwardsParameters>::batch_normalization_into_affine(&batch).iter().enumerate() {
+                baby_steps.insert(fingerprint(p), (j + k as u64) as u32);
+            }
+            j += n;
+        }
+        BabyStepTable::from_baby_steps(baby_steps, String::new())
     }
-    let am = a.mul(Fr::new(BigInteger256::from(m)));
-    let mut gamma = b.clone();
 
-    for i in 0u64..m {
-        if let Some(j) = table.get(&gamma.into_affine()) {
-            return i*m + j;
+    fn from_baby_steps(baby_steps: FingerprintTable, table_file: String) -> BabyStepTable {
+        let giant_step = generator().mul(scalar(1u64 << baby_steps.table_bits()));
+        BabyStepTable { table_file, baby_steps, giant_step }
+    }
+
+    /// Return the table with 2^table_bits entries, table_file is memory-mapped if not empty.
+    fn get(table_bits: u32, table_file: &str) -> Result<Arc<BabyStepTable>, String> {
+        if table_bits > MAX_TABLE_BITS {
+            return Err(format!("table_bits must be at most {}", MAX_TABLE_BITS));
+        }
+
+        let mut tables = TABLES.lock().unwrap_or_else(|e| e.into_inner());
+        if let Some(table) = tables.iter().find(|t| t.baby_steps.table_bits() == table_bits && t.table_file == table_file) {
+            return Ok(table.clone());
         }
-        gamma = gamma - &am;
+
+        let table = if table_file.is_empty() {
+            BabyStepTable::new(table_bits)
+        } else {
+            let baby_steps = FingerprintTable::load(Path::new(table_file))
+                .map_err(|e| format!("Failed to load table {}: {}", table_file, e))?;
+            if baby_steps.table_bits() != table_bits {
+                return Err(format!("Table {} has {} instead of {} table bits", table_file, baby_steps.table_bits(), table_bits));
+            }
+            BabyStepTable::from_baby_steps(baby_steps, table_file.to_string())
+        };
+        let table = Arc::new(table);
+        tables.push(table.clone());
+        Ok(table)
     }
 
-    panic!("No discrete log found");
+    fn baby_giant(&self, dlog_bits: u32, b: &GroupProjective<EdwardsParameters>) -> Option<u64> {
+        let g = generator();
+        let table_bits = self.baby_steps.table_bits();
+        let m = 1u64 << table_bits;
+        let giant_steps = 1u64 << dlog_bits.saturating_sub(table_bits);
+
+        let mut gamma = b.clone();
+        let mut i = 0u64;
+        // Start with small batches, as most values are small
+        let mut batch_size = 1u64;
+        while i < giant_steps {
+            let n = min(batch_size, giant_steps - i);
+            let mut batch = Vec::with_capacity(n as usize);
+            for _ in 0..n {
+                batch.push(gamma);
+                gamma = gamma - &self.giant_step;
+            }
+            for (k, p) in GroupProjective::<EdwardsParameters>::batch_normalization_into_affine(&batch).iter().enumerate() {
+                // Fingerprints are not unique, confirm candidates by recomputing the baby step
+                let is_match = |j: u32| g.mul(scalar(j as u64)).into_affine() == *p;
+                if let Some(j) = self.baby_steps.find(fingerprint(p), is_match) {
+                    return Some((i + k as u64) * m + j as u64);
+                }
+            }
+            i += n;
+            batch_size = min(2 * batch_size, MAX_NORMALIZATION_BATCH);
+        }
+        None
+    }
 }
 
-fn compute_dlog(_py: Python, x: &str, y: &str) -> PyResult<String> {
-    let res = do_compute_dlog(x, y);
-    Ok(res.to_string())
+fn to_py_result<T>(py: Python, res: Result<T, String>) -> PyResult<T> {
+    res.map_err(|msg| PyErr::new::<exc::ValueError, _>(py, msg))
 }
 
-fn parse_le_bytes_str(s: &str) -> BigInteger256 {
-    let mut buffer = [0u8; 32];     // 32 bytes for 265 bits
+fn compute_dlog(py: Python, x: &str, y: &str) -> PyResult<String> {
+    let res = py.allow_threads(|| {
+        let table = BabyStepTable::get(DEFAULT_TABLE_BITS, "")?;
+        do_compute_dlog(&table, DEFAULT_DLOG_BITS, x, y)
+    });
+    Ok(to_py_result(py, res)?.to_string())
+}
 
-    let v = hex::decode(s).unwrap();
-    assert_eq!(v.len(), 32);
-    let v = v.as_slice();
-    for i in 0..32 {
-        buffer[i] = v[i];
+fn compute_dlog_batch(py: Python, points: Vec<(String, String)>, dlog_bits: u32, table_bits: u32, table_file: &str) -> PyResult<Vec<String>> {
+    let res = py.allow_threads(|| {
+        if dlog_bits > MAX_DLOG_BITS {
+            return Err(format!("dlog_bits must be at most {}", MAX_DLOG_BITS));
+        }
+        let table = BabyStepTable::get(table_bits, table_file)?;
+        do_compute_dlog_batch(&table, dlog_bits, &points)
+    });
+    Ok(to_py_result(py, res)?.iter().map(|d| d.to_string()).collect())
+}
+
+fn generate_table(py: Python, table_bits: u32, table_file: &str) -> PyResult<bool> {
+    let res = py.allow_threads(|| {
+        if table_bits > MAX_TABLE_BITS {
+            return Err(format!("table_bits must be at most {}", MAX_TABLE_BITS));
+        }
+        BabyStepTable::new(table_bits).baby_steps.save(Path::new(table_file))
+            .map_err(|e| format!("Failed to write table {}: {}", table_file, e))
+    });
+    to_py_result(py, res)?;
+    Ok(true)
+}
+
+fn parse_le_bytes_str(s: &str) -> Result<BigInteger256, String> {
+    let v = hex::decode(s).map_err(|e| format!("Invalid hex string {}: {}", s, e))?;
+    if v.len() != 32 {
+        return Err(format!("Expected 32 bytes, got {}", v.len()));
     }
 
     let mut bi = BigInteger256::new([0; 4]);
-    bi.read_le(&mut buffer.as_ref()).unwrap();
-    return bi;
+    bi.read_le(&mut v.as_slice()).map_err(|e| e.to_string())?;
+    Ok(bi)
 }
 
-fn do_compute_dlog(x: &str, y: &str) -> u64 {
+fn parse_point(x: &str, y: &str) -> Result<GroupProjective<EdwardsParameters>, String> {
     // x and y are in little-endian hex string format
+    let bx = Fq::from_repr(parse_le_bytes_str(x)?).ok_or("x coordinate is not a field element")?;
+    let by = Fq::from_repr(parse_le_bytes_str(y)?).ok_or("y coordinate is not a field element")?;
 
-    let gx = field_new!(Fq, "11904062828411472290643689191857696496057424932476499415469791423656658550213");
-    let gy = field_new!(Fq, "9356450144216313082194365820021861619676443907964402770398322487858544118183");
-    let a = BabyJubJub::new(gx, gy);
-    // assert!(BabyJubJub::is_on_curve(&a));
-    // assert!(BabyJubJub::is_in_correct_subgroup_assuming_on_curve(&a));
+    let b = BabyJubJub::new(bx, by);
+    if !b.is_on_curve() || !b.is_in_correct_subgroup_assuming_on_curve() {
+        return Err(format!("Point ({}, {}) is not in the prime order subgroup", x, y));
+    }
+    Ok(b.into_projective())
+}
 
-    let bx = Fq::from_repr(parse_le_bytes_str(x)).unwrap();
-    let by = Fq::from_repr(parse_le_bytes_str(y)).unwrap();
+fn do_compute_dlog(table: &BabyStepTable, dlog_bits: u32, x: &str, y: &str) -> Result<u64, String> {
+    let b = parse_point(x, y)?;
+    table.baby_giant(dlog_bits, &b).ok_or_else(|| format!("No discrete log with at most {} bits found", dlog_bits))
+}
 
-    let b = BabyJubJub::new(bx, by);
-    assert!(BabyJubJub::is_on_curve(&b));
-    assert!(BabyJubJub::is_in_correct_subgroup_assuming_on_curve(&b));
-    let b = b.mul(Fr::new(BigInteger256::from(1)));
+fn do_compute_dlog_batch(table: &BabyStepTable, dlog_bits: u32, points: &[(String, String)]) -> Result<Vec<u64>, String> {
+    let num_threads = thread::available_parallelism().map(|n| n.get()).unwrap_or(1);
+    let chunk_size = std::cmp::max(1, (points.len() + num_threads - 1) / num_threads);
+
+    thread::scope(|s| {
+        let handles: Vec<_> = points.chunks(chunk_size).map(|chunk| {
+            s.spawn(move || {
+                chunk.iter().map(|(x, y)| do_compute_dlog(table, dlog_bits, x, y)).collect::<Result<Vec<u64>, String>>()
+            })
+        }).collect();
 
-    baby_giant(32, &a, &b)
+        let mut res = Vec::with_capacity(points.len());
+        for handle in handles {
+            res.extend(handle.join().map_err(|_| "Discrete log thread panicked".to_string())??);
+        }
+        Ok(res)
+    })
 }
 
 #[cfg(test)]
 mod tests {
     use super::*;
 
+    const GX: &str = "c53d8d24e6767618b495ed560a0cb4fa3d86c5b86e0d9555ab4ef69cf675511a";
+    const GY: &str = "a7099eb9f4b811bbd4ea1643e449bd1551d732d9ebc81833e5e33a3c2890af14";
+
     #[test]
     fn test_compute_dlog() {
-        let dlog = do_compute_dlog("c53d8d24e6767618b495ed560a0cb4fa3d86c5b86e0d9555ab4ef69cf675511a",
-                                   "a7099eb9f4b811bbd4ea1643e449bd1551d732d9ebc81833e5e33a3c2890af14");
-        assert_eq!(1, dlog);
+        let table = BabyStepTable::get(DEFAULT_TABLE_BITS, "").unwrap();
+        let dlog = do_compute_dlog(&table, DEFAULT_DLOG_BITS, GX, GY);
+        assert_eq!(Ok(1), dlog);
+    }
+
+    #[test]
+    fn test_compute_dlog_batch() {
+        let table = BabyStepTable::get(DEFAULT_TABLE_BITS, "").unwrap();
+        let g = (GX.to_string(), GY.to_string());
+        let dlogs = do_compute_dlog_batch(&table, DEFAULT_DLOG_BITS, &vec![g; 5]);
+        assert_eq!(Ok(vec![1; 5]), dlogs);
+    }
+
+    #[test]
+    fn test_large_dlog() {
+        let v = (1u64 << 36) + 12345;
+        let p = generator().mul(scalar(v)).into_affine();
+        let table = BabyStepTable::get(20, "").unwrap();
+        assert_eq!(Some(v), table.baby_giant(37, &p.into_projective()));
+        assert_eq!(None, table.baby_giant(36, &p.into_projective()));
+    }
+
+    #[test]
+    fn test_table_file() {
+        let path = std::env::temp_dir().join(format!("babygiant_table_{}.bin", std::process::id()));
+        let file = path.to_str().unwrap();
+        BabyStepTable::new(10).baby_steps.save(&path).unwrap();
+        let table = BabyStepTable::get(10, file).unwrap();
+        assert!(BabyStepTable::get(12, file).is_err());
+        std::fs::remove_file(&path).unwrap();
+
+        let p = generator().mul(scalar(9876543)).into_affine();
+        assert_eq!(Some(9876543), table.baby_giant(24, &p.into_projective()));
     }
 }
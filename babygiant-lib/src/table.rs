@@ -0,0 +1,214 @@
+//! Open addressing hash table mapping point fingerprints to baby-step indices.
+//!
+//! Tables can be saved to disk and memory-mapped later on, such that large tables only need to be computed once.
+//!
+//! File format (all integers little-endian):
+//!     magic "BGTABLE1" | table_bits: u64 | capacity: u64 | keys: [u64; capacity] | values: [u32; capacity]
+
+use std::fs::{self, File};
+use std::io::{self, BufWriter, Read, Write};
+use std::os::unix::io::AsRawFd;
+use std::path::Path;
+use std::slice;
+
+const MAGIC: &[u8; 8] = b"BGTABLE1";
+const HEADER_LEN: usize = 24;
+pub const MAX_TABLE_BITS: u32 = 32;
+
+struct Mmap {
+    ptr: *mut libc::c_void,
+    len: usize,
+}
+
+// The mapping is read-only
+unsafe impl Send for Mmap {}
+unsafe impl Sync for Mmap {}
+
+impl Mmap {
+    fn map(file: &File, len: usize) -> io::Result<Mmap> {
+        let ptr = unsafe {
+            libc::mmap(std::ptr::null_mut(), len, libc::PROT_READ, libc::MAP_SHARED, file.as_raw_fd(), 0)
+        };
+        if ptr == libc::MAP_FAILED {
+            return Err(io::Error::last_os_error());
+        }
+        Ok(Mmap { ptr, len })
+    }
+}
+
+impl Drop for Mmap {
+    fn drop(&mut self) {
+        unsafe { libc::munmap(self.ptr, self.len); }
+    }
+}
+
+enum Storage {
+    Memory { keys: Vec<u64>, values: Vec<u32> },
+    Mapped(Mmap),
+}
+
+pub struct FingerprintTable {
+    table_bits: u32,
+    capacity: usize,
+    storage: Storage,
+}
+
+fn invalid_data(msg: String) -> io::Error {
+    io::Error::new(io::ErrorKind::InvalidData, msg)
+}
+
+impl FingerprintTable {
+    /// Create an empty in-memory table for 2^table_bits entries.
+    pub fn with_table_bits(table_bits: u32) -> FingerprintTable {
+        assert!(table_bits <= MAX_TABLE_BITS);
+        // load factor <= 0.5
+        let capacity = 1usize << (table_bits + 1);
+        FingerprintTable { table_bits, capacity, storage: Storage::Memory { keys: vec![0; capacity], values: vec![0; capacity] } }
+    }
+
+    pub fn table_bits(&self) -> u32 {
+        self.table_bits
+    }
+
+    fn slots(&self) -> (&[u64], &[u32]) {
+        match &self.storage {
+            Storage::Memory { keys, values } => (keys, values),
+            Storage::Mapped(mmap) => unsafe {
+                // mmap returns page aligned memory, and HEADER_LEN is a multiple of 8
+                let keys = mmap.ptr.cast::<u8>().add(HEADER_LEN);
+                let values = keys.add(8 * self.capacity);
+                (slice::from_raw_parts(keys.cast::<u64>(), self.capacity), slice::from_raw_parts(values.cast::<u32>(), self.capacity))
+            },
+        }
+    }
+
+    #[inline]
+    fn first_slot(&self, fingerprint: u64) -> usize {
+        (fingerprint >> 1) as usize & (self.capacity - 1)
+    }
+
+    /// Add an entry, fingerprints do not have to be unique.
+    pub fn insert(&mut self, fingerprint: u64, value: u32) {
+        let key = fingerprint | 1;
+        let mut idx = self.first_slot(fingerprint);
+        let mask = self.capacity - 1;
+        match &mut self.storage {
+            Storage::Memory { keys, values } => {
+                while keys[idx] != 0 {
+                    idx = (idx + 1) & mask;
+                }
+                keys[idx] = key.to_le();
+                values[idx] = value.to_le();
+            },
+            Storage::Mapped(_) => panic!("Memory-mapped tables are read-only"),
+        }
+    }
+
+    /// Return the first value stored for fingerprint for which accept returns true.
+    pub fn find<F: FnMut(u32) -> bool>(&self, fingerprint: u64, mut accept: F) -> Option<u32> {
+        let key = fingerprint | 1;
+        let mut idx = self.first_slot(fingerprint);
+        let (keys, values) = self.slots();
+        loop {
+            let k = u64::from_le(keys[idx]);
+            if k == 0 {
+                return None;
+            }
+            if k == key {
+                let v = u32::from_le(values[idx]);
+                if accept(v) {
+                    return Some(v);
+                }
+            }
+            idx = (idx + 1) & (self.capacity - 1);
+        }
+    }
+
+    /// Atomically write the table to path.
+    pub fn save(&self, path: &Path) -> io::Result<()> {
+        if let Some(dir) = path.parent() {
+            fs::create_dir_all(dir)?;
+        }
+        let tmp_path = path.with_extension("tmp");
+        {
+            let (keys, values) = self.slots();
+            let mut w = BufWriter::new(File::create(&tmp_path)?);
+            w.write_all(MAGIC)?;
+            w.write_all(&(self.table_bits as u64).to_le_bytes())?;
+            w.write_all(&(self.capacity as u64).to_le_bytes())?;
+            for k in keys {
+                w.write_all(&u64::from_le(*k).to_le_bytes())?;
+            }
+            for v in values {
+                w.write_all(&u32::from_le(*v).to_le_bytes())?;
+            }
+            w.into_inner()?.sync_all()?;
+        }
+        fs::rename(&tmp_path, path)
+    }
+
+    /// Memory-map a table which was previously written using save.
+    pub fn load(path: &Path) -> io::Result<FingerprintTable> {
+        let mut file = File::open(path)?;
+        let mut header = [0u8; HEADER_LEN];
+        file.read_exact(&mut header)?;
+        if &header[..8] != MAGIC {
+            return Err(invalid_data(format!("{} is not a babygiant table", path.display())));
+        }
+        let mut buf = [0u8; 8];
+        buf.copy_from_slice(&header[8..16]);
+        let table_bits = u64::from_le_bytes(buf);
+        buf.copy_from_slice(&header[16..24]);
+        let capacity = u64::from_le_bytes(buf);
+        if table_bits > MAX_TABLE_BITS as u64 || capacity != 1u64 << (table_bits + 1) {
+            return Err(invalid_data(format!("{} has an invalid header", path.display())));
+        }
+
+        let capacity = capacity as usize;
+        let len = HEADER_LEN + 12 * capacity;
+        if file.metadata()?.len() != len as u64 {
+            return Err(invalid_data(format!("{} is truncated", path.display())));
+        }
+        let mmap = Mmap::map(&file, len)?;
+        Ok(FingerprintTable { table_bits: table_bits as u32, capacity, storage: Storage::Mapped(mmap) })
+    }
+}
+
+#[cfg(test)]
+mod tests {
+    use super::*;
+
+    #[test]
+    fn test_insert_find() {
+        let mut table = FingerprintTable::with_table_bits(4);
+        for i in 0..16u32 {
+            table.insert(0x1234_5678_9abc_def0u64.wrapping_mul(i as u64 + 1), i);
+        }
+        // duplicate fingerprint
+        table.insert(0x1234_5678_9abc_def0u64, 42);
+
+        assert_eq!(Some(3), table.find(0x1234_5678_9abc_def0u64 * 4, |_| true));
+        assert_eq!(Some(0), table.find(0x1234_5678_9abc_def0u64, |_| true));
+        assert_eq!(Some(42), table.find(0x1234_5678_9abc_def0u64, |v| v != 0));
+        assert_eq!(None, table.find(7, |_| true));
+    }
+
+    #[test]
+    fn test_save_load() {
+        let mut table = FingerprintTable::with_table_bits(6);
+        for i in 0..64u32 {
+            table.insert((i as u64) << 40 | 0xabcd, i);
+        }
+
+        let path = std::env::temp_dir().join(format!("babygiant_test_{}.bin", std::process::id()));
+        table.save(&path).unwrap();
+        let loaded = FingerprintTable::load(&path).unwrap();
+        fs::remove_file(&path).unwrap();
+
+        assert_eq!(6, loaded.table_bits());
+        for i in 0..64u32 {
+            assert_eq!(Some(i), loaded.find((i as u64) << 40 | 0xabcd, |_| true));
+        }
+        assert_eq!(None, loaded.find(1 << 40, |_| true));
+    }
+}
@@ -0,0 +1,61 @@
+import time
+import unittest
+
+import babygiant
+
+from test_compute_dlog import to_le_32_hex_bytes
+
+# (x, y, dlog) of the points from test_compute_dlog
+POINTS = [
+    (11904062828411472290643689191857696496057424932476499415469791423656658550213,
+     9356450144216313082194365820021861619676443907964402770398322487858544118183, 1),
+    (141579968252753561777903806704988380915591798817413028638954837858390837201,
+     8211442360329077616485844356105856211290554633036363698328149195845491718472, 42),
+    (1237782632357792921748619918672290873715140228147952285260614658227666644805,
+     8536601915096873801487482824890195798313989719405833310308025351040807340450, 439864),
+    (5652656239952688394277263857437950310337758360686799204608403639751231094469,
+     12851660065128060156182676833734308532414060198909711906752076757704989086093, 29479828),
+    (15743946954562047249571095208238595903506448530691319295399660626995714375664,
+     15525990578248253221389285433096584355731520235111340770355552827779786069736, 20503),
+    (938459532454339079955561771272595017136409256765296385851682915539698976422,
+     3427543513549742811527812325486389539662919266205813455803260249255161169399, 9973),
+    (19121738117514367125825473914004741810707492687275644297534200073386934052875,
+     8407169098186914336744034121476531686413014126989797732313769594461994647750, 11),
+]
+
+REPETITIONS = 15
+
+
+class TestDlogThroughput(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.args = [(to_le_32_hex_bytes(x), to_le_32_hex_bytes(y)) for x, y, _ in POINTS] * REPETITIONS
+        cls.expected = [str(dlog) for _, _, dlog in POINTS] * REPETITIONS
+
+        # First call builds the process-wide baby-step table
+        start = time.perf_counter()
+        babygiant.compute_dlog(*cls.args[0])
+        print(f'\nbaby-step table setup + first dlog: {time.perf_counter() - start:.3f}s')
+
+    def _report(self, name: str, elapsed: float):
+        print(f'\n{name}: {len(self.args)} dlogs in {elapsed:.3f}s ({len(self.args) / elapsed:.1f} dlogs/s)')
+
+    def test_compute_dlog_throughput(self):
+        start = time.perf_counter()
+        res = [babygiant.compute_dlog(x, y) for x, y in self.args]
+        self._report('compute_dlog', time.perf_counter() - start)
+        self.assertEqual(self.expected, res)
+
+    def test_compute_dlog_batch_throughput(self):
+        start = time.perf_counter()
+        res = babygiant.compute_dlog_batch(self.args, 32, 16, '')
+        self._report('compute_dlog_batch', time.perf_counter() - start)
+        self.assertEqual(self.expected, res)
+
+    def test_compute_dlog_batch_empty(self):
+        self.assertEqual([], babygiant.compute_dlog_batch([], 32, 16, ''))
+
+    def test_invalid_point(self):
+        with self.assertRaises(ValueError):
+            babygiant.compute_dlog(to_le_32_hex_bytes(1), to_le_32_hex_bytes(1))
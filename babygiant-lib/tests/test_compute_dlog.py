@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 
 import babygiant
@@ -45,3 +47,25 @@ class TestComputeDlog(unittest.TestCase):
         x = 19121738117514367125825473914004741810707492687275644297534200073386934052875
         y = 8407169098186914336744034121476531686413014126989797732313769594461994647750
         self.assertEqual("11", babygiant.compute_dlog(to_le_32_hex_bytes(x), to_le_32_hex_bytes(y)))
+
+
+class TestComputeDlogTable(unittest.TestCase):
+    x = 5652656239952688394277263857437950310337758360686799204608403639751231094469
+    y = 12851660065128060156182676833734308532414060198909711906752076757704989086093
+
+    def test_dlog_bits(self):
+        args = [(to_le_32_hex_bytes(self.x), to_le_32_hex_bytes(self.y))]
+        self.assertEqual(["29479828"], babygiant.compute_dlog_batch(args, 25, 12, ""))
+        with self.assertRaises(ValueError):
+            babygiant.compute_dlog_batch(args, 24, 12, "")
+
+    def test_table_file(self):
+        with tempfile.TemporaryDirectory() as d:
+            table_file = os.path.join(d, "table_18.bin")
+            babygiant.generate_table(18, table_file)
+            self.assertEqual(os.path.getsize(table_file), 24 + 12 * 2**19)
+
+            args = [(to_le_32_hex_bytes(self.x), to_le_32_hex_bytes(self.y))]
+            self.assertEqual(["29479828"], babygiant.compute_dlog_batch(args, 32, 18, table_file))
+            with self.assertRaises(ValueError):
+                babygiant.compute_dlog_batch(args, 32, 17, table_file)
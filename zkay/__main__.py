@@ -156,6 +156,18 @@ def parse_arguments():
                                           help='Manually deploy proving-scheme specific crypto libraries (if any needed) to a blockchain')
     add_config_args(dclibs_parser, {'proving_scheme', 'blockchain_backend', 'blockchain_node_uri'})
 
+    # 'generate-dlog-table' parser
+    dlog_parser = subparsers.add_parser('generate-dlog-table',
+                                        help='Precompute the discrete log table used for elgamal decryption and store it in the data directory')
+    add_config_args(dlog_parser, {'elgamal_dlog_table_bits', 'data_dir'})
+
+    # 'cache' parser
+    cache_parser = subparsers.add_parser('cache', help='Manage the global circuit cache in the data directory')
+    cache_subparsers = cache_parser.add_subparsers(title='cache actions', dest='cache_cmd', required=True)
+    gc_parser = cache_subparsers.add_parser('gc', help='Remove least recently used circuits until the cache is at most '
+                                                       'circuit_cache_size_mb large')
+    add_config_args(gc_parser, {'circuit_cache_size_mb', 'data_dir'})
+
     subparsers.add_parser('version', help='Display zkay version information')
     subparsers.add_parser('update-solc', help='Install latest compatible solc version (requires internet connection)')
 
@@ -239,6 +251,21 @@ def main():
             except Exception as e:
                 with fail_print():
                     print(f"ERROR: Deployment failed\n{e}")
+    elif a.cmd == 'generate-dlog-table':
+        from zkay.transaction.crypto.elgamal import generate_dlog_table
+        try:
+            table_file = generate_dlog_table(cfg.elgamal_dlog_table_bits)
+            with success_print():
+                print(f'Discrete log table written to {table_file}')
+        except Exception as e:
+            with fail_print():
+                print(f"ERROR: Failed to generate discrete log table\n{e}")
+            exit(1)
+    elif a.cmd == 'cache':
+        from zkay.compiler.privacy.circuit_generation import circuit_cache
+        removed, freed = circuit_cache.gc(cfg.circuit_cache_size_mb * 1024 * 1024)
+        with success_print():
+            print(f'Removed {removed} cached circuits ({freed / (1024 * 1024):.1f} MiB)')
     else:
         # Solc version override
         if hasattr(a, 'solc_version') and a.solc_version is not None:
@@ -5,6 +5,7 @@ from typing import List, Optional, Union, Tuple
 
 import zkay.jsnark_interface.jsnark_interface as jsnark
 import zkay.jsnark_interface.libsnark_interface as libsnark
+from zkay.compiler.privacy.circuit_generation import circuit_cache
 from zkay.compiler.privacy.circuit_generation.circuit_constraints import CircComment, CircIndentBlock, \
     CircGuardModification, CircCall, CircSymmEncConstraint
 from zkay.compiler.privacy.circuit_generation.circuit_generator import CircuitGenerator
@@ -14,7 +15,7 @@ from zkay.compiler.privacy.proving_scheme.backends.gm17 import ProvingSchemeGm17
 from zkay.compiler.privacy.proving_scheme.backends.groth16 import ProvingSchemeGroth16
 from zkay.compiler.privacy.proving_scheme.proving_scheme import VerifyingKey, G2Point, G1Point, ProvingScheme
 from zkay.config import cfg, zk_print
-from zkay.utils.helpers import hash_file, hash_string
+from zkay.utils.helpers import hash_file_cached, hash_string
 from zkay.zkay_ast.ast import FunctionCallExpr, BuiltinFunction, IdentifierExpr, BooleanLiteralExpr, \
     IndexExpr, MeExpr, NumberLiteralExpr, MemberAccessExpr, TypeName, indent, PrimitiveCastExpr, EnumDefinition, \
     Expression
@@ -201,9 +202,34 @@ def add_function_circuit_arguments(circuit: CircuitHelper):
 
 class JsnarkGenerator(CircuitGenerator):
     def __init__(self, circuits: List[CircuitHelper], proving_scheme: ProvingScheme, output_dir: str):
-        super().__init__(circuits, proving_scheme, output_dir, False)
+        super().__init__(circuits, proving_scheme, output_dir, True)
+
+    def _generate_zkcircuits(self, import_keys: bool, circuits: List[CircuitHelper]) -> List[bool]:
+        results = [self._prepare_zkcircuit(import_keys, circuit) for circuit in circuits]
+        to_compile = [(circuit, res) for circuit, res in zip(circuits, results) if not isinstance(res, bool)]
+        if to_compile:
+            # Compile all modified circuits in a single JVM, circuits which compiled successfully are finished even if others failed
+            compiled = {self._get_circuit_output_dir(circuit): (circuit, digest) for circuit, (_, digest) in to_compile}
+            jsnark.compile_circuits([(self._get_circuit_output_dir(circuit), code) for circuit, (code, _) in to_compile],
+                                    self.p_count, lambda circuit_dir: self._finish_zkcircuit(*compiled[circuit_dir]))
+        return [res if isinstance(res, bool) else True for res in results]
 
     def _generate_zkcircuit(self, import_keys: bool, circuit: CircuitHelper) -> bool:
+        res = self._prepare_zkcircuit(import_keys, circuit)
+        if isinstance(res, bool):
+            return res
+        code, digest = res
+        jsnark.compile_circuit(self._get_circuit_output_dir(circuit), code)
+        self._finish_zkcircuit(circuit, digest)
+        return True
+
+    def _prepare_zkcircuit(self, import_keys: bool, circuit: CircuitHelper) -> Union[bool, Tuple[str, str]]:
+        """
+        Generate the circuit code and reuse the existing or cached circuit if possible.
+
+        :return: True if the circuit was modified (see _generate_zkcircuit) and no compilation is required,
+                 otherwise the circuit code and digest, which must be passed to _finish_zkcircuit after compiling the code
+        """
         # Create output directory
         output_dir = self._get_circuit_output_dir(circuit)
         if not os.path.exists(output_dir):
@@ -252,19 +278,55 @@ class JsnarkGenerator(CircuitGenerator):
                 for f in self._get_vk_and_pk_paths(circuit):
                     if os.path.exists(f):
                         os.remove(f)
-            jsnark.compile_circuit(output_dir, code)
+
+            key_files = list(self.get_vk_and_pk_filenames())
+            cached_circuit_files = [f for f in circuit_cache.list_files(digest) if f not in key_files]
+            if 'circuit.arith' in cached_circuit_files and circuit_cache.get_files(digest, cached_circuit_files, output_dir):
+                zk_print(f'Using cached circuit \'{circuit.get_verification_contract_name()}\'')
+                reuse_keys = not import_keys and circuit_cache.get_files(digest, key_files, output_dir)
+            else:
+                # Circuit files may be shared with the cache, never overwrite them in place
+                for f in self._get_circuit_files(output_dir):
+                    os.remove(os.path.join(output_dir, f))
+                return code, digest
+
             with open(hashfile, 'w') as f:
                 f.write(digest)
-            return True
+            return not reuse_keys
         else:
             zk_print(f'Circuit \'{circuit.get_verification_contract_name()}\' not modified, skipping compilation')
             return False
 
+    def _finish_zkcircuit(self, circuit: CircuitHelper, digest: str):
+        output_dir = self._get_circuit_output_dir(circuit)
+        circuit_cache.put_files(digest, self._get_circuit_files(output_dir), output_dir)
+        with open(os.path.join(output_dir, f'{cfg.jsnark_circuit_classname}.hash'), 'w') as f:
+            f.write(digest)
+
+    @staticmethod
+    def _get_circuit_files(output_dir: str) -> List[str]:
+        """Return the names of all files in output_dir which are generated by jsnark.compile_circuit."""
+        class_name = cfg.jsnark_circuit_classname
+        return [f for f in os.listdir(output_dir)
+                if f == 'circuit.arith' or f == f'{class_name}.java' or (f.startswith(class_name) and f.endswith('.class'))]
+
     def _generate_keys(self, circuit: CircuitHelper):
+        # Key files may be shared with the cache, never overwrite them in place
+        for f in self._get_vk_and_pk_paths(circuit):
+            if os.path.exists(f):
+                os.remove(f)
+
         # Invoke the custom libsnark interface to generate keys
         output_dir = self._get_circuit_output_dir(circuit)
         libsnark.generate_keys(output_dir, output_dir, self.proving_scheme.name)
 
+        with open(os.path.join(output_dir, f'{cfg.jsnark_circuit_classname}.hash')) as f:
+            digest = f.read()
+        circuit_cache.put_files(digest, list(self.get_vk_and_pk_filenames()), output_dir)
+
+    def _estimate_keygen_memory(self, circuit: CircuitHelper) -> int:
+        return libsnark.estimate_keygen_memory(self._get_circuit_output_dir(circuit))
+
     @classmethod
     def get_vk_and_pk_filenames(cls) -> Tuple[str, ...]:
         return 'verification.key', 'proving.key', 'verification.key.bin'
@@ -297,7 +359,7 @@ class JsnarkGenerator(CircuitGenerator):
             raise NotImplementedError()
 
     def _get_prover_key_hash(self, circuit: CircuitHelper) -> bytes:
-        return hash_file(self._get_vk_and_pk_paths(circuit)[1])
+        return hash_file_cached(self._get_vk_and_pk_paths(circuit)[1])
 
     def _get_primary_inputs(self, circuit: CircuitHelper) -> List[str]:
         # Jsnark requires an additional public input with the value 1 as first input
@@ -0,0 +1,131 @@
+"""
+Global content-addressed store for compiled circuits and their keys.
+
+Entries are stored in cfg.data_dir/circuit_cache/<digest>, where digest is the hash which circuit generators use to detect
+modified circuits. Files are shared with output directories via hardlinks (or reflinks/copies if hardlinking is not possible),
+so output directories must never modify these files in place.
+"""
+import os
+import shutil
+import threading
+from typing import List, Tuple
+
+from zkay.config import cfg
+
+# ioctl request to clone a file's extents (linux, btrfs/xfs)
+_FICLONE = 0x40049409
+
+
+def _cache_dir() -> str:
+    return os.path.join(cfg.data_dir, 'circuit_cache')
+
+
+def _entry_dir(digest: str) -> str:
+    return os.path.join(_cache_dir(), digest)
+
+
+def _link_or_copy(src: str, dst: str):
+    """Atomically make dst a hardlink, reflink or (if neither is supported) copy of src."""
+    tmp = f'{dst}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        os.link(src, tmp)
+    except OSError:
+        try:
+            import fcntl
+            with open(src, 'rb') as fsrc, open(tmp, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        except (ImportError, OSError):
+            shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def is_enabled() -> bool:
+    return cfg.circuit_cache_size_mb > 0
+
+
+def has_files(digest: str, filenames: List[str]) -> bool:
+    """Return true if the entry for digest contains all of the given files."""
+    entry_dir = _entry_dir(digest)
+    return is_enabled() and all(os.path.exists(os.path.join(entry_dir, f)) for f in filenames)
+
+
+def list_files(digest: str) -> List[str]:
+    """Return the names of all files stored in the entry for digest."""
+    try:
+        return [f for f in os.listdir(_entry_dir(digest)) if not f.endswith('.tmp')]
+    except OSError:
+        return []
+
+
+def get_files(digest: str, filenames: List[str], target_dir: str) -> bool:
+    """
+    Link the given files of the entry for digest into target_dir.
+
+    :return: True if all files were available, otherwise none of the files are linked into target_dir \
+             (existing files with the same names might have been removed)
+    """
+    if not has_files(digest, filenames):
+        return False
+    entry_dir = _entry_dir(digest)
+    linked = []
+    try:
+        for f in filenames:
+            target = os.path.join(target_dir, f)
+            if os.path.exists(target):
+                os.remove(target)
+            _link_or_copy(os.path.join(entry_dir, f), target)
+            linked.append(target)
+        os.utime(entry_dir)  # Mark as recently used
+    except OSError:
+        # Entry removed concurrently, do not leave a partial entry behind
+        for target in linked:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+        return False
+    return True
+
+
+def put_files(digest: str, filenames: List[str], source_dir: str):
+    """Add the given files from source_dir to the entry for digest and trim the cache to cfg.circuit_cache_size_mb."""
+    if not is_enabled():
+        return
+    entry_dir = _entry_dir(digest)
+    os.makedirs(entry_dir, exist_ok=True)
+    for f in filenames:
+        _link_or_copy(os.path.join(source_dir, f), os.path.join(entry_dir, f))
+    os.utime(entry_dir)  # Never evict the new entry first
+    gc(cfg.circuit_cache_size_mb * 1024 * 1024)
+
+
+def gc(max_size: int) -> Tuple[int, int]:
+    """
+    Remove the least recently used entries until the cache is at most max_size bytes large.
+
+    :return: number of removed entries and number of freed bytes
+    """
+    entries = []
+    try:
+        dirs = list(os.scandir(_cache_dir()))
+    except FileNotFoundError:
+        return 0, 0
+    for d in dirs:
+        if not d.is_dir():
+            continue
+        try:
+            size = sum(f.stat().st_size for f in os.scandir(d.path) if f.is_file())
+            entries.append((d.stat().st_mtime, size, d.path))
+        except OSError:
+            continue
+
+    total_size = sum(size for _, size, _ in entries)
+    removed, freed = 0, 0
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total_size -= size
+        removed += 1
+        freed += size
+    return removed, freed
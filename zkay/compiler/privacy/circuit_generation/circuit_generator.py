@@ -1,12 +1,15 @@
 import functools
 import os
+import threading
 from abc import ABCMeta, abstractmethod
-from multiprocessing import Pool, Value
-from typing import List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+from typing import List, Tuple, Optional
 
 from zkay.compiler.privacy.circuit_generation.circuit_helper import CircuitHelper
 from zkay.compiler.privacy.proving_scheme.proving_scheme import ProvingScheme, VerifyingKey
 from zkay.config import cfg, zk_print
+from zkay.utils.helpers import get_available_memory
 from zkay.utils.progress_printer import print_step
 from zkay.utils.timer import time_measure
 
@@ -26,7 +29,7 @@ class CircuitGenerator(metaclass=ABCMeta):
         :param circuits: list which contains the corresponding circuit helper for every function in the contract which requires verification
         :param proving_scheme: the proving scheme instance to be used for verification contract generation
         :param output_dir: base directory where the zkay compilation output is located
-        :param parallel_keygen: if true, multiple python processes are used to generate keys in parallel
+        :param parallel_keygen: if true, keys for multiple circuits are generated in parallel (subject to cfg.keygen_memory_limit_mb)
         """
 
         self.circuits = {circ.fct: circ for circ in circuits}
@@ -49,13 +52,8 @@ class CircuitGenerator(metaclass=ABCMeta):
         c_count = len(self.circuits_to_prove)
         zk_print(f'Compiling {c_count} circuits...')
 
-        gen_circs = functools.partial(self._generate_zkcircuit, import_keys)
         with time_measure('circuit_compilation', True):
-            if cfg.is_unit_test:
-                modified = list(map(gen_circs, self.circuits_to_prove))
-            else:
-                with Pool(processes=self.p_count) as pool:
-                    modified = pool.map(gen_circs, self.circuits_to_prove)
+            modified = self._generate_zkcircuits(import_keys, self.circuits_to_prove)
 
         if import_keys:
             for path in self.get_all_key_paths():
@@ -68,10 +66,8 @@ class CircuitGenerator(metaclass=ABCMeta):
             # Generate keys in parallel
             zk_print(f'Generating keys for {c_count} circuits...')
             with time_measure('key_generation', True):
-                if self.parallel_keygen and not cfg.is_unit_test:
-                    counter = Value('i', 0)
-                    with Pool(processes=self.p_count, initializer=self.__init_worker, initargs=(counter, c_count,)) as pool:
-                        pool.map(self._generate_keys_par, modified_circuits_to_prove)
+                if self.parallel_keygen and not cfg.is_unit_test and len(modified_circuits_to_prove) > 1:
+                    self._generate_keys_par(modified_circuits_to_prove)
                 else:
                     for circ in modified_circuits_to_prove:
                         self._generate_keys(circ)
@@ -95,20 +91,43 @@ class CircuitGenerator(metaclass=ABCMeta):
         """Return file paths for all verification contracts generated by this CircuitGenerator"""
         return [os.path.join(self.output_dir, circuit.verifier_contract_filename) for circuit in self.circuits_to_prove]
 
-    @staticmethod
-    def __init_worker(counter, total_count):
-        global finish_counter
-        global c_count
-
-        finish_counter = counter
-        c_count = total_count
+    def _generate_keys_par(self, circuits: List[CircuitHelper]):
+        """
+        Generate keys for all circuits, running at most self.p_count key generations at once.
 
-    def _generate_keys_par(self, circuit: CircuitHelper):
-        self._generate_keys(circuit)
-        with finish_counter.get_lock():
-            finish_counter.value += 1
-            zk_print(f'Generated keys for circuit '
-                  f'\'{circuit.verifier_contract_type.code()}\' [{finish_counter.value}/{c_count}]')
+        Jobs are started largest first, and only if the estimated peak memory usage of all running jobs stays below
+        cfg.keygen_memory_limit_mb. A job which exceeds the limit on its own is run once all other jobs finished.
+        """
+        estimates = [self._estimate_keygen_memory(circ) for circ in circuits]
+        mem_limit = get_keygen_memory_limit()
+        if mem_limit is None:
+            mem_limit = sum(estimates)
+        jobs = sorted(((min(est, mem_limit), circ) for est, circ in zip(estimates, circuits)),
+                      key=lambda job: job[0], reverse=True)
+        state = {'mem': 0, 'running': 0, 'finished': 0}
+        cond = threading.Condition()
+
+        def run_job(job: Tuple[int, CircuitHelper]):
+            mem, circuit = job
+            with cond:
+                cond.wait_for(lambda: state['running'] == 0 or state['mem'] + mem <= mem_limit)
+                state['mem'] += mem
+                state['running'] += 1
+            try:
+                self._generate_keys(circuit)
+            finally:
+                with cond:
+                    state['mem'] -= mem
+                    state['running'] -= 1
+                    state['finished'] += 1
+                    zk_print(f'Generated keys for circuit '
+                             f'\'{circuit.verifier_contract_type.code()}\' [{state["finished"]}/{len(jobs)}]')
+                    cond.notify_all()
+
+        # Key generation runs in a separate process, threads only wait for it to finish
+        with ThreadPoolExecutor(max_workers=self.p_count) as executor:
+            for f in [executor.submit(run_job, job) for job in jobs]:
+                f.result()
 
     def _get_circuit_output_dir(self, circuit: CircuitHelper):
         """Return the output directory for an individual circuit"""
@@ -119,6 +138,21 @@ class CircuitGenerator(metaclass=ABCMeta):
         output_dir = self._get_circuit_output_dir(circuit)
         return tuple(os.path.join(output_dir, fname) for fname in self.get_vk_and_pk_filenames())
 
+    def _generate_zkcircuits(self, import_keys: bool, circuits: List[CircuitHelper]) -> List[bool]:
+        """
+        Generate code and compile all given circuits (see _generate_zkcircuit).
+
+        Backends which can compile multiple circuits at once more efficiently should override this method.
+
+        :return: for each circuit, True if it was modified since last generation
+        """
+        gen_circs = functools.partial(self._generate_zkcircuit, import_keys)
+        if cfg.is_unit_test or not circuits:
+            return list(map(gen_circs, circuits))
+        else:
+            with Pool(processes=self.p_count) as pool:
+                return pool.map(gen_circs, circuits)
+
     @abstractmethod
     def _generate_zkcircuit(self, import_keys: bool, circuit: CircuitHelper) -> bool:
         """
@@ -143,6 +177,14 @@ class CircuitGenerator(metaclass=ABCMeta):
         """Generate prover and verification keys for the circuit stored in self._get_circuit_output_dir(circuit)."""
         pass
 
+    def _estimate_keygen_memory(self, circuit: CircuitHelper) -> int:
+        """
+        Return an estimate of the peak memory usage (in bytes) of key generation for the compiled circuit.
+
+        Backends without an estimate are only limited by the number of cores.
+        """
+        return 0
+
     @classmethod
     @abstractmethod
     def get_vk_and_pk_filenames(cls) -> Tuple[str, ...]:
@@ -173,3 +215,10 @@ class CircuitGenerator(metaclass=ABCMeta):
             for name, count in inputs:
                 primary_inputs += [f'{name}[{i}]' for i in range(count)]
             return primary_inputs
+
+
+def get_keygen_memory_limit() -> Optional[int]:
+    """Return the memory ceiling (in bytes) for concurrently running key generations, None if it cannot be determined."""
+    if cfg.keygen_memory_limit_mb > 0:
+        return cfg.keygen_memory_limit_mb * 1024 * 1024
+    return get_available_memory()
@@ -1,7 +1,7 @@
 from contextlib import contextmanager
 from datetime import datetime
 from textwrap import dedent
-from typing import Dict, List, Optional, ContextManager, Set
+from typing import Dict, List, Optional, ContextManager, Set, Tuple
 
 from zkay.compiler.privacy.circuit_generation.circuit_helper import CircuitHelper, HybridArgumentIdf
 from zkay.config import cfg
@@ -14,9 +14,10 @@ from zkay.zkay_ast.ast import ContractDefinition, IntTypeName, SourceUnit, Const
     CircuitComputationStatement, VariableDeclaration, Block, KeyLiteralExpr, VariableDeclarationStatement, LocationExpr, \
     PrimitiveCastExpr, EnumDefinition, EnumTypeName, UintTypeName, \
     StatementList, StructDefinition, NumberTypeName, EnterPrivateKeyStatement, ArrayLiteralExpr, NumberLiteralExpr, \
-    BoolTypeName
+    BoolTypeName, BooleanLiteralExpr, AST
 from zkay.zkay_ast.homomorphism import Homomorphism
 from zkay.zkay_ast.visitor.python_visitor import PythonCodeVisitor
+from zkay.zkay_ast.visitor.visitor import AstVisitor
 
 
 def api(name: str, invoker: str = 'self') -> str:
@@ -31,6 +32,60 @@ IS_EXTERNAL_CALL = f'{cfg.reserved_name_prefix}is_ext'
 SCALAR_FIELD_NAME = 'bn128_scalar_field'
 
 
+class StateReadCollector(AstVisitor):
+    """Collect the state variable locations which are read in the simulated part of a function body (without descending into callees)."""
+
+    def __init__(self):
+        super().__init__('node-or-children')
+        self.reads: List[Tuple[StateVariableDeclaration, List[Expression]]] = []
+        """List of (state variable, index keys) tuples (in order of appearance)"""
+
+        self.calls: List[FunctionCallExpr] = []
+        """Calls to contract functions"""
+
+        self.modified_params: Set[Parameter] = set()
+        """Parameters which are assigned to within the function body"""
+
+    def visitStatementList(self, ast: StatementList):
+        if not ast.excluded_from_simulation:
+            self.visitChildren(ast)
+
+    def visitFunctionCallExpr(self, ast: FunctionCallExpr):
+        if isinstance(ast.func, LocationExpr) and isinstance(ast.func.target, ConstructorOrFunctionDefinition):
+            self.calls.append(ast)
+            self.visit_list(ast.args)
+        else:
+            self.visitChildren(ast)
+
+    def visitIdentifierExpr(self, ast: IdentifierExpr):
+        if isinstance(ast.target, Parameter) and ast.is_lvalue():
+            self.modified_params.add(ast.target)
+        elif not self._is_location_prefix(ast):
+            self._add_read(ast, ast, [])
+
+    def visitIndexExpr(self, ast: IndexExpr):
+        if not self._is_location_prefix(ast):
+            keys, arr = [], ast
+            while isinstance(arr, IndexExpr):
+                keys.append(arr.key)
+                arr = arr.arr
+            if isinstance(arr, IdentifierExpr):
+                self._add_read(ast, arr, list(reversed(keys)))
+        self.visitChildren(ast)
+
+    def visit_list(self, l: List[AST]):
+        for elem in l:
+            self.visit(elem)
+
+    def _add_read(self, loc: LocationExpr, idf: IdentifierExpr, keys: List[Expression]):
+        if isinstance(idf.target, StateVariableDeclaration) and loc.is_rvalue() and not PythonOffchainVisitor.is_special_var(idf.idf):
+            self.reads.append((idf.target, keys))
+
+    @staticmethod
+    def _is_location_prefix(ast: LocationExpr) -> bool:
+        return (isinstance(ast.parent, IndexExpr) and ast.parent.arr is ast) or (isinstance(ast.parent, MemberAccessExpr) and ast.parent.expr is ast)
+
+
 class PythonOffchainVisitor(PythonCodeVisitor):
     """
     This visitor generates python code which is able to deploy, connect to and issue transactions for the specified contract.
@@ -53,6 +108,8 @@ class PythonOffchainVisitor(PythonCodeVisitor):
     If a require statement fails during simulation, a RequireException is raised.
     When a state variable is read before it is written in a transaction, its initial value is pulled from the blockchain.
     Required foreign public keys are also downloaded from the PKI contract on the block chain.
+    Within the async_transactions context of a contract instance, functions return a future for the transaction receipt
+    instead of waiting until the proof is generated and the transaction is mined.
 
     The main function simply loads the zkay configuration from the circuit's manifest, generates encryption keys if necessary
     and enters an interactive python shell.
@@ -81,7 +138,7 @@ class PythonOffchainVisitor(PythonCodeVisitor):
             'api', 'locals', 'state',
 
             # base class functions
-            '_scope', '_function_ctx', 'default_address', 'initialize_keys_for', 'use_config_from_manifest', 'create_dummy_accounts',
+            '_scope', '_function_ctx', 'async_transactions', 'default_address', 'initialize_keys_for', 'use_config_from_manifest', 'create_dummy_accounts',
 
             # Globals
             'os', 'IntEnum', 'Dict', 'List', 'Tuple', 'Optional', 'Union', 'Any',
@@ -337,6 +394,63 @@ class PythonOffchainVisitor(PythonCodeVisitor):
         else:
             return intern_s
 
+    def generate_state_prefetch(self, ast: ConstructorOrFunctionDefinition) -> str:
+        """
+        Return python code which requests all state locations that are read during the simulation of ast at once.
+
+        Reads in (transitively) called functions are included. Only locations whose index keys depend exclusively on literals,
+        msg.sender and unmodified parameters of ast are included, all other locations are requested lazily when they are accessed.
+        Reads within branches which might not be taken are included as well (see StateDict.prefetch).
+        """
+        params = {p: self.visit(p.idf) for p in self.current_params if not p.annotated_type.is_cipher()}
+        keys = []
+        self._collect_state_reads(ast, params, keys, [])
+        return f'# Request state values\nself.state.prefetch([{", ".join(keys)}])' if keys else ''
+
+    def _collect_state_reads(self, fct: ConstructorOrFunctionDefinition, params: Dict[Parameter, Optional[str]], keys: List[str],
+                             call_stack: List[ConstructorOrFunctionDefinition]):
+        """
+        Add the python location keys of all prefetchable state reads within fct to keys.
+
+        :param params: maps the parameters of fct to the python code of their (prefetchable) argument values
+        """
+        if fct in call_stack:
+            return
+        collector = StateReadCollector()
+        collector.visit(fct.body)
+        params = {p: None if p in collector.modified_params else code for p, code in params.items()}
+
+        for sv, key_exprs in collector.reads:
+            key_vals = [self._get_prefetch_key(e, params) for e in key_exprs]
+            if all(k is not None for k in key_vals):
+                key = f'("{sv.idf.name}", {", ".join(key_vals)})' if key_vals else f'("{sv.idf.name}", )'
+                if key not in keys:
+                    keys.append(key)
+
+        for call in collector.calls:
+            callee = call.func.target
+            callee_params = {p: self._get_prefetch_key(arg, params) for p, arg in zip(callee.parameters, call.args)}
+            self._collect_state_reads(callee, callee_params, keys, call_stack + [fct])
+
+    def _get_prefetch_key(self, expr: Expression, params: Dict[Parameter, Optional[str]]) -> Optional[str]:
+        """Return python code for expr if its value is known at the beginning of the transaction, otherwise None."""
+        if isinstance(expr, (NumberLiteralExpr, BooleanLiteralExpr)):
+            return self.visit(expr)
+        elif isinstance(expr, PrimitiveCastExpr):
+            e = self._get_prefetch_key(expr.expr, params)
+            if e is None or not expr.is_implicit:
+                return None if e is None else self.handle_cast(e, expr.elem_type)
+            elif isinstance(expr.expr, NumberLiteralExpr) and expr.annotated_type.is_address():
+                return f'AddressValue({e})'
+            else:
+                return e
+        elif isinstance(expr, IdentifierExpr):
+            return params.get(expr.target, None)
+        elif isinstance(expr, MemberAccessExpr) and isinstance(expr.expr, IdentifierExpr) \
+                and expr.expr.idf.name == 'msg' and expr.member.name == 'sender':
+            return 'msg.sender'
+        return None
+
     def handle_function_body(self, ast: ConstructorOrFunctionDefinition):
         """
         Return offchain simulation python code for the body of function ast.
@@ -414,6 +528,12 @@ class PythonOffchainVisitor(PythonCodeVisitor):
         else:
             pre_body_code = ''
 
+        # Request all state values, which are known to be read by the simulation, at once
+        if ast.can_be_external and not ast.is_constructor:
+            prefetch_str = self.generate_state_prefetch(ast)
+            if prefetch_str:
+                pre_body_code = '\n\n'.join(s for s in [pre_body_code, self.do_if_external(ast, [prefetch_str])] if s)
+
         # Simulate public contract to compute in_values (state variable values are pulled from blockchain if necessary)
         # (out values are also computed when encountered, by locally evaluating and encrypting
         # the corresponding private expressions)
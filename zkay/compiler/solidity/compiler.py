@@ -1,9 +1,11 @@
+import hashlib
 import json
 import os
 import pathlib
 import tempfile
+import threading
 # get relevant paths
-from typing import Optional, Dict, Tuple
+from typing import Optional, Dict, Tuple, List
 
 from solcx import compile_standard
 from solcx.exceptions import SolcError
@@ -27,7 +29,7 @@ def compile_solidity_json(sol_filename: str, libs: Optional[Dict[str, str]] = No
     :param libs: [OPTIONAL] dictionary containing <LibraryContractName, LibraryContractAddress> pairs, used for linking
     :param optimizer_runs: controls the optimize-runs flag, negative values disable the optimizer
     :param output_selection: determines which fields are included in the compiler output dict
-    :param cwd: working directory
+    :param cwd: base path relative to which imports are resolved (default: directory of sol_filename)
     :return: dictionary with the compilation results according to output_selection
     """
     solp = pathlib.Path(sol_filename)
@@ -60,13 +62,122 @@ def compile_solidity_json(sol_filename: str, libs: Optional[Dict[str, str]] = No
 
     if cwd is None:
         cwd = solp.absolute().parent
-    old_cwd = os.getcwd()
-    os.chdir(cwd)
-    ret = compile_standard(json_in, allow_paths='.')
-    os.chdir(old_cwd)
+    base_path = str(pathlib.Path(cwd).absolute())
+
+    # Imports are resolved relative to base_path, no need to change the (process-wide) working directory
+    with open(solp) as f:
+        code = f.read()
+    cache_key = _solc_cache_key(solp.name, code, json_in)
+    ret = _load_cached_output(cache_key, solp, base_path)
+    if ret is None:
+        allow_paths = sorted({base_path, str(solp.absolute().parent)})
+        ret = compile_standard(json_in, base_path=base_path, allow_paths=allow_paths)
+        _store_cached_output(cache_key, solp, base_path, ret)
     return ret
 
 
+_solc_cache_lock = threading.Lock()
+_solc_cache_usage: Dict[str, int] = {}
+"""Estimated size (in bytes) per cache directory, determined by a scan when the first entry is stored"""
+
+
+def _solc_cache_dir() -> str:
+    return os.path.join(cfg.data_dir, 'solc_cache')
+
+
+def _solc_cache_key(source_name: str, code: str, json_in: Dict) -> str:
+    """Hash of everything the compiler output depends on, except for the content of imported files."""
+    settings = json.dumps({
+        'solc': cfg.solc_version,
+        'source': [source_name, hashlib.sha256(code.encode()).hexdigest()],
+        'settings': json_in['settings'],
+    }, sort_keys=True)
+    return hashlib.sha256(settings.encode()).hexdigest()
+
+
+def _source_path(source_name: str, solp: pathlib.Path, base_path: str) -> pathlib.Path:
+    return solp if source_name == solp.name else pathlib.Path(base_path, source_name)
+
+
+def _file_hash(path: pathlib.Path) -> Optional[str]:
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _load_cached_output(cache_key: str, solp: pathlib.Path, base_path: str) -> Optional[Dict]:
+    if cfg.solc_cache_size_mb <= 0:
+        return None
+    filename = os.path.join(_solc_cache_dir(), f'{cache_key}.json')
+    try:
+        with open(filename) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    # The output is only valid if all (transitively) imported files are unchanged
+    for source_name, digest in entry['sources'].items():
+        if _file_hash(_source_path(source_name, solp, base_path)) != digest:
+            return None
+    try:
+        os.utime(filename)  # Mark as recently used
+    except OSError:
+        pass
+    return entry['output']
+
+
+def _store_cached_output(cache_key: str, solp: pathlib.Path, base_path: str, output: Dict):
+    if cfg.solc_cache_size_mb <= 0 or 'sources' not in output:
+        return
+    sources = {name: _file_hash(_source_path(name, solp, base_path)) for name in output['sources']}
+    if None in sources.values():
+        return
+
+    cache_dir = _solc_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    filename = os.path.join(cache_dir, f'{cache_key}.json')
+    tmp_file = f'{filename}.{os.getpid()}.{threading.get_ident()}.tmp'
+    data = json.dumps({'sources': sources, 'output': output}).encode('utf-8')
+    with open(tmp_file, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_file, filename)
+
+    # The directory is only scanned again once the estimated size exceeds the limit
+    max_size = cfg.solc_cache_size_mb * 1024 * 1024
+    with _solc_cache_lock:
+        usage = _solc_cache_usage.get(cache_dir)
+        usage = _evict_cached_outputs(cache_dir, max_size) if usage is None else usage + len(data)
+        if usage > max_size:
+            # Leave some room, such that the directory is not scanned again on the next store
+            usage = _evict_cached_outputs(cache_dir, max_size * 3 // 4)
+        _solc_cache_usage[cache_dir] = usage
+
+
+def _evict_cached_outputs(cache_dir: str, max_size: int) -> int:
+    """Remove the least recently used cache entries until the cache is at most max_size bytes large, return its size."""
+    entries: List[Tuple[float, int, str]] = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.json'):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # Removed concurrently
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total_size -= size
+    return total_size
+
+
 def _get_line_col(code: str, idx: int):
     """ Get line and column (1-based) from character index """
     line = len(code[:idx + 1].splitlines())
@@ -158,7 +269,7 @@ def compile_solidity_code(code: str, working_directory: Optional[str] = None, op
     Compile the given solidity code with default settings.
 
     :param code: code to compile
-    :param working_directory: (Optional) compiler working directory
+    :param working_directory: (Optional) base path relative to which imports are resolved
     :param optimizer_runs: solc optimizer argument "runs", a negative value disables the optimizer
     :return: json compilation output
     """
@@ -172,3 +283,29 @@ def compile_solidity_code(code: str, working_directory: Optional[str] = None, op
         f.write(code)
         f.flush()
         return compile_solidity_json(f.name, cwd=working_directory, optimizer_runs=optimizer_runs)
+
+
+def get_static_gas_estimates(sol_filename: str, exclude: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Compute solc's static gas estimates for the external functions of all contracts in the given file.
+
+    Functions with an infinite (i.e. data dependent) estimate and overloaded functions are omitted.
+
+    :param sol_filename: path to solidity file
+    :param exclude: [OPTIONAL] names of functions to omit
+    :return: dictionary <ContractName, <FunctionName, Gas>>
+    """
+    exclude = set() if exclude is None else set(exclude)
+    ret = compile_solidity_json(sol_filename, optimizer_runs=cfg.opt_solc_optimizer_runs, output_selection=('evm.gasEstimates',))
+    estimates = {}
+    for contract_name, contract in ret['contracts'][pathlib.Path(sol_filename).name].items():
+        fct_estimates, seen, overloaded = {}, set(), set()
+        for signature, gas in contract['evm'].get('gasEstimates', {}).get('external', {}).items():
+            name = signature[:signature.index('(')]
+            if name in seen:
+                overloaded.add(name)
+            seen.add(name)
+            if name not in exclude and gas.isdigit():
+                fct_estimates[name] = int(gas)
+        estimates[contract_name] = {name: gas for name, gas in fct_estimates.items() if name not in overloaded}
+    return estimates
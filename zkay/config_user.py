@@ -63,9 +63,29 @@ class UserConfig:
         self._blockchain_pki_address: str = ''
         self._blockchain_crypto_lib_addresses: str = ''
         self._blockchain_default_account: Union[int, str, None] = 0
+        self._blockchain_receipt_poll_interval_ms: int = 100
+        self._blockchain_gas_estimate_cache: bool = False
+        self._blockchain_state_mirror: bool = False
+        self._blockchain_block_poll_interval_ms: int = 1000
 
         self._indentation: str = ' ' * 4
         self._libsnark_check_verify_locally_during_proof_generation: bool = False
+        self._use_jsnark_prover_daemon: bool = True
+        self._keygen_memory_limit_mb: int = 0
+        self._prover_pool_size: int = 0
+        self._prover_memory_limit_mb: int = 0
+        self._decryption_cache_size: int = 0
+        self._decryption_disk_cache: bool = False
+        self._decryption_disk_cache_size_mb: int = 64
+        self._ecdh_shared_key_cache_size: int = 1024
+        self._ecdh_shared_key_disk_cache: bool = False
+        self._elgamal_dlog_bits: int = 32
+        self._elgamal_dlog_table_bits: int = 16
+        self._elgamal_pk_table_cache_size: int = 16
+        self._elgamal_pk_table_threshold: int = 4
+        self._randomness_pool_depth: int = 0
+        self._solc_cache_size_mb: int = 64
+        self._circuit_cache_size_mb: int = 0
 
         self._opt_solc_optimizer_runs: int = 50
         self._opt_hash_threshold: int = 1
@@ -234,6 +254,69 @@ class UserConfig:
         _type_check(val, (int, str, None))
         self._blockchain_default_account = val
 
+    @property
+    def blockchain_receipt_poll_interval_ms(self) -> int:
+        """
+        Interval (in milliseconds) in which the receipts of outstanding transactions are polled.
+
+        The receipts of all outstanding transactions are requested by a single background thread.
+        """
+        return self._blockchain_receipt_poll_interval_ms
+
+    @blockchain_receipt_poll_interval_ms.setter
+    def blockchain_receipt_poll_interval_ms(self, val: int):
+        _type_check(val, int)
+        self._blockchain_receipt_poll_interval_ms = val
+
+    @property
+    def blockchain_gas_estimate_cache(self) -> bool:
+        """
+        If true, gas estimates are cached per (contract, function, argument array lengths) instead of being requested before
+        every transaction, and the zkay compiler stores the static solc gas estimates of all functions without proof
+        verification in gas_estimates.json (used until a function was estimated once).
+
+        Cached estimates may be too low if the gas usage of a function depends on its argument values, and static estimates
+        may be too low since solc does not account for the current storage access costs. The estimate of a transaction
+        which runs out of gas is discarded, and the transaction is resubmitted once with a new estimate.
+        """
+        return self._blockchain_gas_estimate_cache
+
+    @blockchain_gas_estimate_cache.setter
+    def blockchain_gas_estimate_cache(self, val: bool):
+        _type_check(val, bool)
+        self._blockchain_gas_estimate_cache = val
+
+    @property
+    def blockchain_state_mirror(self) -> bool:
+        """
+        If true, every connected contract keeps a local copy of all state values it requested from the chain.
+
+        State reads outside of transactions (e.g. state.get_plain) are served from this copy. It is cleared whenever a new
+        block is observed (see blockchain_block_poll_interval_ms) or a transaction of the contract instance is mined.
+        Transactions are always simulated on freshly requested state.
+        """
+        return self._blockchain_state_mirror
+
+    @blockchain_state_mirror.setter
+    def blockchain_state_mirror(self, val: bool):
+        _type_check(val, bool)
+        self._blockchain_state_mirror = val
+
+    @property
+    def blockchain_block_poll_interval_ms(self) -> int:
+        """
+        Interval (in milliseconds) in which the current block number is polled while state mirrors exist.
+
+        This is the maximum time for which the state mirror may return outdated values after another party changed the state.
+        The cached block gas limit is requested again after the same interval.
+        """
+        return self._blockchain_block_poll_interval_ms
+
+    @blockchain_block_poll_interval_ms.setter
+    def blockchain_block_poll_interval_ms(self, val: int):
+        _type_check(val, int)
+        self._blockchain_block_poll_interval_ms = val
+
     @property
     def indentation(self) -> str:
         """Specifies the identation which should be used for the generated code output."""
@@ -255,6 +338,243 @@ class UserConfig:
         _type_check(val, bool)
         self._libsnark_check_verify_locally_during_proof_generation = val
 
+    @property
+    def use_jsnark_prover_daemon(self) -> bool:
+        """
+        If true, circuits are evaluated in a long-lived jsnark jvm during proof generation instead of starting a new jvm per proof.
+
+        If the daemon cannot be started, zkay automatically falls back to a new jvm per proof.
+        """
+        return self._use_jsnark_prover_daemon
+
+    @use_jsnark_prover_daemon.setter
+    def use_jsnark_prover_daemon(self, val: bool):
+        _type_check(val, bool)
+        self._use_jsnark_prover_daemon = val
+
+    @property
+    def keygen_memory_limit_mb(self) -> int:
+        """
+        Memory ceiling (in MiB) for key generation, keys for multiple circuits are only generated in parallel
+        as long as their combined estimated peak memory usage stays below this limit (0 = currently available memory).
+        """
+        return self._keygen_memory_limit_mb
+
+    @keygen_memory_limit_mb.setter
+    def keygen_memory_limit_mb(self, val: int):
+        _type_check(val, int)
+        if val < 0:
+            raise ValueError('keygen_memory_limit_mb must not be negative')
+        self._keygen_memory_limit_mb = val
+
+    @property
+    def prover_pool_size(self) -> int:
+        """Maximum number of proofs which are generated concurrently by the prover pool (0 = number of cores)."""
+        return self._prover_pool_size
+
+    @prover_pool_size.setter
+    def prover_pool_size(self, val: int):
+        _type_check(val, int)
+        if val < 0:
+            raise ValueError('prover_pool_size must not be negative')
+        self._prover_pool_size = val
+
+    @property
+    def prover_memory_limit_mb(self) -> int:
+        """
+        Memory ceiling (in MiB) for the prover pool, proofs are only generated in parallel
+        as long as their combined estimated peak memory usage stays below this limit (0 = currently available memory).
+        """
+        return self._prover_memory_limit_mb
+
+    @prover_memory_limit_mb.setter
+    def prover_memory_limit_mb(self, val: int):
+        _type_check(val, int)
+        if val < 0:
+            raise ValueError('prover_memory_limit_mb must not be negative')
+        self._prover_memory_limit_mb = val
+
+    @property
+    def decryption_cache_size(self) -> int:
+        """
+        Maximum number of decryption results per crypto backend which are kept in memory (0 disables the cache).
+
+        Results are indexed by (owner address, hash of the cipher text), such that decrypting an unchanged cipher text
+        again (e.g. when repeatedly displaying a balance) does not repeat the decryption.
+        """
+        return self._decryption_cache_size
+
+    @decryption_cache_size.setter
+    def decryption_cache_size(self, val: int):
+        _type_check(val, int)
+        self._decryption_cache_size = val
+
+    @property
+    def decryption_disk_cache(self) -> bool:
+        """
+        If true, decryption results are additionally stored (encrypted with a random key per owner, which is stored in the
+        key directory) in the data directory, such that decryption of known cipher texts is skipped across runs.
+        The size of the stored results is bounded by decryption_disk_cache_size_mb.
+        """
+        return self._decryption_disk_cache
+
+    @decryption_disk_cache.setter
+    def decryption_disk_cache(self, val: bool):
+        _type_check(val, bool)
+        self._decryption_disk_cache = val
+
+    @property
+    def decryption_disk_cache_size_mb(self) -> int:
+        """
+        Maximum size (in MiB) of the decryption results which are stored in the data directory (see decryption_disk_cache).
+
+        If the limit is exceeded, the least recently used results are removed until the cache is at most 3/4 of this size.
+        """
+        return self._decryption_disk_cache_size_mb
+
+    @decryption_disk_cache_size_mb.setter
+    def decryption_disk_cache_size_mb(self, val: int):
+        _type_check(val, int)
+        if val < 0:
+            raise ValueError('decryption_disk_cache_size_mb must not be negative')
+        self._decryption_disk_cache_size_mb = val
+
+    @property
+    def ecdh_shared_key_cache_size(self) -> int:
+        """Maximum number of derived ECDH symmetric keys which are kept in memory (0 disables the cache)."""
+        return self._ecdh_shared_key_cache_size
+
+    @ecdh_shared_key_cache_size.setter
+    def ecdh_shared_key_cache_size(self, val: int):
+        _type_check(val, int)
+        self._ecdh_shared_key_cache_size = val
+
+    @property
+    def ecdh_shared_key_disk_cache(self) -> bool:
+        """
+        If true, derived ECDH symmetric keys are additionally stored in the data directory (AES-GCM encrypted with a key which
+        is derived from the own secret key using HKDF), such that key agreement with known peers is skipped across runs.
+        """
+        return self._ecdh_shared_key_disk_cache
+
+    @ecdh_shared_key_disk_cache.setter
+    def ecdh_shared_key_disk_cache(self, val: bool):
+        _type_check(val, bool)
+        self._ecdh_shared_key_disk_cache = val
+
+    @property
+    def elgamal_dlog_bits(self) -> int:
+        """
+        Maximum bit width of plaintexts which can be decrypted with the elgamal crypto backend.
+
+        Decryption requires a discrete logarithm computation whose time grows with 2^(elgamal_dlog_bits - elgamal_dlog_table_bits).
+        """
+        return self._elgamal_dlog_bits
+
+    @elgamal_dlog_bits.setter
+    def elgamal_dlog_bits(self, val: int):
+        _type_check(val, int)
+        if not 1 <= val <= 63:
+            raise ValueError('elgamal_dlog_bits must be between 1 and 63')
+        self._elgamal_dlog_bits = val
+
+    @property
+    def elgamal_dlog_table_bits(self) -> int:
+        """
+        Discrete logarithms for elgamal decryption use a precomputed table with 2^elgamal_dlog_table_bits entries (24 bytes per entry).
+
+        Large tables should be generated once using 'zkay generate-dlog-table', they are then memory-mapped from the data directory.
+        Smaller tables (with up to 2^24 entries) are computed in memory when first needed if they were not generated,
+        decryption fails for larger tables which were not generated.
+        """
+        return self._elgamal_dlog_table_bits
+
+    @elgamal_dlog_table_bits.setter
+    def elgamal_dlog_table_bits(self, val: int):
+        _type_check(val, int)
+        if not 0 <= val <= 32:
+            raise ValueError('elgamal_dlog_table_bits must be between 0 and 32')
+        self._elgamal_dlog_table_bits = val
+
+    @property
+    def elgamal_pk_table_cache_size(self) -> int:
+        """Maximum number of recipient public keys for which elgamal encryption keeps a precomputed table (0 disables the tables)."""
+        return self._elgamal_pk_table_cache_size
+
+    @elgamal_pk_table_cache_size.setter
+    def elgamal_pk_table_cache_size(self, val: int):
+        _type_check(val, int)
+        self._elgamal_pk_table_cache_size = val
+
+    @property
+    def elgamal_pk_table_threshold(self) -> int:
+        """
+        Number of elgamal encryptions or re-randomizations for the same recipient public key after which
+        a precomputed table for that key is built.
+
+        Building a table costs roughly as much as 5 generic scalar multiplications, afterwards the multiplication with the key becomes several times faster.
+        """
+        return self._elgamal_pk_table_threshold
+
+    @elgamal_pk_table_threshold.setter
+    def elgamal_pk_table_threshold(self, val: int):
+        _type_check(val, int)
+        self._elgamal_pk_table_threshold = val
+
+    @property
+    def randomness_pool_depth(self) -> int:
+        """
+        Number of plaintext-independent encryption values (paillier: (r, r^n mod n^2), elgamal: (r, r*G, r*pk))
+        which are precomputed in a background thread per recipient public key (0 disables the pools).
+
+        Pools are refilled once they are half empty. Encryptions which find an empty pool compute the values on demand.
+        """
+        return self._randomness_pool_depth
+
+    @randomness_pool_depth.setter
+    def randomness_pool_depth(self, val: int):
+        _type_check(val, int)
+        self._randomness_pool_depth = val
+
+    @property
+    def solc_cache_size_mb(self) -> int:
+        """
+        Maximum size (in MiB) of the on-disk cache of solc compilation results in the data directory (0 disables the cache).
+
+        Entries are keyed by source hash, solc version and compiler settings (optimizer, linked libraries),
+        and are only used if none of the imported files changed. Once the limit is exceeded, the least recently used entries
+        are removed until the cache is at most 3/4 of this size.
+        """
+        return self._solc_cache_size_mb
+
+    @solc_cache_size_mb.setter
+    def solc_cache_size_mb(self, val: int):
+        _type_check(val, int)
+        if val < 0:
+            raise ValueError('solc_cache_size_mb must not be negative')
+        self._solc_cache_size_mb = val
+
+    @property
+    def circuit_cache_size_mb(self) -> int:
+        """
+        Maximum size (in MiB) of the global cache of compiled circuits and their keys in the data directory
+        (0 disables the cache, which is the default).
+
+        Compiling a circuit which is already in the cache (in any output directory) reuses the cached circuit and keys,
+        which are shared via hardlinks or reflinks where possible and copied otherwise (e.g. if the data directory is on
+        a different file system), so proving keys may take up to this much additional disk space. To enable the cache,
+        set a limit such as 16384 via '--circuit-cache-size-mb' or in config.json. The least recently used entries are
+        removed whenever an entry is added, or explicitly with 'zkay cache gc'.
+        """
+        return self._circuit_cache_size_mb
+
+    @circuit_cache_size_mb.setter
+    def circuit_cache_size_mb(self, val: int):
+        _type_check(val, int)
+        if val < 0:
+            raise ValueError('circuit_cache_size_mb must not be negative')
+        self._circuit_cache_size_mb = val
+
     @property
     def opt_solc_optimizer_runs(self) -> int:
         """SOLC: optimize for how many times to run the code"""
@@ -6,4 +6,5 @@ Submodules
 ==========
 * :py:mod:`.jsnark_interface`: Jsnark circuit compilation and evaluation (preparation steps for key and proof generation).
 * :py:mod:`.libsnark_interface`: Libsnark key and proof generation.
+* :py:mod:`.prover_daemon`: Long-lived jsnark jvm for circuit evaluation during proof generation.
 """
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""
+Compilation of many jsnark circuits in a single JVM.
+
+Compiling every circuit with separate javac and java processes starts two JVMs (each reserving its initial heap) per circuit.
+The batch compiler instead compiles all circuit classes in-process using the javax.tools compiler API and builds the circuits
+on a shared thread pool (jsnark supports one circuit generator per thread). Results are reported per circuit via stdout.
+"""
+
+import os
+import shutil
+import tempfile
+import zipfile
+from typing import Dict, List, Optional
+
+from zkay.config import cfg, zk_print
+from zkay.utils.helpers import hash_string
+from zkay.utils.run_command import run_command
+
+_compiler_classname = 'ZkayBatchCompiler'
+
+_compiler_src = '' + '''\
+import java.io.File;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.PrintStream;
+import java.io.StringWriter;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.StandardCopyOption;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.List;
+import java.util.concurrent.ExecutionException;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.Future;
+import javax.tools.JavaCompiler;
+import javax.tools.StandardJavaFileManager;
+import javax.tools.ToolProvider;
+
+import zkay.ZkayCircuitBase;
+
+public class {compiler_class_name} {{
+    // jsnark writes circuit files into the working directory, which is shared by all circuits
+    private static final Object outputLock = new Object();
+
+    private static void compile(JavaCompiler javac, File circuitDir, String className, File workingDir) throws Exception {{
+        File source = new File(circuitDir, className + ".java");
+        StringWriter diagnostics = new StringWriter();
+        try (StandardJavaFileManager fileManager = javac.getStandardFileManager(null, null, StandardCharsets.UTF_8)) {{
+            List<String> options = Arrays.asList("-cp", System.getProperty("java.class.path"), "-d", circuitDir.getPath());
+            if (!javac.getTask(diagnostics, fileManager, null, options, null, fileManager.getJavaFileObjects(source)).call()) {{
+                throw new RuntimeException("javac failed: " + diagnostics);
+            }}
+        }}
+
+        try (URLClassLoader loader = new URLClassLoader(new URL[]{{circuitDir.toURI().toURL()}},
+                                                         {compiler_class_name}.class.getClassLoader())) {{
+            ZkayCircuitBase circuit = (ZkayCircuitBase) loader.loadClass(className).getConstructor().newInstance();
+            Method compileCircuit = ZkayCircuitBase.class.getDeclaredMethod("compileCircuit");
+            compileCircuit.setAccessible(true);
+            compileCircuit.invoke(circuit);
+
+            synchronized (outputLock) {{
+                circuit.prepFiles();
+                for (String ext : new String[]{{".arith", ".in"}}) {{
+                    String fname = circuit.getName() + ext;
+                    Files.move(new File(workingDir, fname).toPath(), new File(circuitDir, fname).toPath(),
+                               StandardCopyOption.REPLACE_EXISTING);
+                }}
+            }}
+        }}
+    }}
+
+    public static void main(String[] args) throws Exception {{
+        PrintStream response = new PrintStream(new FileOutputStream(FileDescriptor.out), true, "UTF-8");
+        // Circuit compilation prints progress information, keep it out of the response stream
+        System.setOut(System.err);
+
+        // Arguments: num_threads class_name circuit_dirs...
+        int numThreads = Integer.parseInt(args[0]);
+        String className = args[1];
+        File workingDir = new File(".").getAbsoluteFile();
+        JavaCompiler javac = ToolProvider.getSystemJavaCompiler();
+        if (javac == null) {{
+            throw new IllegalStateException("No java compiler available");
+        }}
+
+        ExecutorService pool = Executors.newFixedThreadPool(numThreads);
+        List<Future<?>> results = new ArrayList<>();
+        for (int i = 2; i < args.length; i++) {{
+            File circuitDir = new File(args[i]);
+            results.add(pool.submit(() -> {{
+                compile(javac, circuitDir, className, workingDir);
+                return null;
+            }}));
+        }}
+        for (int i = 0; i < results.size(); i++) {{
+            try {{
+                results.get(i).get();
+                response.println("ok\\t" + args[i + 2]);
+            }} catch (ExecutionException e) {{
+                Throwable cause = e.getCause();
+                if (cause instanceof InvocationTargetException) {{
+                    cause = cause.getCause();
+                }}
+                cause.printStackTrace();
+                response.println("error\\t" + args[i + 2] + "\\t" + String.valueOf(cause).replace('\\n', ' '));
+            }}
+        }}
+        pool.shutdown();
+    }}
+}}
+'''
+"""Java code of the batch compiler"""
+
+
+def _compile_batch_compiler(circuit_builder_jar: str, circuit_builder_jar_hash: str) -> str:
+    """Compile the batch compiler class (once per jar and compiler code version) and return the directory which contains it."""
+    code = _compiler_src.format(compiler_class_name=_compiler_classname)
+    digest = hash_string((circuit_builder_jar_hash + code).encode('utf-8')).hex()
+    compiler_dir = os.path.join(cfg.data_dir, 'jsnark_batch_compiler', digest[:32])
+    if not os.path.exists(os.path.join(compiler_dir, f'{_compiler_classname}.class')):
+        os.makedirs(compiler_dir, exist_ok=True)
+        jfile = os.path.join(compiler_dir, f'{_compiler_classname}.java')
+        with open(jfile, 'w') as f:
+            f.write(code)
+        run_command(['javac', '-cp', f'{circuit_builder_jar}', jfile], cwd=compiler_dir)
+    return compiler_dir
+
+
+def _write_parallel_config(circuit_builder_jar: str, working_dir: str):
+    """Store a copy of the jsnark configuration with parallel circuit generators enabled in working_dir (where jsnark looks first)."""
+    with zipfile.ZipFile(circuit_builder_jar) as jar:
+        lines = jar.read('config.properties').decode('utf-8').splitlines()
+    lines = [line for line in lines if not line.strip().startswith('RUNNING_GENERATORS_IN_PARALLEL')]
+    with open(os.path.join(working_dir, 'config.properties'), 'w') as f:
+        f.write('\n'.join(lines + ['RUNNING_GENERATORS_IN_PARALLEL=1', '']))
+
+
+def compile_circuits(circuit_builder_jar: str, circuit_builder_jar_hash: str, circuit_dirs: List[str], num_threads: int) -> Dict[str, Optional[str]]:
+    """
+    Compile the circuit classes in circuit_dirs and generate their circuit files using a single JVM.
+
+    :param circuit_builder_jar: path to the jsnark interface jar
+    :param circuit_builder_jar_hash: hash of the jsnark interface jar
+    :param circuit_dirs: directories which contain the circuit java code (cfg.jsnark_circuit_classname.java)
+    :param num_threads: number of circuits which are built in parallel
+    :raise SubprocessError: if the batch compiler JVM fails
+    :return: dictionary which maps each circuit directory to None on success and to an error message on failure
+    """
+    compiler_dir = _compile_batch_compiler(circuit_builder_jar, circuit_builder_jar_hash)
+    working_dir = tempfile.mkdtemp(prefix='zkay_batch_compiler_')
+    try:
+        _write_parallel_config(circuit_builder_jar, working_dir)
+        circuit_dirs = [os.path.abspath(d) for d in circuit_dirs]
+        out, _ = run_command(['java', '-Xms4096m', '-Xmx16384m', '-cp', f'{circuit_builder_jar}:{compiler_dir}',
+                              _compiler_classname, str(num_threads), cfg.jsnark_circuit_classname, *circuit_dirs], cwd=working_dir)
+    finally:
+        shutil.rmtree(working_dir, ignore_errors=True)
+
+    results = {d: 'No result reported' for d in circuit_dirs}
+    for line in out.splitlines():
+        status, circuit_dir, *msg = line.split('\t')
+        results[circuit_dir] = None if status == 'ok' else '\t'.join(msg)
+        zk_print(f'Compiled circuit in {circuit_dir}' if status == 'ok' else f'Failed to compile circuit in {circuit_dir}',
+                 verbosity_level=2)
+    return results
@@ -1,8 +1,11 @@
 import os
-from typing import List
+from subprocess import SubprocessError
+from typing import Any, Callable, List, Optional, Tuple
 
 from zkay.compiler.privacy.circuit_generation.circuit_helper import CircuitHelper
-from zkay.config import cfg
+from zkay.config import cfg, zk_print
+from zkay.jsnark_interface import batch_compiler
+from zkay.jsnark_interface.prover_daemon import create_daemon, CircuitEvaluationError, DaemonError
 from zkay.utils.helpers import hash_file
 from zkay.utils.run_command import run_command
 from zkay.zkay_ast.ast import indent
@@ -11,6 +14,9 @@ from zkay.zkay_ast.ast import indent
 circuit_builder_jar = os.path.join(os.path.dirname(os.path.realpath(__file__)),  'JsnarkCircuitBuilder.jar')
 circuit_builder_jar_hash = hash_file(circuit_builder_jar).hex()
 
+# long-lived jvm used for circuit evaluation during proof generation
+prover_daemon = create_daemon(circuit_builder_jar, circuit_builder_jar_hash)
+
 
 def compile_circuit(circuit_dir: str, javacode: str):
     """
@@ -28,6 +34,32 @@ def compile_circuit(circuit_dir: str, javacode: str):
     compile_and_run_with_circuit_builder(circuit_dir, class_name, jfile, ['compile'])
 
 
+def compile_circuits(circuits: List[Tuple[str, str]], num_threads: int, on_success: Optional[Callable[[str], Any]] = None):
+    """
+    Compile multiple circuits (same as compile_circuit for each circuit) in a single JVM.
+
+    :param circuits: list of (output directory, circuit code) pairs
+    :param num_threads: maximum number of circuits which are compiled in parallel
+    :param on_success: called with the output directory of every successfully compiled circuit \
+                       (also if compilation fails for other circuits)
+    :raise SubprocessError: if compilation fails for any circuit
+    """
+    for circuit_dir, javacode in circuits:
+        with open(os.path.join(circuit_dir, cfg.jsnark_circuit_classname + ".java"), 'w') as f:
+            f.write(javacode)
+
+    results = batch_compiler.compile_circuits(circuit_builder_jar, circuit_builder_jar_hash, [d for d, _ in circuits], num_threads)
+    errors = []
+    for circuit_dir, _ in circuits:
+        msg = results[os.path.abspath(circuit_dir)]
+        if msg is not None:
+            errors.append(f'{circuit_dir}: {msg}')
+        elif on_success is not None:
+            on_success(circuit_dir)
+    if errors:
+        raise SubprocessError('Circuit compilation failed for:\n' + '\n'.join(errors))
+
+
 def compile_and_run_with_circuit_builder(working_dir, class_name, java_file_name, args: List[str]):
     # Compile the circuit java file
     run_command(['javac', '-cp', f'{circuit_builder_jar}', java_file_name], cwd=working_dir)
@@ -48,6 +80,16 @@ def prepare_proof(circuit_dir: str, output_dir: str, serialized_args: List[int])
     """
     serialized_arg_str = [format(arg, 'x') for arg in serialized_args]
 
+    if cfg.use_jsnark_prover_daemon and prover_daemon.is_available:
+        try:
+            prover_daemon.prepare_proof(circuit_dir, output_dir, serialized_arg_str)
+            return
+        except CircuitEvaluationError as e:
+            raise SubprocessError(str(e))
+        except DaemonError as e:
+            # Daemon unavailable, fall back to a fresh jvm
+            zk_print(f'{e}, falling back to a new jsnark process', verbosity_level=2)
+
     # Run jsnark to evaluate the circuit and compute prover inputs
     run_command(['java', '-Xms4096m', '-Xmx16384m', '-cp', f'{circuit_builder_jar}:{circuit_dir}', cfg.jsnark_circuit_classname, 'prove', *serialized_arg_str], cwd=output_dir, allow_verbose=True)
 
@@ -1,4 +1,5 @@
 import os
+from typing import Dict, Tuple
 
 from zkay.config import cfg
 from zkay.utils.run_command import run_command
@@ -11,6 +12,67 @@ proving_scheme_map = {
     'gm17': 2
 }
 
+# Number of r1cs constraints added by the libsnark circuit reader for each (non-linear) gate type in circuit.arith,
+# split gates add one constraint per output bit plus one
+gate_constraints = {
+    'mul': 1,
+    'xor': 1,
+    'or': 1,
+    'assert': 1,
+    'pack': 1,
+    'zerop': 2,
+}
+
+# Rough upper bounds for the peak memory usage of libsnark key generation (keys, r1cs and qap evaluations over bn128)
+keygen_base_memory = 128 * 1024 * 1024
+keygen_memory_per_constraint = 2048
+
+# Rough upper bounds for the peak memory usage of libsnark proof generation (proving key, r1cs and witness map)
+proofgen_base_memory = 128 * 1024 * 1024
+proofgen_memory_per_constraint = 1536
+
+
+def count_constraints(input_dir: str) -> int:
+    """
+    Return the number of r1cs constraints of the circuit in input_dir.
+
+    :param input_dir: path to directory where the circuit.arith file is located
+    """
+    num_constraints = 0
+    with open(os.path.join(input_dir, 'circuit.arith')) as f:
+        for line in f:
+            gate = line.split(' ', 1)[0]
+            if gate == 'split':
+                parts = line.split()
+                num_constraints += int(parts[parts.index('out') + 1]) + 1
+            else:
+                num_constraints += gate_constraints.get(gate, 0)
+    return num_constraints
+
+
+def estimate_keygen_memory(input_dir: str) -> int:
+    """Return an estimate of the peak memory usage (in bytes) of generate_keys for the circuit in input_dir."""
+    return keygen_base_memory + count_constraints(input_dir) * keygen_memory_per_constraint
+
+
+_constraint_counts: Dict[str, Tuple[int, int, int]] = {}
+"""Maps absolute circuit directories to the size and modification time of circuit.arith and its constraint count"""
+
+
+def estimate_proofgen_memory(input_dir: str) -> int:
+    """
+    Return an estimate of the peak memory usage (in bytes) of generate_proof for the circuit in input_dir.
+
+    The constraint count is reused as long as circuit.arith is not modified.
+    """
+    st = os.stat(os.path.join(input_dir, 'circuit.arith'))
+    path = os.path.abspath(input_dir)
+    entry = _constraint_counts.get(path)
+    if entry is None or entry[:2] != (st.st_size, st.st_mtime_ns):
+        entry = (st.st_size, st.st_mtime_ns, count_constraints(input_dir))
+        _constraint_counts[path] = entry
+    return proofgen_base_memory + entry[2] * proofgen_memory_per_constraint
+
 
 def generate_keys(input_dir: str, output_dir: str, proving_scheme: str):
     """
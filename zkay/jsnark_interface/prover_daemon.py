@@ -0,0 +1,232 @@
+"""
+Long-lived jsnark JVM which evaluates circuits for proof generation.
+
+Launching a fresh JVM (and reloading the circuit builder jar) for every proof dominates the cost of jsnark witness generation.
+The prover daemon is started once per python process, keeps the compiled circuit classes of all verifier directories it has seen
+loaded and evaluates circuits on request. Requests and responses are exchanged line by line via stdin/stdout.
+"""
+
+import atexit
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import List, Optional
+
+from zkay.config import cfg, zk_print
+from zkay.utils.helpers import hash_string
+from zkay.utils.run_command import run_command
+
+_daemon_classname = 'ZkayProverDaemon'
+
+_daemon_src = '' + '''\
+import java.io.BufferedReader;
+import java.io.File;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+import java.util.Arrays;
+import java.util.HashMap;
+import java.util.Map;
+
+public class {daemon_class_name} {{
+    private static class LoadedCircuit {{
+        final long timestamp;
+        final URLClassLoader loader;
+        final Method main;
+
+        LoadedCircuit(long timestamp, URLClassLoader loader, Method main) {{
+            this.timestamp = timestamp;
+            this.loader = loader;
+            this.main = main;
+        }}
+    }}
+
+    private static final Map<String, LoadedCircuit> circuits = new HashMap<>();
+
+    private static Method getMain(String circuitDir, String className) throws Exception {{
+        File classFile = new File(circuitDir, className + ".class");
+        long timestamp = classFile.lastModified();
+        String key = circuitDir + File.pathSeparator + className;
+        LoadedCircuit circuit = circuits.get(key);
+        if (circuit == null || circuit.timestamp != timestamp) {{
+            if (circuit != null) {{
+                // Circuit was recompiled, release the outdated classes
+                circuits.remove(key);
+                circuit.loader.close();
+            }}
+            URLClassLoader loader = new URLClassLoader(new URL[]{{new File(circuitDir).toURI().toURL()}},
+                                                       {daemon_class_name}.class.getClassLoader());
+            circuit = new LoadedCircuit(timestamp, loader, loader.loadClass(className).getMethod("main", String[].class));
+            circuits.put(key, circuit);
+        }}
+        return circuit.main;
+    }}
+
+    public static void main(String[] args) throws Exception {{
+        PrintStream response = new PrintStream(new FileOutputStream(FileDescriptor.out), true, "UTF-8");
+        // Circuit evaluation prints progress information, keep it out of the response stream
+        System.setOut(System.err);
+
+        BufferedReader requests = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        String line;
+        while ((line = requests.readLine()) != null) {{
+            // Request format: circuit_dir \\t class_name \\t command \\t circuit args...
+            String[] parts = line.split("\\t");
+            try {{
+                Method main = getMain(parts[0], parts[1]);
+                main.invoke(null, (Object) Arrays.copyOfRange(parts, 2, parts.length));
+                response.println("ok");
+            }} catch (Throwable t) {{
+                Throwable cause = t instanceof InvocationTargetException ? t.getCause() : t;
+                cause.printStackTrace();
+                response.println("error " + String.valueOf(cause).replace('\\n', ' '));
+            }}
+        }}
+    }}
+}}
+'''
+"""Java code of the prover daemon"""
+
+
+class DaemonError(Exception):
+    """Exception which is raised when the prover daemon is unavailable or fails to process a request."""
+    pass
+
+
+class CircuitEvaluationError(DaemonError):
+    """Exception which is raised when the prover daemon reports that circuit evaluation failed (a fresh JVM would fail as well)."""
+    pass
+
+
+class JsnarkProverDaemon:
+    """
+    Handle to a jsnark JVM process which evaluates circuits on request.
+
+    The daemon is started lazily on the first request. Since java cannot change the working directory of a running process,
+    the daemon writes its output files into a private scratch directory, from which they are moved to the requested output
+    directory after each request.
+    """
+
+    def __init__(self, circuit_builder_jar: str, circuit_builder_jar_hash: str):
+        self.circuit_builder_jar = circuit_builder_jar
+        self.circuit_builder_jar_hash = circuit_builder_jar_hash
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._scratch_dir: Optional[str] = None
+        self._failed = False
+
+    @property
+    def is_available(self) -> bool:
+        """Return false if the daemon could not be started (callers should fall back to a fresh JVM per proof)."""
+        return not self._failed
+
+    def prepare_proof(self, circuit_dir: str, output_dir: str, serialized_arg_str: List[str]):
+        """
+        Evaluate the circuit in circuit_dir and store the resulting jsnark output files in output_dir.
+
+        :param circuit_dir: directory where the compiled circuit is located
+        :param output_dir: directory, where to store the jsnark output files
+        :param serialized_arg_str: hex encoded circuit arguments
+        :raise CircuitEvaluationError: if circuit evaluation fails
+        :raise DaemonError: if the daemon is unavailable
+        """
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._shutdown(failed=False)
+                self._start()
+
+            request = '\t'.join([os.path.abspath(circuit_dir), cfg.jsnark_circuit_classname, 'prove', *serialized_arg_str])
+            try:
+                self._process.stdin.write(f'{request}\n')
+                self._process.stdin.flush()
+                response = self._process.stdout.readline().rstrip('\n')
+            except (OSError, ValueError) as e:
+                self._shutdown(failed=False)
+                raise DaemonError(f'Lost connection to prover daemon: {e}')
+            if not response:
+                # Daemon crashed (e.g. circuit code called System.exit), it is restarted on the next request
+                self._shutdown(failed=False)
+                raise DaemonError('Prover daemon terminated unexpectedly')
+
+            # Move output files out of the scratch directory (also clears left-overs of failed requests)
+            for fname in os.listdir(self._scratch_dir):
+                src = os.path.join(self._scratch_dir, fname)
+                if response == 'ok':
+                    shutil.move(src, os.path.join(output_dir, fname))
+                else:
+                    os.remove(src)
+
+            if response != 'ok':
+                raise CircuitEvaluationError(f'Circuit evaluation failed in prover daemon: {response[len("error "):]}')
+
+    def shutdown(self):
+        """Terminate the daemon process (it is restarted on the next request)."""
+        with self._lock:
+            self._shutdown(failed=False)
+
+    def _start(self):
+        if self._failed:
+            raise DaemonError('Prover daemon is unavailable')
+        try:
+            daemon_dir = self._compile_daemon()
+            self._scratch_dir = tempfile.mkdtemp(prefix='zkay_prover_daemon_')
+            self._process = subprocess.Popen(
+                ['java', '-Xms4096m', '-Xmx16384m', '-cp', f'{self.circuit_builder_jar}:{daemon_dir}', _daemon_classname],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=None if cfg.verbosity >= 2 and not cfg.is_unit_test else subprocess.DEVNULL,
+                cwd=self._scratch_dir, universal_newlines=True, bufsize=1)
+        except (OSError, subprocess.SubprocessError) as e:
+            self._shutdown(failed=True)
+            raise DaemonError(f'Failed to start prover daemon: {e}')
+        zk_print('Started jsnark prover daemon', verbosity_level=2)
+
+    def _compile_daemon(self) -> str:
+        """Compile the daemon class (once per jar and daemon code version) and return the directory which contains it."""
+        code = _daemon_src.format(daemon_class_name=_daemon_classname)
+        digest = hash_string((self.circuit_builder_jar_hash + code).encode('utf-8')).hex()
+        daemon_dir = os.path.join(cfg.data_dir, 'jsnark_prover_daemon', digest[:32])
+        if not os.path.exists(os.path.join(daemon_dir, f'{_daemon_classname}.class')):
+            os.makedirs(daemon_dir, exist_ok=True)
+            jfile = os.path.join(daemon_dir, f'{_daemon_classname}.java')
+            with open(jfile, 'w') as f:
+                f.write(code)
+            run_command(['javac', '-cp', f'{self.circuit_builder_jar}', jfile], cwd=daemon_dir)
+        return daemon_dir
+
+    def _shutdown(self, failed: bool):
+        self._failed |= failed
+        if self._process is not None:
+            if self._process.poll() is None:
+                try:
+                    self._process.stdin.close()
+                    self._process.wait(timeout=5)
+                except (OSError, subprocess.TimeoutExpired):
+                    self._process.kill()
+            self._process = None
+        if self._scratch_dir is not None:
+            shutil.rmtree(self._scratch_dir, ignore_errors=True)
+            self._scratch_dir = None
+
+
+_daemons: List[JsnarkProverDaemon] = []
+
+
+@atexit.register
+def _shutdown_daemons():
+    for daemon in _daemons:
+        daemon.shutdown()
+
+
+def create_daemon(circuit_builder_jar: str, circuit_builder_jar_hash: str) -> JsnarkProverDaemon:
+    """Create a new daemon handle, the daemon process is terminated automatically when the interpreter exits."""
+    daemon = JsnarkProverDaemon(circuit_builder_jar, circuit_builder_jar_hash)
+    _daemons.append(daemon)
+    return daemon
@@ -32,11 +32,13 @@ DATA = 5
 addLevelName(DATA, "DATA")
 
 
-def data(key, value):
+def data(key, value, context=None):
     """
     Log (key, value) to log-level DATA
+
+    :param context: log context to use instead of the current one (e.g. for values which are logged by a background thread)
     """
-    d = {'key': key, 'value': value, 'context': full_log_context}
+    d = {'key': key, 'value': value, 'context': full_log_context if context is None else context}
     return logging.log(DATA, json.dumps(d))
 
 
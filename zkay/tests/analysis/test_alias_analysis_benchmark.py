@@ -0,0 +1,182 @@
+import os
+import time
+import unittest
+from typing import Dict, Optional, Set
+from unittest import mock
+
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.zkay_ast.analysis import alias_analysis as alias_analysis_module
+from zkay.zkay_ast.analysis.alias_analysis import alias_analysis
+from zkay.zkay_ast.ast import Statement
+from zkay.zkay_ast.build_ast import build_ast
+from zkay.zkay_ast.pointers.parent_setter import set_parents
+from zkay.zkay_ast.pointers.symbol_table import link_identifiers
+from zkay.zkay_ast.visitor.function_visitor import FunctionVisitor
+
+# Running this benchmark (only if ZKAY_RUN_BENCHMARKS=1 is set or if this file is run directly) prints a CSV to stdout with the time required for the alias analysis of synthetic contracts
+# with num_vars address state variables and a function with one statement per variable (assignments, requires and ifs).
+# The reference implementation is the PartitionState which scanned all partitions on every lookup and deep-copied
+# all partitions on every copy.
+
+NUM_VARS = [50, 100, 200, 400]  # Number of state variables (privacy labels) per contract
+NUM_RUNS = 1                     # Number of runs per contract and implementation
+SEP = ','
+
+RUN_BENCHMARKS = os.environ.get('ZKAY_RUN_BENCHMARKS') == '1' or __name__ == '__main__'
+
+
+class ReferencePartitionState:
+    def __init__(self):
+        self._partitions: Dict[int, Set] = {}
+        self._next_unused = 0
+
+    def insert(self, x):
+        self._insert_partition({x})
+
+    def _insert_partition(self, p):
+        self._partitions[self._next_unused] = p
+        self._next_unused += 1
+
+    def get_index(self, x) -> Optional[int]:
+        for k, p in self._partitions.items():
+            if x in p:
+                return k
+        return None
+
+    def has(self, x) -> bool:
+        return self.get_index(x) is not None
+
+    def same_partition(self, x, y) -> bool:
+        if x == y:
+            return True
+        xp = self.get_index(x)
+        yp = self.get_index(y)
+        return xp is not None and yp is not None and xp == yp
+
+    def merge(self, x, y):
+        xp_key, yp_key = self.get_index(x), self.get_index(y)
+        if xp_key != yp_key:
+            self._partitions[xp_key].update(self._partitions.pop(yp_key))
+
+    def remove(self, x):
+        xp_key = self.get_index(x)
+        self._partitions[xp_key].remove(x)
+        if len(self._partitions[xp_key]) == 0:
+            del self._partitions[xp_key]
+
+    def move_to(self, x, y):
+        if not self.same_partition(x, y):
+            self.remove(x)
+            self._partitions[self.get_index(y)].add(x)
+
+    def move_to_separate(self, x):
+        self.remove(x)
+        self.insert(x)
+
+    def separate_all(self):
+        s = ReferencePartitionState()
+        for p in self._partitions.values():
+            immutable_vals = set()
+            for x in p:
+                if x.is_immutable:
+                    immutable_vals.add(x)
+                else:
+                    s.insert(x)
+            if immutable_vals:
+                s._insert_partition(immutable_vals)
+        return s
+
+    def join(self, other):
+        s = ReferencePartitionState()
+        my_vals = frozenset([item for subset in self._partitions.values() for item in subset])
+        new_parts = set()
+        for val in my_vals:
+            my_part = self._partitions[self.get_index(val)]
+            other_part = other._partitions[other.get_index(val)]
+            new_parts.add(frozenset(my_part.intersection(other_part)))
+        for part in new_parts:
+            s._insert_partition(set(part))
+        return s
+
+    def copy(self):
+        c = ReferencePartitionState()
+        c._next_unused = self._next_unused
+        for k, p in self._partitions.items():
+            c._partitions[k] = set(p)
+        return c
+
+    def __str__(self):
+        ps = [sorted({str(e) for e in p}) for k, p in self._partitions.items()]
+        ps.sort()
+        return str(ps)
+
+
+def synthetic_contract(num_vars: int) -> str:
+    """Contract with num_vars address state variables, a parameter per 8 variables and a statement per variable."""
+    params = [f'p{i}' for i in range(max(num_vars // 8, 1))]
+    stmts = []
+    for i in range(num_vars):
+        a, b, c = f'a{i}', f'a{(i * 7 + 3) % num_vars}', f'a{(i * 13 + 5) % num_vars}'
+        kind = i % 4
+        if kind == 0:
+            stmts.append(f'{a} = {b};')
+        elif kind == 1:
+            stmts.append(f'require({a} == {b});')
+        elif kind == 2:
+            stmts.append(f'if ({a} == {b}) {{ {c} = {params[i % len(params)]}; }} else {{ {a} = {c}; }}')
+        else:
+            stmts.append(f'address l{i} = {b}; {c} = l{i};')
+    state_vars = '\n'.join(f'\taddress a{i};' for i in range(num_vars))
+    body = '\n'.join(f'\t\t{s}' for s in stmts)
+    return f'pragma zkay ^0.3.0;\n\ncontract Bench{num_vars} {{\n{state_vars}\n\n' \
+           f'\tfunction f({", ".join(f"address {p}" for p in params)}) public {{\n{body}\n\t}}\n}}\n'
+
+
+class StatementStateCollector(FunctionVisitor):
+    def __init__(self):
+        super().__init__()
+        self.states = []
+
+    def visitStatement(self, ast: Statement):
+        self.states.append((str(ast.before_analysis), str(ast.after_analysis)))
+        self.visitChildren(ast)
+
+
+class TestAliasAnalysisBenchmark(ZkayTestCase):
+    def _run(self, code: str):
+        ast = build_ast(code)
+        set_parents(ast)
+        link_identifiers(ast)
+        start = time.perf_counter()
+        for _ in range(NUM_RUNS):
+            alias_analysis(ast)
+        elapsed = (time.perf_counter() - start) / NUM_RUNS
+        collector = StatementStateCollector()
+        collector.visit(ast)
+        return elapsed, collector.states
+
+    def test_same_states(self):
+        code = synthetic_contract(20)
+        _, new_states = self._run(code)
+        with mock.patch.object(alias_analysis_module, 'PartitionState', ReferencePartitionState):
+            _, ref_states = self._run(code)
+        self.assertEqual(new_states, ref_states)
+
+    @unittest.skipIf(not RUN_BENCHMARKS, 'benchmarks disabled (set ZKAY_RUN_BENCHMARKS=1)')
+    def test_run_benchmark(self):
+        print()
+        print('num_vars', 'reference_ms', 'indexed_ms', 'speedup', sep=SEP)
+        for num_vars in NUM_VARS:
+            code = synthetic_contract(num_vars)
+            new, new_states = self._run(code)
+            with mock.patch.object(alias_analysis_module, 'PartitionState', ReferencePartitionState):
+                ref, ref_states = self._run(code)
+            print(num_vars, f'{ref * 1000:.1f}', f'{new * 1000:.1f}', f'{ref / new:.1f}', sep=SEP)
+
+            # Both implementations must compute identical states for every statement
+            self.assertEqual(new_states, ref_states)
+        self.assertLess(new, ref)
+
+
+if __name__ == "__main__":
+    TestAliasAnalysisBenchmark('test_run_benchmark').test_run_benchmark()
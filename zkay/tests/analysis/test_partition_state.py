@@ -79,3 +79,31 @@ class TestPartitionState(ZkayTestCase):
 
         for i in range(5, 10):
             self.assertTrue(s.same_partition(0, i))
+
+    def test_copy_is_independent(self):
+        s = PartitionState()
+
+        for i in range(4):
+            s.insert(i)
+        s.merge(0, 1)
+
+        c = s.copy()
+        c.merge(0, 2)
+        c.move_to_separate(1)
+        s.move_to(3, 0)
+
+        self.assertEqual(str(s), "[['0', '1', '3'], ['2']]")
+        self.assertEqual(str(c), "[['0', '2'], ['1'], ['3']]")
+
+    def test_join(self):
+        s = PartitionState()
+
+        for i in range(4):
+            s.insert(i)
+        s.merge(0, 1)
+        s.merge(0, 2)
+
+        other = s.copy()
+        other.move_to(2, 3)
+
+        self.assertEqual(str(s.join(other)), "[['0', '1'], ['2'], ['3']]")
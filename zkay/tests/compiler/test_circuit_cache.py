@@ -0,0 +1,91 @@
+import os
+import tempfile
+import time
+from unittest import mock
+
+from zkay.compiler.privacy.circuit_generation import circuit_cache
+from zkay.config import cfg
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.utils.helpers import read_file, save_to_file
+
+
+class TestCircuitCache(ZkayTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.old_data_dir, self.old_size = cfg.data_dir, cfg.circuit_cache_size_mb
+        cfg._data_dir, cfg.circuit_cache_size_mb = os.path.join(self.tmp_dir.name, 'data'), 1
+
+    def tearDown(self):
+        cfg._data_dir, cfg.circuit_cache_size_mb = self.old_data_dir, self.old_size
+        self.tmp_dir.cleanup()
+
+    def _make_dir(self, name: str) -> str:
+        d = os.path.join(self.tmp_dir.name, name)
+        os.makedirs(d)
+        return d
+
+    def test_put_get(self):
+        src, dst = self._make_dir('src'), self._make_dir('dst')
+        save_to_file(src, 'circuit.arith', 'total 1')
+        save_to_file(src, 'proving.key', 'pk')
+        circuit_cache.put_files('abc', ['circuit.arith'], src)
+
+        self.assertEqual(circuit_cache.list_files('abc'), ['circuit.arith'])
+        self.assertFalse(circuit_cache.get_files('abc', ['circuit.arith', 'proving.key'], dst))
+        self.assertEqual(os.listdir(dst), [])
+
+        circuit_cache.put_files('abc', ['proving.key'], src)
+        save_to_file(dst, 'proving.key', 'old')
+        self.assertTrue(circuit_cache.get_files('abc', ['circuit.arith', 'proving.key'], dst))
+        self.assertEqual(read_file(os.path.join(dst, 'circuit.arith')), 'total 1')
+        self.assertEqual(read_file(os.path.join(dst, 'proving.key')), 'pk')
+
+    def test_disabled(self):
+        src, dst = self._make_dir('src'), self._make_dir('dst')
+        save_to_file(src, 'circuit.arith', 'total 1')
+        cfg.circuit_cache_size_mb = 0
+        circuit_cache.put_files('abc', ['circuit.arith'], src)
+        self.assertFalse(circuit_cache.get_files('abc', ['circuit.arith'], dst))
+
+    def test_gc(self):
+        src = self._make_dir('src')
+        save_to_file(src, 'circuit.arith', 'x' * 1000)
+        for i, digest in enumerate(['a', 'b', 'c']):
+            circuit_cache.put_files(digest, ['circuit.arith'], src)
+            os.utime(os.path.join(cfg.data_dir, 'circuit_cache', digest), (time.time() - 10 + i, time.time() - 10 + i))
+
+        # Using an entry marks it as recently used
+        circuit_cache.get_files('a', ['circuit.arith'], self._make_dir('dst'))
+        self.assertEqual(circuit_cache.gc(2000), (1, 1000))
+        self.assertEqual(circuit_cache.list_files('b'), [])
+        self.assertEqual(circuit_cache.list_files('a'), ['circuit.arith'])
+        self.assertEqual(circuit_cache.gc(0), (2, 2000))
+
+    def test_put_trims_cache(self):
+        src = self._make_dir('src')
+        save_to_file(src, 'circuit.arith', 'x' * 600 * 1024)
+        circuit_cache.put_files('a', ['circuit.arith'], src)
+        os.utime(os.path.join(cfg.data_dir, 'circuit_cache', 'a'), (time.time() - 10, time.time() - 10))
+        circuit_cache.put_files('b', ['circuit.arith'], src)
+        self.assertEqual(circuit_cache.list_files('a'), [])
+        self.assertEqual(circuit_cache.list_files('b'), ['circuit.arith'])
+
+        with self.assertRaises(ValueError):
+            cfg.circuit_cache_size_mb = -1
+
+    def test_get_removed_concurrently(self):
+        src, dst = self._make_dir('src'), self._make_dir('dst')
+        save_to_file(src, 'circuit.arith', 'total 1')
+        save_to_file(src, 'proving.key', 'pk')
+        circuit_cache.put_files('abc', ['circuit.arith', 'proving.key'], src)
+
+        link_or_copy = circuit_cache._link_or_copy
+
+        def fail_for_key(src_file: str, dst_file: str):
+            if src_file.endswith('proving.key'):
+                raise FileNotFoundError(src_file)
+            link_or_copy(src_file, dst_file)
+
+        with mock.patch.object(circuit_cache, '_link_or_copy', side_effect=fail_for_key):
+            self.assertFalse(circuit_cache.get_files('abc', ['circuit.arith', 'proving.key'], dst))
+        self.assertEqual(os.listdir(dst), [])
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from zkay.compiler.privacy.circuit_generation.circuit_generator import CircuitGenerator
+from zkay.config import cfg
+from zkay.jsnark_interface import libsnark_interface as libsnark
+from zkay.tests.zkay_unit_test import ZkayTestCase
+
+MB = 1024 * 1024
+
+
+class DummyCircuit:
+    def __init__(self, name: str, mem: int):
+        self.name = name
+        self.mem = mem
+        self.verifier_contract_type = mock.Mock(**{'code.return_value': name})
+
+
+class DummyGenerator(CircuitGenerator):
+    def __init__(self, p_count: int):
+        super().__init__([], None, '', True)
+        self.p_count = p_count
+        self.lock = threading.Lock()
+        self.running_mem = 0
+        self.max_running_mem = 0
+        self.max_running = 0
+        self.running = 0
+        self.order = []
+
+    def _generate_keys(self, circuit):
+        with self.lock:
+            self.order.append(circuit.name)
+            self.running += 1
+            self.running_mem += circuit.mem
+            self.max_running = max(self.max_running, self.running)
+            self.max_running_mem = max(self.max_running_mem, self.running_mem)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+            self.running_mem -= circuit.mem
+
+    def _estimate_keygen_memory(self, circuit) -> int:
+        return circuit.mem
+
+    def _generate_zkcircuit(self, import_keys, circuit):
+        pass
+
+    @classmethod
+    def get_vk_and_pk_filenames(cls):
+        return ()
+
+    def _parse_verification_key(self, circuit):
+        pass
+
+    def _get_prover_key_hash(self, circuit):
+        pass
+
+
+class TestParallelKeygen(ZkayTestCase):
+    def setUp(self):
+        self.old_limit = cfg.keygen_memory_limit_mb
+        cfg.keygen_memory_limit_mb = 100
+
+    def tearDown(self):
+        cfg.keygen_memory_limit_mb = self.old_limit
+
+    def test_memory_limit(self):
+        gen = DummyGenerator(4)
+        circuits = [DummyCircuit(f'c{i}', 30 * MB) for i in range(6)] + [DummyCircuit('big', 60 * MB)]
+        gen._generate_keys_par(circuits)
+        self.assertEqual(sorted(gen.order), sorted(c.name for c in circuits))
+        self.assertEqual(gen.order[0], 'big')
+        self.assertLessEqual(gen.max_running_mem, 100 * MB)
+        self.assertGreater(gen.max_running, 1)
+
+    def test_oversized_circuit(self):
+        gen = DummyGenerator(4)
+        circuits = [DummyCircuit('huge', 200 * MB), DummyCircuit('small', 10 * MB)]
+        gen._generate_keys_par(circuits)
+        self.assertEqual(gen.order, ['huge', 'small'])
+        self.assertEqual(gen.max_running, 1)
+
+    def test_count_constraints(self):
+        with tempfile.TemporaryDirectory() as d:
+            with open(os.path.join(d, 'circuit.arith'), 'w') as f:
+                f.write('total 12\n'
+                        'input 0\n'
+                        'nizkinput 1\n'
+                        'add in 2 <0 1> out 1 <2>\n'
+                        'const-mul-2 in 1 <2> out 1 <3>\n'
+                        'mul in 2 <0 1> out 1 <4>\n'
+                        'split in 1 <4> out 3 <5 6 7>\n'
+                        'zerop in 1 <3> out 2 <8 9>\n'
+                        'assert in 2 <0 1> out 1 <4>\n'
+                        'output 4\n')
+            self.assertEqual(libsnark.count_constraints(d), 1 + 4 + 2 + 1)
+
+    def test_estimate_proofgen_memory(self):
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, 'circuit.arith')
+            for num_gates in (1, 3):
+                with open(filename, 'w') as f:
+                    f.write('total 3\ninput 0\ninput 1\n' + 'mul in 2 <0 1> out 1 <2>\n' * num_gates)
+                expected = libsnark.proofgen_base_memory + num_gates * libsnark.proofgen_memory_per_constraint
+                self.assertEqual(libsnark.estimate_proofgen_memory(d), expected)
+                self.assertEqual(libsnark.estimate_proofgen_memory(d), expected)
+
+            # Modified circuit replaces the old count
+            self.assertEqual([path for path in libsnark._constraint_counts if path.startswith(os.path.abspath(d))], [os.path.abspath(d)])
@@ -0,0 +1,105 @@
+import os
+import shutil
+import tempfile
+import unittest
+from subprocess import SubprocessError
+from unittest import mock
+
+from zkay.config import cfg
+from zkay.jsnark_interface import jsnark_interface
+from zkay.tests.zkay_unit_test import ZkayTestCase
+
+
+def circuit_code(name: str) -> str:
+    """Java code of a minimal circuit which checks that its public output equals its public input."""
+    return f'''\
+import zkay.ZkayCircuitBase;
+import static zkay.ZkayType.ZkUint;
+
+public class {cfg.jsnark_circuit_classname} extends ZkayCircuitBase {{
+    public {cfg.jsnark_circuit_classname}() {{
+        super("{name}", 1, 1, 0, false);
+    }}
+
+    @Override
+    protected void buildCircuit() {{
+        super.buildCircuit();
+        addIn("in", 1, ZkUint(32));
+        addOut("out", 1, ZkUint(32));
+        checkEq("out", "in");
+    }}
+
+    public static void main(String[] args) {{
+        {cfg.jsnark_circuit_classname} circuit = new {cfg.jsnark_circuit_classname}();
+        circuit.run(args);
+    }}
+}}
+'''
+
+
+@unittest.skipIf(shutil.which('java') is None, 'java not available')
+class TestProverDaemon(ZkayTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.old_use_daemon = cfg.use_jsnark_prover_daemon
+        cfg.use_jsnark_prover_daemon = True
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.circuit_dir = os.path.join(self.tmp_dir.name, 'circuit')
+        os.makedirs(self.circuit_dir)
+        jsnark_interface.compile_circuit(self.circuit_dir, circuit_code('zk__Verify_Test'))
+
+    def tearDown(self) -> None:
+        jsnark_interface.prover_daemon.shutdown()
+        cfg.use_jsnark_prover_daemon = self.old_use_daemon
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def test_prove(self):
+        for _ in range(2):
+            with tempfile.TemporaryDirectory() as output_dir, \
+                    mock.patch.object(jsnark_interface, 'run_command', side_effect=AssertionError('fallback used')):
+                jsnark_interface.prepare_proof(self.circuit_dir, output_dir, [5, 5])
+                self.assertIn('circuit.in', os.listdir(output_dir))
+
+    def test_circuit_error(self):
+        with tempfile.TemporaryDirectory() as output_dir, \
+                mock.patch.object(jsnark_interface, 'run_command', side_effect=AssertionError('fallback used')):
+            # Wrong number of arguments
+            with self.assertRaises(SubprocessError):
+                jsnark_interface.prepare_proof(self.circuit_dir, output_dir, [5])
+        self.assertTrue(jsnark_interface.prover_daemon.is_available)
+
+
+class TestCompileCircuits(ZkayTestCase):
+    def test_partial_failure(self):
+        with tempfile.TemporaryDirectory() as d:
+            dirs = [os.path.join(d, name) for name in ('ok', 'failed')]
+            for circuit_dir in dirs:
+                os.makedirs(circuit_dir)
+            results = {os.path.abspath(dirs[0]): None, os.path.abspath(dirs[1]): 'javac failed'}
+            compiled = []
+            with mock.patch.object(jsnark_interface.batch_compiler, 'compile_circuits', return_value=results):
+                with self.assertRaises(SubprocessError):
+                    jsnark_interface.compile_circuits([(circuit_dir, '') for circuit_dir in dirs], 2, compiled.append)
+            self.assertEqual(compiled, dirs[:1])
+
+
+@unittest.skipIf(shutil.which('java') is None, 'java not available')
+class TestBatchCompiler(ZkayTestCase):
+    def test_compile_circuits(self):
+        with tempfile.TemporaryDirectory() as d:
+            dirs = [os.path.join(d, f'circuit{i}') for i in range(3)]
+            for circuit_dir in dirs:
+                os.makedirs(circuit_dir)
+            circuits = [(dirs[0], circuit_code('zk__Verify_A')), (dirs[1], circuit_code('zk__Verify_B'))]
+            compiled = []
+            jsnark_interface.compile_circuits(circuits, 2, compiled.append)
+            self.assertEqual(compiled, dirs[:2])
+            for circuit_dir in dirs[:2]:
+                self.assertIn('circuit.arith', os.listdir(circuit_dir))
+
+            # A circuit which fails to compile does not affect the others
+            compiled.clear()
+            with self.assertRaises(SubprocessError):
+                jsnark_interface.compile_circuits(circuits[:1] + [(dirs[2], 'invalid')], 2, compiled.append)
+            self.assertEqual(compiled, dirs[:1])
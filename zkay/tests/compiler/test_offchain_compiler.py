@@ -0,0 +1,24 @@
+import re
+
+from zkay.compiler.privacy.offchain_compiler import PythonOffchainVisitor
+from zkay.compiler.privacy.transformation.zkay_contract_transformer import transform_ast
+from zkay.examples.examples import get_code_example
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.zkay_ast.process_ast import get_processed_ast
+
+
+class TestStatePrefetch(ZkayTestCase):
+    @staticmethod
+    def _prefetched_keys(code: str, fct_name: str) -> str:
+        ast = get_processed_ast(code, solc_check=False)
+        new_ast, circuits = transform_ast(ast)
+        offchain_code = PythonOffchainVisitor(list(circuits.values())).visit(new_ast)
+        fct_code = offchain_code[offchain_code.index(f'def {fct_name}('):]
+        fct_code = fct_code[:fct_code.index('\n    def ')]
+        return re.search(r'self\.state\.prefetch\(\[(.*)\]\)', fct_code).group(1)
+
+    def test_exam(self):
+        # Reads of (nested) mappings with keys which depend on parameters
+        _, example = get_code_example('exam.zkay')[0]
+        self.assertEqual(self._prefetched_keys(example.code(), 'grade_task'),
+                         '("examinator", ), ("answers", examinee, task), ("solutions", task), ("points", examinee), ("pass_points", )')
@@ -1,8 +1,15 @@
 import os
-from unittest import TestCase
+import tempfile
+import time
+from unittest import TestCase, mock
 
+from solcx import compile_standard
+
+from zkay.compiler.solidity import compiler
 from zkay.compiler.solidity.compiler import compile_solidity_code, compile_solidity_json
+from zkay.config import cfg
 from zkay.examples.examples import others_dir
+from zkay.utils.helpers import save_to_file
 
 simple_storage = """
 pragma solidity ^0.6.0;
@@ -29,3 +36,94 @@ class TestCompileSolidity(TestCase):
     def test_compile_with_import(self):
         compile_output = compile_solidity_json(os.path.join(others_dir, 'AddUser.sol'))
         self.assertIsNotNone(compile_output)
+
+    def test_output_cache(self):
+        old_data_dir, old_cache_size = cfg.data_dir, cfg.solc_cache_size_mb
+        with tempfile.TemporaryDirectory() as d:
+            cfg._data_dir, cfg.solc_cache_size_mb = d, 1
+            try:
+                lib_file = save_to_file(d, 'Lib.sol', 'pragma solidity ^0.6.0;\nlibrary Lib { function f() internal pure returns (uint) { return 1; } }')
+                sol_file = save_to_file(d, 'Main.sol', f'pragma solidity ^0.6.0;\nimport "./Lib.sol";\n{simple_storage[simple_storage.find("contract"):]}')
+                with mock.patch('zkay.compiler.solidity.compiler.compile_standard', wraps=compile_standard) as solc:
+                    out = compile_solidity_json(sol_file)
+                    self.assertEqual(out, compile_solidity_json(sol_file))
+                    self.assertEqual(solc.call_count, 1)
+
+                    # Different optimizer settings or changed imports require recompilation
+                    compile_solidity_json(sol_file, optimizer_runs=10)
+                    self.assertEqual(solc.call_count, 2)
+                    save_to_file(d, 'Lib.sol', 'pragma solidity ^0.6.0;\nlibrary Lib { function f() internal pure returns (uint) { return 2; } }')
+                    compile_solidity_json(sol_file)
+                    self.assertEqual(solc.call_count, 3)
+                    compile_solidity_json(sol_file)
+                    self.assertEqual(solc.call_count, 3)
+            finally:
+                cfg._data_dir, cfg.solc_cache_size_mb = old_data_dir, old_cache_size
+
+
+class TestSolcOutputCache(TestCase):
+    """Tests for the solc output cache which do not require solc."""
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.old_data_dir, self.old_cache_size = cfg.data_dir, cfg.solc_cache_size_mb
+        cfg._data_dir, cfg.solc_cache_size_mb = self.tmp_dir.name, 1
+        self.cache_dir = os.path.join(self.tmp_dir.name, 'solc_cache')
+        save_to_file(self.tmp_dir.name, 'Lib.sol', 'library Lib {}')
+        patcher = mock.patch.object(compiler, 'compile_standard', side_effect=self._fake_solc)
+        self.solc = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        cfg._data_dir, cfg.solc_cache_size_mb = self.old_data_dir, self.old_cache_size
+        self.tmp_dir.cleanup()
+
+    @staticmethod
+    def _fake_solc(json_in, base_path, allow_paths):
+        name = next(iter(json_in['sources']))
+        return {'sources': {name: {'id': 0}, 'Lib.sol': {'id': 1}}, 'padding': 'x' * 300 * 1024}
+
+    def _compile(self, name: str, **kwargs):
+        filename = save_to_file(self.tmp_dir.name, name, f'import "./Lib.sol"; // {name}')
+        return compile_solidity_json(filename, **kwargs)
+
+    def test_cache_key(self):
+        out = self._compile('Main.sol')
+        self.assertEqual(self._compile('Main.sol'), out)
+        self.assertEqual(self.solc.call_count, 1)
+
+        # Different settings or code require recompilation
+        self._compile('Main.sol', optimizer_runs=10)
+        self._compile('Main.sol', libs={'Lib': '0x' + '00' * 20})
+        self.assertEqual(self.solc.call_count, 3)
+        save_to_file(self.tmp_dir.name, 'Main.sol', 'import "./Lib.sol"; // modified')
+        compile_solidity_json(os.path.join(self.tmp_dir.name, 'Main.sol'))
+        self.assertEqual(self.solc.call_count, 4)
+
+    def test_imported_file_changed(self):
+        self._compile('Main.sol')
+        save_to_file(self.tmp_dir.name, 'Lib.sol', 'library Lib { }')
+        self._compile('Main.sol')
+        self.assertEqual(self.solc.call_count, 2)
+        self._compile('Main.sol')
+        self.assertEqual(self.solc.call_count, 2)
+
+    def test_eviction(self):
+        with mock.patch.object(compiler, '_evict_cached_outputs', wraps=compiler._evict_cached_outputs) as evict:
+            for i in range(4):
+                before = set(os.listdir(self.cache_dir)) if os.path.exists(self.cache_dir) else set()
+                self._compile(f'Main{i}.sol')
+                new_entry, = set(os.listdir(self.cache_dir)) - before
+                os.utime(os.path.join(self.cache_dir, new_entry), (time.time() - 100 + i, time.time() - 100 + i))
+                self.assertEqual(evict.call_count, 1 if i < 3 else 2)
+
+        # 4 * 300 KiB exceed the limit, the oldest entries were removed until the cache is at most 768 KiB large
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+        self._compile('Main3.sol')
+        self._compile('Main2.sol')
+        self.assertEqual(self.solc.call_count, 4)
+        self._compile('Main0.sol')
+        self.assertEqual(self.solc.call_count, 5)
+
+        with self.assertRaises(ValueError):
+            cfg.solc_cache_size_mb = -1
@@ -0,0 +1,124 @@
+import os
+import secrets
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from zkay.config import cfg
+from zkay.jsnark_interface.jsnark_interface import circuit_builder_jar
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto import ecdh_native
+from zkay.transaction.crypto.ecdh_base import EcdhBase
+from zkay.utils.run_command import run_command
+
+
+class TestEcdhNative(ZkayTestCase):
+    # Reference values computed with JsnarkCircuitBuilder.jar
+    rnd = bytes.fromhex('0102030405060708091011121314151617181920212223242526272829303132')
+    sk = 0x1102030405060708091011121314151617181920212223242526272829303130
+    pk = 0x3022661e352303f39e9b3a333edf3100a7bcfd5b7b01e9a355d9cb291695ec85
+    other_pk = 0x8f5907c9860aaf37abbdfc2ad3e94018f591c375782bcf78a3cbb2ad486a66e
+    shared_key = bytes.fromhex('43768c3b9fe308c75a0d481124469e0f')
+    iv = bytes.fromhex('000102030405060708090a0b0c0d0e0f')
+    cipher = bytes.fromhex('d195017f2b038fc1faaa41c0c1059ae3003dddfcaa162716fee1020000cd07b0')
+
+    def test_gen_keypair(self):
+        self.assertEqual(ecdh_native.gen_keypair(self.rnd), (self.pk, self.sk))
+
+    def test_ecdh_sha256(self):
+        self.assertEqual(ecdh_native.ecdh_sha256(self.other_pk, self.sk), self.shared_key)
+
+    def test_ecdh_symmetric(self):
+        pk1, sk1 = ecdh_native.gen_keypair(secrets.token_bytes(32))
+        pk2, sk2 = ecdh_native.gen_keypair(secrets.token_bytes(32))
+        self.assertEqual(ecdh_native.ecdh_sha256(pk2, sk1), ecdh_native.ecdh_sha256(pk1, sk2))
+
+    def test_chaskey_enc(self):
+        plain = (1234).to_bytes(32, byteorder='big')
+        self.assertEqual(ecdh_native.chaskey_lts_cbc_encrypt(self.shared_key, self.iv, plain), self.cipher)
+
+    def test_chaskey_dec(self):
+        plain = ecdh_native.chaskey_lts_cbc_decrypt(self.shared_key, self.iv, self.cipher)
+        self.assertEqual(int.from_bytes(plain, byteorder='big'), 1234)
+
+
+class TestEcdhSharedKeyCache(ZkayTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        EcdhBase._shared_key_cache.clear()
+        self.old_data_dir = cfg.data_dir
+        self.old_disk_cache = cfg.ecdh_shared_key_disk_cache
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        cfg._data_dir = self.tmp_dir.name
+
+    def tearDown(self) -> None:
+        cfg._data_dir = self.old_data_dir
+        cfg.ecdh_shared_key_disk_cache = self.old_disk_cache
+        self.tmp_dir.cleanup()
+        EcdhBase._shared_key_cache.clear()
+        super().tearDown()
+
+    def test_memory_cache(self):
+        with mock.patch.object(ecdh_native, 'ecdh_sha256', wraps=ecdh_native.ecdh_sha256) as ecdh:
+            for _ in range(3):
+                self.assertEqual(EcdhBase._ecdh_sha256(TestEcdhNative.other_pk, TestEcdhNative.sk), TestEcdhNative.shared_key)
+            self.assertEqual(ecdh.call_count, 1)
+
+    def test_disk_cache(self):
+        cfg.ecdh_shared_key_disk_cache = True
+        self.assertEqual(EcdhBase._ecdh_sha256(TestEcdhNative.other_pk, TestEcdhNative.sk), TestEcdhNative.shared_key)
+        EcdhBase._shared_key_cache.clear()
+        with mock.patch.object(ecdh_native, 'ecdh_sha256') as ecdh:
+            self.assertEqual(EcdhBase._ecdh_sha256(TestEcdhNative.other_pk, TestEcdhNative.sk), TestEcdhNative.shared_key)
+            ecdh.assert_not_called()
+
+        # Stored key must not be readable without the secret key
+        filename, _, _ = EcdhBase._shared_key_file(TestEcdhNative.other_pk, TestEcdhNative.sk)
+        with open(filename, 'rb') as f:
+            data = f.read()
+        self.assertNotIn(TestEcdhNative.shared_key, data)
+        self.assertIsNone(EcdhBase._load_shared_key(TestEcdhNative.other_pk, TestEcdhNative.sk + 8))
+        self.assertTrue(os.path.exists(filename))
+
+        # Stored key is bound to the key pair
+        other_filename, _, _ = EcdhBase._shared_key_file(TestEcdhNative.other_pk + 1, TestEcdhNative.sk)
+        with open(other_filename, 'wb') as f:
+            f.write(data)
+        self.assertIsNone(EcdhBase._load_shared_key(TestEcdhNative.other_pk + 1, TestEcdhNative.sk))
+
+        # Modified content is detected
+        with open(filename, 'wb') as f:
+            f.write(data[:-1] + bytes([data[-1] ^ 1]))
+        self.assertIsNone(EcdhBase._load_shared_key(TestEcdhNative.other_pk, TestEcdhNative.sk))
+
+
+@unittest.skipIf(shutil.which('java') is None, 'java not available')
+class TestEcdhNativeAgainstJar(ZkayTestCase):
+    """Cross-check the python implementations against the java implementations for random inputs."""
+
+    @staticmethod
+    def _run_jar(*args: str) -> str:
+        out, _ = run_command(['java', '-cp', f'{circuit_builder_jar}', *args])
+        return out.splitlines()[-1]
+
+    def test_keys_and_chaskey(self):
+        for _ in range(3):
+            rnd = secrets.token_bytes(32)
+            pk, sk = ecdh_native.gen_keypair(rnd)
+            out, _ = run_command(['java', '-cp', f'{circuit_builder_jar}', 'zkay.ZkayECDHGenerator', rnd.hex()])
+            jpk, jsk = out.splitlines()[-2:]
+            self.assertEqual((pk, sk), (int(jpk, 16), int(jsk, 16)))
+
+            other_pk, _ = ecdh_native.gen_keypair(secrets.token_bytes(32))
+            key = ecdh_native.ecdh_sha256(other_pk, sk)
+            jkey = self._run_jar('zkay.ZkayECDHGenerator', hex(sk)[2:], hex(other_pk)[2:])
+            self.assertEqual(key, int(jkey, 16).to_bytes(16, byteorder='big'))
+
+            iv, plain = secrets.token_bytes(16), secrets.token_bytes(32)
+            cipher = ecdh_native.chaskey_lts_cbc_encrypt(key, iv, plain)
+            jcipher = self._run_jar('zkay.ChaskeyLtsCbc', 'enc', key.hex(), iv.hex(), plain.hex())
+            self.assertEqual(cipher, int(jcipher, 16).to_bytes(32, byteorder='big'))
+
+            jplain = self._run_jar('zkay.ChaskeyLtsCbc', 'dec', key.hex(), iv.hex(), cipher.hex())
+            self.assertEqual(ecdh_native.chaskey_lts_cbc_decrypt(key, iv, cipher), int(jplain, 16).to_bytes(32, byteorder='big'))
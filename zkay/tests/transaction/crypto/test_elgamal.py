@@ -1,4 +1,8 @@
-from zkay.transaction.crypto import babyjubjub
+import tempfile
+from unittest import mock
+
+from zkay.config import cfg
+from zkay.transaction.crypto import babyjubjub, elgamal
 
 from zkay.transaction.crypto.elgamal import ElgamalCrypto
 
@@ -62,6 +66,27 @@ class TestElgamal(ZkayTestCase):
         expected = 42
         self.assertEqual(plain, expected)
 
+    def test_decrypt_batch(self):
+        eg = ElgamalCrypto(None)
+        sk = 448344687855328518203304384067387474955750326758815542295083498526674852893
+        pk = [2543111965495064707612623550577403881714453669184859408922451773306175031318,
+              20927827475527585117296730644692999944545060105133073020125343132211068382185]
+        plains = [42, 0, 1, 42, 1337]
+        ciphers = [eg._enc_with_rand(plain, 1234 + i, pk) for i, plain in enumerate(plains)]
+        res = eg._dec_batch(ciphers, sk)
+        self.assertEqual([plain for plain, _ in res], plains)
+
+    def test_large_dlog_table_not_generated(self):
+        old_table_bits = cfg.elgamal_dlog_table_bits
+        cfg.elgamal_dlog_table_bits = elgamal.max_in_memory_dlog_table_bits + 1
+        try:
+            with tempfile.TemporaryDirectory() as d, mock.patch.object(cfg, '_data_dir', d), \
+                    mock.patch.object(elgamal.babygiant, 'compute_dlog_batch', side_effect=AssertionError('table built')):
+                with self.assertRaisesRegex(ValueError, 'zkay generate-dlog-table'):
+                    elgamal.get_dlog_batch([(0, 1)])
+        finally:
+            cfg.elgamal_dlog_table_bits = old_table_bits
+
     def test_homomorphic_add(self):
         eg = ElgamalCrypto(None)
         cipher1 = CipherValue([17990166387038654353532224054392704246273066434684370089496246721960255371329,
@@ -115,3 +140,20 @@ class TestElgamal(ZkayTestCase):
         expected = eg.do_op('+', None, cipher, cipher)
         res = eg.do_op('*', None, cipher, 2)
         self.assertEqual(res, expected)
+
+    def test_pk_table(self):
+        eg = ElgamalCrypto(None)
+        pk = [2543111965495064707612623550577403881714453669184859408922451773306175031318,
+              20927827475527585117296730644692999944545060105133073020125343132211068382185]
+        random = 4992017890738015216991440853823451346783754228142718316135811893930821210517
+        expected = [17990166387038654353532224054392704246273066434684370089496246721960255371329,
+                    15866190370882469414665095798958204707796441173247149326160843221134574846694,
+                    13578016172019942326633412365679613147103709674318008979748420035774874659858,
+                    15995926508900361671313404296634773295236345482179714831868518062689263430374]
+
+        ElgamalCrypto._pk_tables.clear()
+        ElgamalCrypto._pk_uses.clear()
+        for _ in range(cfg.elgamal_pk_table_threshold + 1):
+            self.assertEqual(eg._enc_with_rand(42, random, pk), expected)
+        self.assertIn((pk[0], pk[1]), ElgamalCrypto._pk_tables)
+        self.assertEqual(eg._enc_with_rand(42, random, pk), expected)
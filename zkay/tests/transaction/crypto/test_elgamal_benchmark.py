@@ -0,0 +1,143 @@
+import os
+import time
+import types
+import unittest
+from typing import Callable
+from unittest import mock
+
+from Crypto.Random.random import randrange
+
+from zkay.config import cfg
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto import babyjubjub, elgamal
+from zkay.transaction.crypto.elgamal import ElgamalCrypto
+from zkay.transaction.types import CipherValue
+
+# The benchmark only runs if ZKAY_RUN_BENCHMARKS=1 is set (or if this file is run directly), it prints a CSV to stdout with the time per operation of ElgamalCrypto,
+# using a textbook affine double-and-add implementation of BabyJubJub for comparison, babyjubjub.py
+# without per-public-key tables, and babyjubjub.py with a precomputed table for the (single) recipient key.
+# Decryption is measured for plaintext 1, which does not require a discrete log computation.
+
+NUM_RUNS = 2  # Number of runs per operation and implementation
+SEP = ','
+
+RUN_BENCHMARKS = os.environ.get('ZKAY_RUN_BENCHMARKS') == '1' or __name__ == '__main__'
+
+
+def _reference_babyjubjub() -> types.SimpleNamespace:
+    """Affine point arithmetic with one field inversion (by exponentiation) per addition."""
+    p = babyjubjub.BASE_ORDER
+
+    class RefFq:
+        def __init__(self, s):
+            self.s = s % p
+
+        def __neg__(self):
+            return RefFq(-self.s)
+
+        def __eq__(self, a):
+            return self.s == a.s
+
+    class RefFr:
+        def __init__(self, s):
+            self.s = s % babyjubjub.CURVE_ORDER
+
+    def inv(x):
+        return pow(x, p - 2, p)
+
+    class RefPoint:
+        def __init__(self, u, v):
+            self.u = u
+            self.v = v
+
+        def __add__(self, a):
+            u1, v1, u2, v2 = self.u.s, self.v.s, a.u.s, a.v.s
+            duv = babyjubjub.BABYJUBJUB_D.s * u1 * u2 * v1 * v2
+            return RefPoint(RefFq((u1 * v2 + v1 * u2) * inv((1 + duv) % p)),
+                            RefFq((v1 * v2 - babyjubjub.BABYJUBJUB_A.s * u1 * u2) * inv((1 - duv) % p)))
+
+        def negate(self):
+            return RefPoint(-self.u, self.v)
+
+        def __mul__(self, s):
+            ret = RefPoint.ZERO
+            for c in format(s.s, '0256b'):
+                ret = ret + ret
+                if c == '1':
+                    ret = ret + self
+            return ret
+
+        def __eq__(self, a):
+            return self.u == a.u and self.v == a.v
+
+    RefPoint.ZERO = RefPoint(RefFq(0), RefFq(1))
+    RefPoint.GENERATOR = RefPoint(RefFq(babyjubjub.BABYJUBJUB_GENERATOR_X), RefFq(babyjubjub.BABYJUBJUB_GENERATOR_Y))
+    return types.SimpleNamespace(Fq=RefFq, Fr=RefFr, Point=RefPoint, CURVE_ORDER=babyjubjub.CURVE_ORDER)
+
+
+class TestElgamalBenchmark(ZkayTestCase):
+    def _time(self, f: Callable) -> float:
+        start = time.perf_counter()
+        for _ in range(NUM_RUNS):
+            f()
+        return (time.perf_counter() - start) / NUM_RUNS
+
+    def _run_ops(self):
+        eg = ElgamalCrypto(None)
+        pk, sk = eg._generate_key_pair()
+        cipher, _ = eg._enc(1, 0, eg.deserialize_pk(pk))
+        cipher2 = eg._enc_with_rand(42, randrange(babyjubjub.CURVE_ORDER), pk)
+        c1, c2 = CipherValue(cipher, params=eg.params), CipherValue(cipher2, params=eg.params)
+
+        self.assertEqual(eg._dec(cipher, sk)[0], 1)
+        return {
+            'enc': self._time(lambda: eg._enc(42, 0, eg.deserialize_pk(pk))),
+            'dec': self._time(lambda: eg._dec(cipher, sk)),
+            'do_op_add': self._time(lambda: eg.do_op('+', pk, c1, c2)),
+            'do_op_mul': self._time(lambda: eg.do_op('*', pk, c1, 1234567)),
+            'do_rerand': self._time(lambda: eg.do_rerand(c1, pk)),
+        }
+
+    def _run_ops_with_pk_tables(self, cache_size: int, threshold: int = 1):
+        old_size, old_threshold = cfg.elgamal_pk_table_cache_size, cfg.elgamal_pk_table_threshold
+        cfg.elgamal_pk_table_cache_size, cfg.elgamal_pk_table_threshold = cache_size, threshold
+        ElgamalCrypto._pk_tables.clear()
+        ElgamalCrypto._pk_uses.clear()
+        try:
+            return self._run_ops()
+        finally:
+            cfg.elgamal_pk_table_cache_size, cfg.elgamal_pk_table_threshold = old_size, old_threshold
+
+    def test_matches_reference(self):
+        eg = ElgamalCrypto(None)
+        pk, sk = eg._generate_key_pair()
+        rnd = randrange(babyjubjub.CURVE_ORDER)
+        cipher = eg._enc_with_rand(1, rnd, pk)
+        with mock.patch.object(elgamal, 'babyjubjub', _reference_babyjubjub()):
+            old_size, cfg.elgamal_pk_table_cache_size = cfg.elgamal_pk_table_cache_size, 0
+            try:
+                self.assertEqual(eg._enc_with_rand(1, rnd, pk), cipher)
+                self.assertEqual(eg._dec(cipher, sk)[0], 1)
+            finally:
+                cfg.elgamal_pk_table_cache_size = old_size
+
+    @unittest.skipIf(not RUN_BENCHMARKS, 'benchmarks disabled (set ZKAY_RUN_BENCHMARKS=1)')
+    def test_run_benchmark(self):
+        new = self._run_ops_with_pk_tables(0)
+        tables = self._run_ops_with_pk_tables(16)
+        with mock.patch.object(elgamal, 'babyjubjub', _reference_babyjubjub()):
+            ref = self._run_ops_with_pk_tables(0)
+
+        print()
+        print('operation', 'reference_ms', 'babyjubjub_ms', 'babyjubjub_pk_table_ms', 'speedup', sep=SEP)
+        for op in new:
+            print(op, f'{ref[op] * 1000:.3f}', f'{new[op] * 1000:.3f}', f'{tables[op] * 1000:.3f}',
+                  f'{ref[op] / min(new[op], tables[op]):.1f}', sep=SEP)
+
+        for op in ['enc', 'dec', 'do_op_mul', 'do_rerand']:
+            self.assertLess(new[op], ref[op])
+
+
+if __name__ == "__main__":
+    cfg._is_unit_test = True
+    TestElgamalBenchmark('test_run_benchmark').test_run_benchmark()
@@ -0,0 +1,83 @@
+import time
+
+from zkay.config import cfg
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto.elgamal import ElgamalCrypto
+from zkay.transaction.crypto.paillier import PaillierCrypto
+from zkay.transaction.crypto.randomness_pool import RandomnessPool
+from zkay.transaction.types import CipherValue
+
+ELGAMAL_SK = 448344687855328518203304384067387474955750326758815542295083498526674852893
+ELGAMAL_PK = [2543111965495064707612623550577403881714453669184859408922451773306175031318,
+              20927827475527585117296730644692999944545060105133073020125343132211068382185]
+
+
+class TestRandomnessPool(ZkayTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.old_depth = cfg.randomness_pool_depth
+        cfg.randomness_pool_depth = 4
+
+    def tearDown(self) -> None:
+        cfg.randomness_pool_depth = self.old_depth
+        ElgamalCrypto._randomness_pool.clear()
+        PaillierCrypto._randomness_pool.clear()
+        super().tearDown()
+
+    @staticmethod
+    def _wait_filled(pool: RandomnessPool, key, timeout: float = 30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with pool._lock:
+                if len(pool._queues.get(key, ())) == cfg.randomness_pool_depth:
+                    return
+            time.sleep(0.01)
+        raise TimeoutError('Randomness pool was not refilled')
+
+    def test_pool_refill(self):
+        calls = []
+        pool = RandomnessPool('test', lambda key: calls.append(key) or (key, len(calls)))
+        self.assertIsNone(pool.get('a'))
+        self._wait_filled(pool, 'a')
+        self.assertEqual(calls, ['a'] * 4)
+
+        # Refill only starts once the pool is half empty
+        self.assertEqual(pool.get('a'), ('a', 1))
+        self.assertFalse(pool._wakeup.is_set())
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(pool.get('a'), ('a', 2))
+        self._wait_filled(pool, 'a')
+        self.assertEqual(len(calls), 6)
+
+    def test_pool_disabled(self):
+        cfg.randomness_pool_depth = 0
+        pool = RandomnessPool('test', lambda key: key)
+        self.assertIsNone(pool.get('a'))
+        self.assertIsNone(pool._worker)
+
+    def test_elgamal_enc(self):
+        eg = ElgamalCrypto(None)
+        pk = eg.deserialize_pk(ELGAMAL_PK)
+        eg._enc(0, 0, pk)
+        self._wait_filled(ElgamalCrypto._randomness_pool, (ELGAMAL_PK[0], ELGAMAL_PK[1]))
+
+        cipher, rnd = eg._enc(42, 0, pk)
+        self.assertEqual(cipher, eg._enc_with_rand(42, rnd[0], ELGAMAL_PK))
+        self.assertEqual(eg._dec(cipher, ELGAMAL_SK)[0], 42)
+
+        rerand, rnd = eg.do_rerand(CipherValue(cipher, params=eg.params), ELGAMAL_PK)
+        self.assertNotEqual(rerand, cipher)
+        enc_zero = CipherValue(eg._enc_with_rand(0, rnd[0], ELGAMAL_PK), params=eg.params)
+        self.assertEqual(rerand, eg.do_op('+', ELGAMAL_PK, CipherValue(cipher, params=eg.params), enc_zero))
+        self.assertEqual(eg._dec(rerand, ELGAMAL_SK)[0], 42)
+
+    def test_paillier_enc(self):
+        pa = PaillierCrypto(None)
+        pk, sk = pa._generate_key_pair()
+        n = pa.deserialize_pk(pk)
+        pa._enc(0, 0, n)
+        self._wait_filled(PaillierCrypto._randomness_pool, n)
+
+        cipher, rnd = pa._enc(-42, 0, n)
+        self.assertEqual(cipher, pa._enc_with_rand(n - 42, pa.deserialize_pk(rnd), n))
+        self.assertEqual(pa._dec(cipher, sk)[0], -42)
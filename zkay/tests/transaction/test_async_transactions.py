@@ -0,0 +1,191 @@
+import threading
+from typing import Dict, List
+from unittest import mock
+
+from zkay.config import cfg
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.blockchain import web3py
+from zkay.transaction.blockchain.web3py import NonceManager, ReceiptPoller, BlockWatcher
+from zkay.transaction.interface import BlockChainError
+
+
+class DummyEth:
+    def __init__(self):
+        self.tx_counts: Dict[str, int] = {}
+        self.receipts: Dict[bytes, dict] = {}
+        self.count_requests = 0
+        self.receipt_requests: List[bytes] = []
+        self.receipt_failures = 0
+        self.blockNumber = 0
+
+    def getTransactionCount(self, address: str, block_identifier: str) -> int:
+        assert block_identifier == 'pending'
+        self.count_requests += 1
+        return self.tx_counts.get(address, 0)
+
+    def getTransactionReceipt(self, tx_hash: bytes):
+        self.receipt_requests.append(tx_hash)
+        if self.receipt_failures:
+            self.receipt_failures -= 1
+            raise ConnectionError('connection lost')
+        if tx_hash == b'invalid':
+            raise ValueError('unknown transaction')
+        return self.receipts.get(tx_hash)
+
+
+class DummyW3:
+    def __init__(self):
+        self.eth = DummyEth()
+
+    @staticmethod
+    def toChecksumAddress(address) -> str:
+        return address.hex() if isinstance(address, bytes) else address
+
+
+class TestNonceManager(ZkayTestCase):
+    def test_consecutive_nonces(self):
+        w3 = DummyW3()
+        w3.eth.tx_counts = {'a': 5, 'b': 2}
+        nonces = NonceManager(w3)
+        for expected in [5, 6, 7]:
+            with nonces.next_nonce('a') as nonce:
+                self.assertEqual(nonce, expected)
+        with nonces.next_nonce('b') as nonce:
+            self.assertEqual(nonce, 2)
+
+    def test_other_senders(self):
+        w3 = DummyW3()
+        w3.eth.tx_counts = {'a': 1}
+        nonces = NonceManager(w3)
+        with nonces.next_nonce('a') as nonce:
+            self.assertEqual(nonce, 1)
+
+        # Another process sent two transactions from the same account
+        w3.eth.tx_counts = {'a': 4}
+        with nonces.next_nonce('a') as nonce:
+            self.assertEqual(nonce, 4)
+
+    def test_resync_after_failure(self):
+        w3 = DummyW3()
+        w3.eth.tx_counts = {'a': 3}
+        nonces = NonceManager(w3)
+        with nonces.next_nonce('a'):
+            pass
+        with self.assertRaises(ValueError):
+            with nonces.next_nonce('a') as nonce:
+                self.assertEqual(nonce, 4)
+                raise ValueError('submission failed')
+
+        w3.eth.tx_counts = {'a': 4}
+        with nonces.next_nonce('a') as nonce:
+            self.assertEqual(nonce, 4)
+
+
+class TestReceiptPoller(ZkayTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.__interval = cfg.blockchain_receipt_poll_interval_ms
+        cfg.blockchain_receipt_poll_interval_ms = 1
+
+    def tearDown(self) -> None:
+        cfg.blockchain_receipt_poll_interval_ms = self.__interval
+        super().tearDown()
+
+    def test_shared_polling(self):
+        w3 = DummyW3()
+        poller = ReceiptPoller(w3)
+        mined = threading.Event()
+
+        def on_receipt(receipt):
+            mined.wait()
+            return receipt['status']
+
+        futures = [poller.add(bytes([i]), on_receipt) for i in range(3)]
+        self.assertFalse(any(f.done() for f in futures))
+        w3.eth.receipts = {bytes([i]): {'status': i} for i in range(3)}
+        mined.set()
+        self.assertEqual([f.result(timeout=10) for f in futures], [0, 1, 2])
+
+        # Transactions which are added later are polled as well (by the same or a new worker)
+        future = poller.add(b'\x03', lambda r: r)
+        w3.eth.receipts[b'\x03'] = {'status': 1}
+        self.assertEqual(future.result(timeout=10), {'status': 1})
+
+    def test_errors(self):
+        w3 = DummyW3()
+        w3.eth.receipts = {b'\x00': {'status': 0}}
+        poller = ReceiptPoller(w3)
+
+        def check(receipt):
+            raise BlockChainError('failed')
+
+        failed = poller.add(b'\x00', check)
+        with mock.patch.object(web3py, 'receipt_timeout', 0.1):
+            invalid = poller.add(b'invalid', lambda r: r)
+        with self.assertRaises(BlockChainError):
+            failed.result(timeout=10)
+        with self.assertRaises(BlockChainError):
+            invalid.result(timeout=10)
+
+    def test_retry_after_request_failure(self):
+        w3 = DummyW3()
+        w3.eth.receipts = {b'\x00': {'status': 1}}
+        w3.eth.receipt_failures = 2
+        poller = ReceiptPoller(w3)
+        self.assertEqual(poller.add(b'\x00', lambda r: r['status']).result(timeout=10), 1)
+        self.assertEqual(len(w3.eth.receipt_requests), 3)
+
+    def test_slow_callback(self):
+        w3 = DummyW3()
+        w3.eth.receipts = {b'\x00': {'status': 1}}
+        poller = ReceiptPoller(w3)
+        released = threading.Event()
+        slow = poller.add(b'\x00', lambda r: released.wait(10))
+
+        fast = poller.add(b'\x01', lambda r: r['status'])
+        w3.eth.receipts[b'\x01'] = {'status': 1}
+        self.assertEqual(fast.result(timeout=10), 1)
+        self.assertFalse(slow.done())
+        released.set()
+        self.assertTrue(slow.result(timeout=10))
+
+
+class TestBlockWatcher(ZkayTestCase):
+    class Subscriber:
+        def __init__(self):
+            self.blocks: List[int] = []
+            self.notified = threading.Event()
+
+        def on_new_block(self, block_number: int):
+            self.blocks.append(block_number)
+            self.notified.set()
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.__interval = cfg.blockchain_block_poll_interval_ms
+        cfg.blockchain_block_poll_interval_ms = 1
+
+    def tearDown(self) -> None:
+        cfg.blockchain_block_poll_interval_ms = self.__interval
+        super().tearDown()
+
+    def test_notifications(self):
+        w3 = DummyW3()
+        w3.eth.blockNumber = 3
+        watcher = BlockWatcher(w3)
+        subscribers = [self.Subscriber(), self.Subscriber()]
+        for subscriber in subscribers:
+            watcher.subscribe(subscriber.on_new_block)
+
+        w3.eth.blockNumber = 5
+        for subscriber in subscribers:
+            self.assertTrue(subscriber.notified.wait(10))
+            self.assertEqual(subscriber.blocks, [5])
+        del subscriber
+
+        # The worker terminates once all subscribers were garbage collected
+        worker = watcher._worker
+        subscribers.clear()
+        worker.join(10)
+        self.assertFalse(worker.is_alive())
+        self.assertIsNone(watcher._worker)
@@ -0,0 +1,94 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, List
+
+from zkay.config import cfg
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.blockchain.web3py import BatchHTTPProvider, Web3HttpBlockchain
+
+owner = '0x' + '12' * 20
+abi = [
+    {'type': 'function', 'name': 'x', 'stateMutability': 'view', 'inputs': [],
+     'outputs': [{'name': '', 'type': 'uint256'}]},
+    {'type': 'function', 'name': 'owners', 'stateMutability': 'view', 'inputs': [{'name': '', 'type': 'uint256'}],
+     'outputs': [{'name': '', 'type': 'address'}]},
+]
+results = {'x': 5, 'owners': int(owner, 16)}
+
+
+class DummyNode(BaseHTTPRequestHandler):
+    """JSON-RPC endpoint which answers eth_call requests for the getters in abi."""
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.posts.append(request)
+        if isinstance(request, list):
+            if self.server.batch_support:
+                # Responses of a batch may be in any order
+                response = [self._response(r) for r in reversed(request)]
+            else:
+                response = {'jsonrpc': '2.0', 'id': None, 'error': {'code': -32600, 'message': 'batch not supported'}}
+        else:
+            response = self._response(request)
+        data = json.dumps(response).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    @staticmethod
+    def _response(request: Dict) -> Dict[str, Any]:
+        if request['method'] == 'eth_call':
+            # Selector of x() is 0x0c55699c
+            val = results['x' if request['params'][0]['data'].startswith('0x0c55699c') else 'owners']
+            result = '0x' + val.to_bytes(32, 'big').hex()
+        elif request['method'] == 'net_version':
+            result = '1'
+        else:
+            result = 'dummy'
+        return {'jsonrpc': '2.0', 'id': request['id'], 'result': result}
+
+    def log_message(self, *args):
+        pass
+
+
+class TestBatchRequests(ZkayTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.server = HTTPServer(('127.0.0.1', 0), DummyNode)
+        self.server.posts: List = []
+        self.server.batch_support = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.uri = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+    def test_make_batch_request(self):
+        provider = BatchHTTPProvider(self.uri)
+        calls = [('web3_clientVersion', []), ('net_version', [])]
+        responses = provider.make_batch_request(calls)
+        self.assertEqual([r['result'] for r in responses], ['dummy', '1'])
+        self.assertEqual(len(self.server.posts), 1)
+
+        self.server.batch_support = False
+        self.assertIsNone(provider.make_batch_request(calls))
+
+    def test_req_state_vars(self):
+        old_uri = cfg.blockchain_node_uri
+        cfg.blockchain_node_uri = self.uri
+        try:
+            chain = Web3HttpBlockchain()
+        finally:
+            cfg.blockchain_node_uri = old_uri
+        contract = chain.w3.eth.contract(address=chain.w3.toChecksumAddress('0x' + 'ab' * 20), abi=abi)
+
+        self.server.posts.clear()
+        vals = chain._req_state_vars(contract, [('x', ()), ('owners', (1,)), ('x', ())])
+        self.assertEqual(vals, [5, chain.w3.toChecksumAddress(owner), 5])
+        self.assertEqual(len(self.server.posts), 1)
+        self.assertEqual([r['method'] for r in self.server.posts[0]], ['eth_call'] * 3)
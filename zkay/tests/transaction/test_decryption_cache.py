@@ -0,0 +1,125 @@
+import os
+import tempfile
+import time
+from typing import List, Tuple
+from unittest import mock
+
+from zkay.config import cfg
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto.dummy import DummyCrypto
+from zkay.transaction.keystore import SimpleKeystore, decryption_cache
+from zkay.transaction.types import AddressValue, CipherValue
+
+
+class CountingCrypto(DummyCrypto):
+    def __init__(self, keystore):
+        super().__init__(keystore)
+        self.decrypted: List[int] = []
+
+    def _dec(self, cipher: Tuple[int, ...], sk: int) -> Tuple[int, List[int]]:
+        self.decrypted.append(cipher[0])
+        return super()._dec(cipher, sk)
+
+
+class TestDecryptionCache(ZkayTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.old_data_dir = cfg.data_dir
+        self.old_size, self.old_disk_cache = cfg.decryption_cache_size, cfg.decryption_disk_cache
+        self.old_disk_size = cfg.decryption_disk_cache_size_mb
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        cfg._data_dir = self.tmp_dir.name
+        cfg.decryption_cache_size = 2
+        self.addr = AddressValue('0x' + '12' * 20)
+
+    def tearDown(self) -> None:
+        cfg._data_dir = self.old_data_dir
+        cfg.decryption_cache_size, cfg.decryption_disk_cache = self.old_size, self.old_disk_cache
+        cfg.decryption_disk_cache_size_mb = self.old_disk_size
+        self.tmp_dir.cleanup()
+        super().tearDown()
+
+    def _new_crypto(self) -> CountingCrypto:
+        keystore = SimpleKeystore(None, DummyCrypto.params)
+        crypto = CountingCrypto(keystore)
+        keystore.local_key_pairs[self.addr] = crypto._generate_or_load_key_pair(self.addr.val.hex())
+        return crypto
+
+    def _cipher(self, crypto: CountingCrypto, plain: int) -> CipherValue:
+        pk = crypto.deserialize_pk(crypto.keystore.pk(self.addr)[:])
+        return CipherValue(crypto._enc(plain, 0, pk)[0], params=crypto.params)
+
+    def test_memory_cache(self):
+        crypto = self._new_crypto()
+        c1, c2, c3 = [self._cipher(crypto, plain) for plain in (1, 2, 3)]
+        for _ in range(3):
+            self.assertEqual(crypto.dec(c1, self.addr)[0], 1)
+        self.assertEqual([plain for plain, _ in crypto.dec_batch([c1, c2, c3], self.addr)], [1, 2, 3])
+        self.assertEqual(len(crypto.decrypted), 3)
+
+        # Least recently used entry (c1) was evicted
+        self.assertEqual(crypto.dec(c3, self.addr)[0], 3)
+        self.assertEqual(crypto.dec(c1, self.addr)[0], 1)
+        self.assertEqual(len(crypto.decrypted), 4)
+
+        cfg.decryption_cache_size = 0
+        crypto.dec(c1, self.addr)
+        self.assertEqual(len(crypto.decrypted), 5)
+
+    def test_disk_cache(self):
+        cfg.decryption_disk_cache = True
+        crypto = self._new_crypto()
+        cipher = self._cipher(crypto, 42)
+        plain, rnd = crypto.dec(cipher, self.addr)
+
+        crypto = self._new_crypto()
+        self.assertEqual(crypto.dec(cipher, self.addr), (plain, rnd))
+        self.assertEqual(crypto.decrypted, [])
+
+        # Entries are not readable without the key
+        cache_dir = os.path.join(cfg.data_dir, 'decryption_cache')
+        files = [os.path.join(d, f) for d, _, fs in os.walk(cache_dir) for f in fs]
+        self.assertEqual(len(files), 1)
+        with open(files[0], 'rb') as f:
+            self.assertNotIn(b'42', f.read())
+        for f in os.listdir(os.path.join(cfg.data_dir, 'keys')):
+            os.remove(os.path.join(cfg.data_dir, 'keys', f))
+        crypto = self._new_crypto()
+        self.assertEqual(crypto.dec(cipher, self.addr)[0], 42)
+        self.assertEqual(len(crypto.decrypted), 1)
+
+    def _disk_files(self) -> List[str]:
+        cache_dir = os.path.join(cfg.data_dir, 'decryption_cache')
+        return sorted(os.path.join(d, f) for d, _, fs in os.walk(cache_dir) for f in fs)
+
+    def test_disk_cache_size(self):
+        cfg.decryption_disk_cache = True
+        cfg.decryption_cache_size = 0
+        crypto = self._new_crypto()
+        c1, c2, c3 = [self._cipher(crypto, plain) for plain in (1, 2, 3)]
+
+        # The size is only determined by a scan once
+        with mock.patch.object(decryption_cache, '_evict', wraps=decryption_cache._evict) as evict:
+            crypto.dec(c1, self.addr)
+            crypto.dec(c2, self.addr)
+            self.assertEqual(evict.call_count, 1)
+        files = self._disk_files()
+        self.assertEqual(crypto.keystore.decryption_cache._disk_size, sum(os.path.getsize(f) for f in files))
+
+        # Least recently used entries are evicted first
+        for i, f in enumerate(files):
+            os.utime(f, (time.time() - 10 - i, time.time() - 10 - i))
+        cache_dir = os.path.join(cfg.data_dir, 'decryption_cache')
+        self.assertEqual(decryption_cache._evict(cache_dir, os.path.getsize(files[0])), os.path.getsize(files[0]))
+        self.assertEqual(self._disk_files(), files[:1])
+        crypto.dec(c1, self.addr)
+        crypto.dec(c2, self.addr)
+        self.assertEqual(len(crypto.decrypted), 3)
+
+        # Exceeding the limit trims the cache
+        cfg.decryption_disk_cache_size_mb = 0
+        crypto.dec(c3, self.addr)
+        self.assertEqual(self._disk_files(), [])
+
+        with self.assertRaises(ValueError):
+            cfg.decryption_disk_cache_size_mb = -1
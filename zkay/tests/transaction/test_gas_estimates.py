@@ -0,0 +1,230 @@
+import json
+import os
+import tempfile
+from typing import Dict, List
+
+from zkay.config import cfg
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.blockchain.web3py import GasEstimateCache, Web3Blockchain, intrinsic_gas
+from zkay.transaction.interface import TransactionFailedException
+
+
+class DummyFunction:
+    def __init__(self, eth: 'DummyEth', name: str):
+        self.eth = eth
+        self.name = name
+
+    def estimateGas(self, tx: dict) -> int:
+        self.eth.requests.append('estimateGas')
+        return self.eth.estimates[self.name]
+
+    def call(self, tx: dict):
+        self.eth.requests.append('call')
+        return tx['gas']
+
+    def transact(self, tx: dict) -> bytes:
+        self.eth.requests.append('transact')
+        self.eth.sent.append(tx)
+        tx_hash = bytes([len(self.eth.sent)])
+        if tx['gas'] < self.eth.required.get(self.name, 0):
+            # Out of gas
+            receipt = {'status': 0, 'gasUsed': tx['gas']}
+        else:
+            receipt = {'status': self.eth.status, 'gasUsed': self.eth.gas_used[self.name]}
+        self.eth.receipts[tx_hash] = dict(receipt, blockNumber=self.eth.block_number)
+        return tx_hash
+
+
+class DummyContract:
+    def __init__(self, eth: 'DummyEth'):
+        self.address = '0xc'
+        self.eth = eth
+
+    @property
+    def functions(self):
+        return self
+
+    def __getitem__(self, name: str):
+        return lambda *args: DummyFunction(self.eth, name)
+
+    @staticmethod
+    def encodeABI(fn_name: str, args: list) -> str:
+        # Selector + one zero word per argument
+        return '0x' + 'ab' * 4 + '00' * 32 * len(args)
+
+
+class DummyEth:
+    def __init__(self):
+        self.requests: List[str] = []
+        self.sent: List[dict] = []
+        self.receipts: Dict[bytes, dict] = {}
+        self.block_number = 1
+        self.estimates = {'f': 1000}
+        self.gas_used = {'f': 900}
+        self.required: Dict[str, int] = {}
+        self.status = 1
+
+    def getBlock(self, block_identifier: str) -> dict:
+        self.requests.append('getBlock')
+        return {'number': self.block_number, 'gasLimit': 100000 + self.block_number, 'timestamp': 0}
+
+    def getTransactionCount(self, address: str, block_identifier: str) -> int:
+        return 0
+
+    def getTransactionReceipt(self, tx_hash: bytes):
+        return self.receipts.get(tx_hash)
+
+
+class DummyW3:
+    def __init__(self):
+        self.eth = DummyEth()
+
+    @staticmethod
+    def isConnected() -> bool:
+        return True
+
+    @staticmethod
+    def toChecksumAddress(address) -> str:
+        return address
+
+
+class DummyBlockchain(Web3Blockchain):
+    def _create_w3_instance(self):
+        return DummyW3()
+
+    def _default_address(self):
+        return 'a'
+
+
+class TestGasEstimateCache(ZkayTestCase):
+    def test_estimates(self):
+        cache = GasEstimateCache()
+        key = GasEstimateCache.key('0xc', 'f', ([1, 2], 3, (4,)))
+        self.assertEqual(key, ('0xc', 'f', (2, None, 1)))
+        self.assertIsNone(cache.get(key))
+
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, 'gas_estimates.json')
+            with open(filename, 'w') as f:
+                json.dump({'C': {'f': 500}, 'D': {'f': 1}}, f)
+            cache.load_static_estimates('0xc', filename, 'C')
+            cache.load_static_estimates('0xd', os.path.join(d, 'missing.json'), 'C')
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(cache.get_static(key), 500)
+        self.assertIsNone(cache.get_static(('0xd', 'f', ())))
+
+        cache.update(key, 700)
+        cache.update(key, 600)
+        self.assertEqual(cache.get(key), 700)
+        self.assertIsNone(cache.get(('0xc', 'f', (3, None, 1))))
+
+        cache.discard(key)
+        self.assertIsNone(cache.get(key))
+
+    def test_intrinsic_gas(self):
+        self.assertEqual(intrinsic_gas('0x'), 21000)
+        self.assertEqual(intrinsic_gas('0x0001ff'), 21000 + 4 + 16 + 16)
+
+
+class TestWeb3GasHeuristic(ZkayTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.__cache, self.__interval = cfg.blockchain_gas_estimate_cache, cfg.blockchain_receipt_poll_interval_ms
+        self.__block_interval = cfg.blockchain_block_poll_interval_ms
+        cfg.blockchain_receipt_poll_interval_ms = 1
+        self.chain = DummyBlockchain()
+        self.eth = self.chain.w3.eth
+        self.contract = DummyContract(self.eth)
+
+    def tearDown(self) -> None:
+        cfg.blockchain_gas_estimate_cache, cfg.blockchain_receipt_poll_interval_ms = self.__cache, self.__interval
+        cfg.blockchain_block_poll_interval_ms = self.__block_interval
+        super().tearDown()
+
+    def test_call_without_estimate(self):
+        self.assertEqual(self.chain._call(self.contract, 'a', 'f', 1), 100001)
+        self.assertEqual(self.chain._call(self.contract, 'a', 'f', 2), 100001)
+        self.assertEqual(self.eth.requests, ['getBlock', 'call', 'call'])
+
+    def test_block_gas_limit_per_block(self):
+        cfg.blockchain_gas_estimate_cache = False
+        for _ in range(2):
+            self.chain._transact(self.contract, 'a', 'f', 1)
+        self.assertEqual(self.eth.requests, ['getBlock', 'estimateGas', 'transact', 'estimateGas', 'transact'])
+        self.assertEqual([tx['gas'] for tx in self.eth.sent], [1200, 1200])
+
+        # A receipt from a newer block invalidates the block gas limit
+        self.eth.requests.clear()
+        self.eth.block_number = 2
+        self.chain._transact(self.contract, 'a', 'f', 1)
+        self.chain._transact(self.contract, 'a', 'f', 1)
+        self.assertEqual(self.eth.requests, ['estimateGas', 'transact', 'getBlock', 'estimateGas', 'transact'])
+
+    def test_block_gas_limit_expires(self):
+        cfg.blockchain_gas_estimate_cache = False
+        cfg.blockchain_block_poll_interval_ms = 0
+        self.chain._transact(self.contract, 'a', 'f', 1)
+        self.eth.block_number = 2
+        self.assertEqual(self.chain._call(self.contract, 'a', 'f', 1), 100002)
+        self.assertEqual(self.eth.requests.count('getBlock'), 2)
+
+    def test_cached_estimates(self):
+        cfg.blockchain_gas_estimate_cache = True
+        self.chain._transact(self.contract, 'a', 'f', [1, 2])
+        self.chain._transact(self.contract, 'a', 'f', [3, 4])
+        self.chain._transact(self.contract, 'a', 'f', [1])
+        self.assertEqual(self.eth.requests.count('estimateGas'), 2)
+
+        # The gas used (after refunds) does not replace the estimate
+        self.eth.gas_used['f'] = 500
+        self.chain._transact(self.contract, 'a', 'f', [1, 2])
+        self.chain._transact(self.contract, 'a', 'f', [1, 2])
+        self.assertEqual([tx['gas'] for tx in self.eth.sent[-2:]], [1200, 1200])
+
+        # Out of gas discards the estimate, the transaction is resubmitted only once
+        self.eth.requests.clear()
+        self.eth.required['f'] = 1500
+        with self.assertRaises(TransactionFailedException):
+            self.chain._transact(self.contract, 'a', 'f', [1, 2])
+        self.assertEqual(self.eth.requests, ['transact', 'estimateGas', 'transact'])
+        self.eth.required.clear()
+        self.eth.requests.clear()
+        self.chain._transact(self.contract, 'a', 'f', [1, 2])
+        self.assertEqual(self.eth.requests, ['estimateGas', 'transact'])
+
+        # Other failures are not resubmitted
+        self.eth.status = 0
+        self.eth.requests.clear()
+        with self.assertRaises(TransactionFailedException):
+            self.chain._transact(self.contract, 'a', 'f', [1, 2])
+        self.assertEqual(self.eth.requests, ['transact'])
+
+    def test_static_estimates(self):
+        cfg.blockchain_gas_estimate_cache = True
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, 'gas_estimates.json')
+            with open(filename, 'w') as f:
+                json.dump({'C': {'f': 500}}, f)
+            self.chain._gas_estimates.load_static_estimates(self.contract.address, filename, 'C')
+
+        # Intrinsic and calldata gas are added to the static execution gas
+        self.chain._transact(self.contract, 'a', 'f', 1)
+        self.assertNotIn('estimateGas', self.eth.requests)
+        self.assertEqual(self.eth.sent[0]['gas'], int((500 + 21000 + 4 * 16 + 32 * 4) * 1.2))
+
+    def test_static_estimate_too_low(self):
+        cfg.blockchain_gas_estimate_cache = True
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, 'gas_estimates.json')
+            with open(filename, 'w') as f:
+                json.dump({'C': {'f': 500}}, f)
+            self.chain._gas_estimates.load_static_estimates(self.contract.address, filename, 'C')
+        self.eth.estimates['f'], self.eth.required['f'], self.eth.gas_used['f'] = 40000, 35000, 34000
+
+        # The transaction is resubmitted with a new estimate, which is used from then on
+        receipt = self.chain._transact_async(self.contract, 'a', 'f', 1).result()
+        self.assertEqual((receipt['status'], receipt['gasUsed']), (1, 34000))
+        self.assertEqual([tx['gas'] for tx in self.eth.sent], [int((500 + 21000 + 4 * 16 + 32 * 4) * 1.2), 48000])
+        self.chain._transact(self.contract, 'a', 'f', 1)
+        self.assertEqual(self.eth.requests.count('estimateGas'), 1)
+        self.assertEqual(self.eth.sent[-1]['gas'], 48000)
@@ -9,6 +9,8 @@ from zkay.config import cfg
 from zkay.jsnark_interface import libsnark_interface
 from zkay.examples.example_scenarios import get_scenario
 from zkay.tests.transaction.test_offchain_simulation import TestOffchainBase
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.crypto.paillier import PaillierCrypto
 from zkay.utils import run_command
 from zkay.utils.run_command import get_command
 
@@ -21,6 +23,13 @@ from zkay.utils.run_command import get_command
 #   utime_s:     User-mode time in seconds. Likely greater than realtime_s due to use of multiple threads
 #   stime_s:     Kernel-mode time in seconds
 #   maxrss_kb:   Maximum resident set size during execution of program. Used as a proxy for total memory usage.
+#
+# PaillierDecryptionBenchmark only runs if ZKAY_RUN_BENCHMARKS=1 is set (or if this file is run directly), it prints a CSV
+# with the columns:
+#   key_bits:     Length of Paillier public key 'n'
+#   reference_ms: Time per decryption (including randomness recovery) without CRT, as computed before CRT decryption was introduced
+#   crt_ms:       Time per decryption using PaillierCrypto._dec
+#   speedup:      reference_ms / crt_ms
 
 STEP_BITS = 2        # Include 2^(STEP_BITS - 1) - 1 values between powers-of-2 in benchmark. 1: Powers-of-2 only
 MIN_KEY_BITS = 384   # All bits except for the first STEP_BITS bits must be zero. Must be >= 320
@@ -28,6 +37,8 @@ MAX_KEY_BITS = 2048  # All bits except for the first STEP_BITS bits must be zero
 NUM_RUNS = 3         # Number of runs per key size
 SEP = ','            # Value separator in output. Some people prefer TSV over CSV
 
+RUN_BENCHMARKS = os.environ.get('ZKAY_RUN_BENCHMARKS') == '1' or __name__ == '__main__'
+
 orig_run_command = run_command.run_command
 
 
@@ -128,7 +139,77 @@ class PaillierBenchmark(TestOffchainBase):
                 key_bits += 1 << (key_bits.bit_length() - STEP_BITS)
 
 
+def _reference_dec(p: int, q: int, c: int) -> Tuple[int, int]:
+    n = p * q
+    n_sqr = n * n
+    lambda_ = (p - 1) * (q - 1)
+    plain = (pow(c, lambda_, n_sqr) - 1) // n * pow(lambda_, -1, n) % n
+
+    rand_pow_n = (c * pow(n + 1, -plain, n_sqr)) % n_sqr
+    r_p = pow(rand_pow_n, pow(q, -1, p - 1), p)
+    r_q = pow(rand_pow_n, pow(p, -1, q - 1), q)
+    random = (r_p * pow(q, -1, p) * q + r_q * pow(p, -1, q) * p) % n
+    return plain, random
+
+
+class PaillierDecryptionBenchmark(ZkayTestCase):
+    DEC_RUNS = 10  # Number of decryptions per key size
+
+    def setUp(self) -> None:
+        super().setUp()
+        from zkay.transaction.crypto.meta import cryptoparams
+        self.old_params = dict(cryptoparams['paillier'])
+
+    def tearDown(self) -> None:
+        from zkay.transaction.crypto.meta import cryptoparams
+        cryptoparams['paillier'].update(self.old_params)
+        super().tearDown()
+
+    def _time_dec(self, key_bits: int, runs: int) -> Tuple[float, float]:
+        """Return the time per decryption of the reference and of the CRT implementation, after checking that both agree."""
+        _set_paillier_key_size(key_bits)
+        crypto = PaillierCrypto(None)
+        pk, sk = crypto._generate_key_pair()
+        n = crypto.deserialize_pk(pk)
+        p, q = crypto.deserialize_pk(sk[:crypto.params.key_len]), crypto.deserialize_pk(sk[crypto.params.key_len:])
+        cipher, rnd = crypto._enc(1234, 0, n)
+        c = crypto.deserialize_pk(cipher)
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            ref_plain, ref_rnd = _reference_dec(p, q, c)
+        ref_time = (time.perf_counter() - start) / runs
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            plain, rnd_chunks = crypto._dec(cipher, sk)
+        crt_time = (time.perf_counter() - start) / runs
+
+        self.assertEqual((plain, rnd_chunks), (ref_plain, crypto.serialize_pk(ref_rnd, crypto.params.rnd_bytes)))
+        self.assertEqual((plain, rnd_chunks), (1234, rnd))
+        return ref_time, crt_time
+
+    @unittest.skipIf(False or 'ZKAY_SKIP_REAL_ENC_TESTS' in os.environ and os.environ['ZKAY_SKIP_REAL_ENC_TESTS'] == '1', 'real encryption tests disabled')
+    def test_dec_matches_reference(self):
+        self._time_dec(MIN_KEY_BITS, 1)
+
+    @unittest.skipIf(not RUN_BENCHMARKS, 'benchmarks disabled (set ZKAY_RUN_BENCHMARKS=1)')
+    @unittest.skipIf(False or 'ZKAY_SKIP_REAL_ENC_TESTS' in os.environ and os.environ['ZKAY_SKIP_REAL_ENC_TESTS'] == '1', 'real encryption tests disabled')
+    def test_run_dec_benchmark(self):
+        print()
+        print('key_bits', 'reference_ms', 'crt_ms', 'speedup', sep=SEP)
+        key_bits = MIN_KEY_BITS
+        while key_bits <= MAX_KEY_BITS:
+            ref_time, crt_time = self._time_dec(key_bits, self.DEC_RUNS)
+            print(key_bits, f'{ref_time * 1000:.3f}', f'{crt_time * 1000:.3f}', f'{ref_time / crt_time:.1f}', sep=SEP)
+            key_bits += 1 << (key_bits.bit_length() - STEP_BITS)
+
+
 # I also want to be able to run this directly, without using the unittest framework.
 if __name__ == "__main__":
     cfg._is_unit_test = True
+    dec_benchmark = PaillierDecryptionBenchmark('test_run_dec_benchmark')
+    dec_benchmark.setUp()
+    dec_benchmark.test_run_dec_benchmark()
+    dec_benchmark.tearDown()
     PaillierBenchmark('test_run_benchmark').test_run_benchmark()
@@ -0,0 +1,88 @@
+import threading
+import time
+from typing import List
+
+from zkay.config import cfg
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.interface import ZkayProverInterface, ProofGenerationError
+from zkay.transaction.types import AddressValue
+
+
+class DummyProver(ZkayProverInterface):
+    def __init__(self, memory: int = 0):
+        super().__init__()
+        self.memory = memory
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+        self.started: List[str] = []
+
+    def _generate_proof(self, verifier_dir: str, priv_values: List[int], in_vals: List[int], out_vals: List[int]) -> List[int]:
+        with self.lock:
+            self.started.append(verifier_dir)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        if verifier_dir == 'fail':
+            raise ProofGenerationError('proof generation failed')
+        return [sum(priv_values + in_vals + out_vals)]
+
+    def _estimate_proof_memory(self, verifier_dir: str) -> int:
+        return self.memory
+
+    def get_prover_key_hash(self, verifier_directory: str) -> bytes:
+        return b''
+
+
+class TestProverPool(ZkayTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.__size, self.__mem = cfg.prover_pool_size, cfg.prover_memory_limit_mb
+
+    def tearDown(self) -> None:
+        cfg.prover_pool_size, cfg.prover_memory_limit_mb = self.__size, self.__mem
+        super().tearDown()
+
+    def _run_jobs(self, prover: DummyProver, count: int) -> List[List[int]]:
+        futures = [prover.pool.submit(f'v{i}', [i], [1], [2]) for i in range(count)]
+        results = [f.result(timeout=10) for f in futures]
+        prover.shutdown_pool()
+        return results
+
+    def test_bounded_by_pool_size(self):
+        cfg.prover_pool_size = 3
+        prover = DummyProver()
+        self.assertEqual(self._run_jobs(prover, 8), [[i + 3] for i in range(8)])
+        self.assertEqual(prover.max_running, 3)
+        self.assertEqual(prover.started, [f'v{i}' for i in range(8)])
+
+    def test_bounded_by_memory(self):
+        cfg.prover_pool_size = 4
+        cfg.prover_memory_limit_mb = 2
+        prover = DummyProver(memory=1024 * 1024)
+        self._run_jobs(prover, 6)
+        self.assertEqual(prover.max_running, 2)
+
+        # A job which exceeds the limit on its own runs alone
+        prover = DummyProver(memory=3 * 1024 * 1024)
+        self._run_jobs(prover, 3)
+        self.assertEqual(prover.max_running, 1)
+
+    def test_errors(self):
+        cfg.prover_pool_size = 2
+        prover = DummyProver()
+        failed = prover.pool.submit('fail', [], [], [])
+        ok = prover.pool.submit('v', [1], [], [])
+        with self.assertRaises(ProofGenerationError):
+            failed.result(timeout=10)
+        self.assertEqual(ok.result(timeout=10), [1])
+        prover.shutdown_pool()
+
+    def test_generate_proof_async(self):
+        prover = DummyProver()
+        proof = prover.generate_proof_async('/project', 'C', 'f', [AddressValue(5), 1], [2], [3])
+        self.assertEqual(proof.result(timeout=10), [11])
+        self.assertTrue(prover.started[0].startswith('/project/'))
+        prover.shutdown_pool()
@@ -0,0 +1,116 @@
+from typing import List, Tuple
+
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.transaction.interface import BlockChainError
+from zkay.transaction.offchain import StateDict, StateMirror
+from zkay.transaction.types import CipherValue
+
+
+class DummyApi:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.single_requests = []
+        self.batch_requests = []
+        self.state_mirror = None
+        self.supports_batched_requests = True
+
+    @staticmethod
+    def _val(name: str, indices: Tuple) -> int:
+        return hash((name, *indices)) % 1000
+
+    def _req_state_var(self, name: str, *indices, count=0):
+        self.single_requests.append((name, indices))
+        if count:
+            return [self._val(name, (*indices, i)) for i in range(count)]
+        return self._val(name, indices)
+
+    def _req_state_vars(self, requests: List[Tuple[str, Tuple]]):
+        if self.fail:
+            raise BlockChainError('request failed')
+        self.batch_requests.append(requests)
+        return [self._val(name, indices) for name, indices in requests]
+
+
+class TestStateDict(ZkayTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.api = DummyApi()
+        self.state = StateDict(self.api)
+        self.state.decl('x', int)
+        self.state.decl('m', int)
+        self.state.decl('c', cipher=True, crypto_backend='ecdh-chaskey')
+
+    def test_prefetch(self):
+        self.state.prefetch([('x', ), ('m', 3), ('c', 'addr'), ('m', 3)])
+        self.assertEqual(len(self.api.batch_requests), 1)
+        self.assertEqual(len(self.api.batch_requests[0]), 2 + CipherValue(crypto_backend='ecdh-chaskey').params.cipher_len)
+
+        self.assertEqual(self.state['x'], DummyApi._val('x', ()))
+        self.assertEqual(self.state['m', 3], DummyApi._val('m', (3, )))
+        cipher = self.state['c', 'addr']
+        self.assertEqual(list(cipher[:cipher.params.cipher_len]), [DummyApi._val('c', ('addr', i)) for i in range(cipher.params.cipher_len)])
+        self.assertEqual(self.api.single_requests, [])
+
+    def test_prefetch_keeps_local_values(self):
+        self.state['x'] = 42
+        self.state.prefetch([('x', ), ('m', 1)])
+        self.assertEqual(self.api.batch_requests, [[('m', (1, ))]])
+        self.assertEqual(self.state['x'], 42)
+
+    def test_prefetch_failure(self):
+        self.api.fail = True
+        self.state.prefetch([('x', )])
+        self.assertEqual(self.state['x'], DummyApi._val('x', ()))
+        self.assertEqual(self.api.single_requests, [('x', ())])
+
+    def test_no_prefetch_without_batching(self):
+        self.api.supports_batched_requests = False
+        self.state.prefetch([('x', ), ('m', 1)])
+        self.assertEqual(self.api.batch_requests, [])
+        self.assertEqual(self.state['x'], DummyApi._val('x', ()))
+        self.assertEqual(self.api.single_requests, [('x', ())])
+
+
+class TestStateMirror(ZkayTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.api = DummyApi()
+        self.api.state_mirror = StateMirror()
+        self.state = StateDict(self.api)
+        self.state.decl('x', int)
+        self.state.decl('m', int)
+
+    def test_reads_within_block(self):
+        for _ in range(3):
+            self.assertEqual(self.state.get_raw('m', 1), DummyApi._val('m', (1, )))
+        self.assertEqual(self.api.single_requests, [('m', (1, ))])
+
+        self.api.state_mirror.on_new_block(7)
+        self.state.get_raw('m', 1)
+        self.api.state_mirror.on_new_block(7)
+        self.state.get_raw('m', 1)
+        self.api.state_mirror.invalidate()
+        self.state.get_raw('m', 1)
+        self.assertEqual(len(self.api.single_requests), 3)
+
+    def test_transactions_bypass_mirror(self):
+        self.state.get_raw('x')
+        self.state.clear()
+        self.assertEqual(self.state['x'], DummyApi._val('x', ()))
+        self.assertEqual(len(self.api.single_requests), 2)
+
+        # Values requested during transactions are mirrored, local writes are not
+        self.state.prefetch([('m', 2)])
+        self.state['x'] = 42
+        self.assertEqual(self.state.get_raw('m', 2), DummyApi._val('m', (2, )))
+        self.assertEqual(self.state.get_raw('x'), DummyApi._val('x', ()))
+        self.assertEqual(len(self.api.single_requests), 2)
+
+    def test_outdated_values_are_not_stored(self):
+        mirror = self.api.state_mirror
+        version = mirror.version
+        mirror.on_new_block(1)
+        mirror.put('x', 1, version)
+        self.assertIsNone(mirror.get('x'))
+        mirror.put('x', 2, mirror.version)
+        self.assertEqual(mirror.get('x'), 2)
@@ -1,5 +1,9 @@
+import os
+import tempfile
+
 from zkay.tests.zkay_unit_test import ZkayTestCase
-from zkay.utils.helpers import lines_of_code
+from zkay.utils import helpers
+from zkay.utils.helpers import lines_of_code, hash_file, hash_file_cached, get_available_memory
 
 example_code = """pragma solidity ^0.6.0;
 
@@ -32,3 +36,27 @@ class TestHelpers(ZkayTestCase):
     def test_lines_of_code(self):
         loc = lines_of_code(example_code)
         self.assertEqual(loc, 18)
+
+    def test_hash_file_cached(self):
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, 'proving.key')
+            with open(filename, 'wb') as f:
+                f.write(b'first')
+            self.assertEqual(hash_file_cached(filename), hash_file(filename))
+            self.assertEqual(hash_file_cached(filename), hash_file(filename))
+
+            # Modified file must be rehashed, replacing the old digest
+            with open(filename, 'wb') as f:
+                f.write(b'second key')
+            self.assertEqual(hash_file_cached(filename), hash_file(filename))
+            self.assertEqual([path for path in helpers._file_digests if path.startswith(os.path.abspath(d))], [os.path.abspath(filename)])
+
+    def test_get_available_memory(self):
+        with tempfile.TemporaryDirectory() as d:
+            meminfo = os.path.join(d, 'meminfo')
+            with open(meminfo, 'w') as f:
+                f.write('MemTotal:       16000000 kB\nMemFree:          100000 kB\nMemAvailable:    8000000 kB\n')
+            self.assertEqual(get_available_memory(meminfo), 8000000 * 1024)
+
+            # Fall back to sysconf
+            self.assertGreater(get_available_memory(os.path.join(d, 'missing')), 0)
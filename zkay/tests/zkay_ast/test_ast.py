@@ -1,6 +1,11 @@
+from parameterized import parameterized_class
+
+from zkay.examples.examples import all_examples
+from zkay.tests.utils.test_examples import TestExamples
 from zkay.tests.zkay_unit_test import ZkayTestCase
 from zkay.zkay_ast.ast import BooleanLiteralExpr, RequireStatement, Identifier, IdentifierExpr, AssignmentStatement, \
-    BuiltinFunction, FunctionCallExpr, NumberLiteralExpr
+    BuiltinFunction, FunctionCallExpr, NumberLiteralExpr, StatementList
+from zkay.zkay_ast.build_ast import build_ast
 
 
 class TestASTSimpleStorageDetailed(ZkayTestCase):
@@ -29,3 +34,27 @@ class TestASTSimpleStorageDetailed(ZkayTestCase):
         f = BuiltinFunction('+')
         c = FunctionCallExpr(f, [NumberLiteralExpr(0), NumberLiteralExpr(0)])
         self.assertEqual(c.code(), '0 + 0')
+
+    def test_statement_list_index_of(self):
+        stmts = [RequireStatement(BooleanLiteralExpr(True)) for _ in range(3)]
+        sl = StatementList(stmts[:2])
+        self.assertEqual(sl.index_of(stmts[1]), 1)
+        sl.statements.insert(0, stmts[2])
+        self.assertEqual(sl.index_of(stmts[1]), 2)
+        self.assertEqual(sl.index_of(stmts[2]), 0)
+        sl.statements.remove(stmts[0])
+        with self.assertRaises(ValueError):
+            sl.index_of(stmts[0])
+
+
+@parameterized_class(('name', 'example'), all_examples)
+class TestASTChildren(TestExamples):
+
+    def test_children_match_process_children(self):
+        todo = [build_ast(self.example.code())]
+        while todo:
+            ast = todo.pop()
+            processed = []
+            ast.process_children(lambda c: processed.append(c) or c)
+            self.assertEqual(ast.children(), [c for c in processed if c is not None], f'{type(ast).__name__}')
+            todo += ast.children()
@@ -1,9 +1,20 @@
+import re
+from copy import deepcopy
+from typing import Tuple
+from unittest import mock
+
 from parameterized import parameterized_class
 
+from zkay.compiler.privacy.circuit_generation.backends.jsnark_generator import JsnarkVisitor
+from zkay.compiler.privacy.offchain_compiler import PythonOffchainVisitor
+from zkay.compiler.privacy.transformation.zkay_contract_transformer import transform_ast
 from zkay.examples.examples import all_examples
 from zkay.tests.utils.test_examples import TestExamples
+from zkay.zkay_ast.ast import AST
 from zkay.zkay_ast.build_ast import build_ast
+from zkay.zkay_ast.process_ast import get_processed_ast
 from zkay.zkay_ast.visitor.deep_copy import deep_copy
+from zkay.zkay_ast.visitor.solidity_visitor import to_solidity
 
 
 @parameterized_class(('name', 'example'), all_examples)
@@ -13,3 +24,28 @@ class TestParentSetter(TestExamples):
         ast = build_ast(self.example.code())
         ast_2 = deep_copy(ast)
         self.assertEqual(str(ast), str(ast_2))
+
+
+@parameterized_class(('name', 'example'), all_examples)
+class TestStructuralCopy(TestExamples):
+
+    @staticmethod
+    def _compile(ast) -> Tuple[str, ...]:
+        try:
+            new_ast, circuits = transform_ast(ast)
+        except AssertionError as e:
+            return 'AssertionError', str(e)
+        circuits = list(circuits.values())
+        circuit_code = ['\n'.join(JsnarkVisitor(c.phi).visitCircuit()) for c in circuits]
+        offchain_code = re.sub('Creation Time: .*', '', PythonOffchainVisitor(circuits).visit(new_ast))
+        return (to_solidity(new_ast), offchain_code, *circuit_code)
+
+    def test_structural_copy(self):
+        ast = get_processed_ast(self.example.code(), solc_check=False)
+        code = ast.code()
+
+        # Generic copy.deepcopy implementation
+        with mock.patch.object(AST, '__deepcopy__', None):
+            expected = self._compile(deepcopy(ast))
+        self.assertEqual(self._compile(deepcopy(ast)), expected)
+        self.assertEqual(ast.code(), code)
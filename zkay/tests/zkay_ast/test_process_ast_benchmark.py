@@ -0,0 +1,111 @@
+import os
+import time
+import unittest
+from contextlib import contextmanager
+from typing import ContextManager, List
+from unittest import mock
+
+from zkay.examples.examples import all_examples, get_code_example
+from zkay.tests.zkay_unit_test import ZkayTestCase
+from zkay.zkay_ast.ast import AST
+from zkay.zkay_ast.process_ast import get_processed_ast
+from zkay.zkay_ast.visitor.transformer_visitor import AstTransformerVisitor
+from zkay.zkay_ast.visitor.visitor import AstVisitor
+
+# Running this benchmark (only if ZKAY_RUN_BENCHMARKS=1 is set or if this file is run directly) prints a CSV to stdout with the time get_processed_ast (parsing, symbol table, analyses and type
+# checking, without the solc check) requires for all examples in zkay/examples/code.
+# The reference implementation resolves the visit function of every visited node by name and collects the children
+# of every node with process_children, as was done before visit functions were cached and children were declared per class.
+
+NUM_RUNS = 3  # Number of runs over all examples per implementation
+SEP = ','
+
+RUN_BENCHMARKS = os.environ.get('ZKAY_RUN_BENCHMARKS') == '1' or __name__ == '__main__'
+
+
+def _reference_get_visit_function(self, c):
+    visitor_function = 'visit' + c.__name__
+    if hasattr(self, visitor_function):
+        return getattr(self, visitor_function)
+    else:
+        for base in c.__bases__:
+            f = _reference_get_visit_function(self, base)
+            if f:
+                return f
+    return None
+
+
+def _reference_visit_internal(self, ast):
+    ret = None
+    ret_children = None
+
+    if self.traversal == 'post':
+        ret_children = self.visitChildren(ast)
+    f = _reference_get_visit_function(self, ast.__class__)
+    if f is not None:
+        ret = f(ast)
+    elif self.traversal == 'node-or-children':
+        ret_children = self.visitChildren(ast)
+    if self.traversal == 'pre':
+        ret_children = self.visitChildren(ast)
+    if ret is not None:
+        return ret
+    elif ret_children is not None:
+        return ret_children
+    else:
+        return None
+
+
+def _reference_transformer_visit_internal(self, ast):
+    if ast is None:
+        return None
+    return _reference_get_visit_function(self, ast.__class__)(ast)
+
+
+def _reference_children(self) -> List[AST]:
+    children = []
+
+    def add_child(c):
+        if c is not None:
+            children.append(c)
+        return c
+    self.process_children(add_child)
+    return children
+
+
+@contextmanager
+def reference_visitors() -> ContextManager:
+    with mock.patch.object(AstVisitor, '_visit_internal', _reference_visit_internal), \
+            mock.patch.object(AstTransformerVisitor, '_visit_internal', _reference_transformer_visit_internal), \
+            mock.patch.object(AST, 'children', _reference_children):
+        yield
+
+
+class TestProcessAstBenchmark(ZkayTestCase):
+    def _time_examples(self):
+        codes = [example.code() for _, example in all_examples]
+        start = time.perf_counter()
+        for _ in range(NUM_RUNS):
+            for code in codes:
+                get_processed_ast(code, solc_check=False)
+        return (time.perf_counter() - start) / NUM_RUNS
+
+    def test_same_result(self):
+        _, example = get_code_example('exam.zkay')[0]
+        code = get_processed_ast(example.code(), solc_check=False).code()
+        with reference_visitors():
+            self.assertEqual(get_processed_ast(example.code(), solc_check=False).code(), code)
+
+    @unittest.skipIf(not RUN_BENCHMARKS, 'benchmarks disabled (set ZKAY_RUN_BENCHMARKS=1)')
+    def test_run_benchmark(self):
+        new = self._time_examples()
+        with reference_visitors():
+            ref = self._time_examples()
+
+        print()
+        print('num_examples', 'reference_ms', 'cached_dispatch_ms', 'speedup', sep=SEP)
+        print(len(all_examples), f'{ref * 1000:.1f}', f'{new * 1000:.1f}', f'{ref / new:.2f}', sep=SEP)
+
+
+if __name__ == "__main__":
+    TestProcessAstBenchmark('test_run_benchmark').test_run_benchmark()
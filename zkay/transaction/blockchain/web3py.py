@@ -1,19 +1,28 @@
 import json
 import os
 import tempfile
+import threading
+import time
+import weakref
 from abc import abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple, List, Union
+from typing import Any, Callable, ContextManager, Dict, Optional, Tuple, List, Union
 
+from requests import Session
 from eth_tester import PyEVMBackend, EthereumTester
-from web3 import Web3
+from eth_utils.abi import collapse_if_tuple
+from hexbytes import HexBytes
+from web3 import Web3, HTTPProvider
+from web3.exceptions import TransactionNotFound
 
 from zkay import my_logging
 from zkay.compiler.privacy import library_contracts
 from zkay.compiler.solidity.compiler import compile_solidity_json
 from zkay.config import cfg, zk_print, zk_print_banner
-from zkay.my_logging.log_context import log_context
+from zkay.my_logging.log_context import log_context, full_log_context
 from zkay.transaction.crypto.params import CryptoParams
 from zkay.transaction.interface import ZkayBlockchainInterface, IntegrityError, BlockChainError, \
     TransactionFailedException
@@ -23,6 +32,246 @@ from zkay.utils.timer import time_measure
 from zkay.zkay_ast.process_ast import get_verification_contract_names
 
 max_gas_limit = 10000000
+receipt_timeout = 120  # Seconds after which a submitted transaction without receipt is considered lost
+
+
+class NonceManager:
+    """
+    Assigns consecutive nonces to the transactions of each sender locally.
+
+    This allows to submit multiple transactions of the same sender without waiting until the previous ones are mined.
+    The pending transaction count of the sender is requested from the node for every transaction, and the larger of it and
+    the local next nonce is used. Thus, transactions which other processes sent from the same account are taken into
+    account, while the local nonces cover transactions which the node did not add to its pending pool yet.
+    """
+
+    def __init__(self, w3: Web3):
+        self.w3 = w3
+        self._next_nonce: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def next_nonce(self, sender: Union[bytes, str]) -> ContextManager[int]:
+        """
+        Return context manager which provides the nonce for the next transaction of sender.
+
+        The transaction must be submitted within the context, the nonce is only consumed if no exception is raised.
+        """
+        sender = self.w3.toChecksumAddress(sender)
+        # Hold the lock during submission, such that the node receives all transactions in nonce order
+        with self._lock:
+            nonce = max(self._next_nonce.get(sender, 0), self.w3.eth.getTransactionCount(sender, 'pending'))
+            try:
+                yield nonce
+            except Exception:
+                # Nonce might have been consumed anyways (or the local state is outdated) -> resynchronize
+                self._next_nonce.pop(sender, None)
+                raise
+            self._next_nonce[sender] = nonce + 1
+
+
+class ReceiptPoller:
+    """
+    Collects the receipts of all outstanding transactions of a blockchain connection.
+
+    A single daemon thread requests the receipts of all pending transactions every cfg.blockchain_receipt_poll_interval_ms
+    milliseconds, the corresponding futures are resolved in a separate thread pool. The thread terminates once no
+    transactions are pending. Failed receipt requests are retried until the transaction times out.
+    """
+
+    def __init__(self, w3: Web3):
+        self.w3 = w3
+        self._pending: Dict[bytes, Tuple[Future, Callable[[Any], Any], float]] = {}
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._callbacks = ThreadPoolExecutor(thread_name_prefix='zkay-receipt-callback')
+
+    def add(self, tx_hash: bytes, on_receipt: Callable[[Any], Any]) -> Future:
+        """
+        Wait for the receipt of the transaction tx_hash in the background.
+
+        :param tx_hash: hash of a submitted transaction
+        :param on_receipt: called with the receipt once it is available (in a background thread), its return value is the \
+                           result of the future (exceptions are propagated). If it returns a future (e.g. of a resubmitted \
+                           transaction), the result of that future is used instead.
+        :return: future for the result of on_receipt
+        """
+        future = Future()
+        with self._lock:
+            self._pending[tx_hash] = (future, on_receipt, time.monotonic() + receipt_timeout)
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='zkay-receipt-poller', daemon=True)
+                self._worker.start()
+        return future
+
+    def _get_receipt(self, tx_hash: bytes) -> Optional[Any]:
+        try:
+            return self.w3.eth.getTransactionReceipt(tx_hash)
+        except TransactionNotFound:
+            return None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._worker = None
+                    return
+                pending = list(self._pending.items())
+
+            for tx_hash, (future, on_receipt, deadline) in pending:
+                try:
+                    receipt = self._get_receipt(tx_hash)
+                except Exception as e:
+                    # Might be a temporary connection problem -> try again in the next round
+                    receipt, error = None, BlockChainError(e.args)
+                else:
+                    error = BlockChainError(f'Transaction {tx_hash.hex()} was not mined within {receipt_timeout} seconds')
+                if receipt is None and time.monotonic() < deadline:
+                    continue
+
+                with self._lock:
+                    del self._pending[tx_hash]
+                if receipt is None:
+                    future.set_exception(error)
+                else:
+                    # Slow callbacks must not delay the other receipts
+                    self._callbacks.submit(self._resolve, future, on_receipt, receipt)
+            time.sleep(cfg.blockchain_receipt_poll_interval_ms / 1000)
+
+    @staticmethod
+    def _resolve(future: Future, on_receipt: Callable[[Any], Any], receipt: Any):
+        try:
+            result = on_receipt(receipt)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        if isinstance(result, Future):
+            result.add_done_callback(partial(ReceiptPoller._chain, future))
+        else:
+            future.set_result(result)
+
+    @staticmethod
+    def _chain(future: Future, result: Future):
+        if result.exception() is not None:
+            future.set_exception(result.exception())
+        else:
+            future.set_result(result.result())
+
+
+class BlockWatcher:
+    """
+    Notifies subscribers about new blocks.
+
+    A single daemon thread requests the current block number every cfg.blockchain_block_poll_interval_ms milliseconds
+    and calls all subscribers if it increased. The thread terminates once all subscribers were garbage collected.
+    """
+
+    def __init__(self, w3: Web3):
+        self.w3 = w3
+        self._subscribers: List[weakref.WeakMethod] = []
+        self._block_number = 0
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+
+    def subscribe(self, callback: Callable[[int], Any]):
+        """Call the bound method callback with the block number of every new block (as long as its object is alive)."""
+        with self._lock:
+            self._subscribers.append(weakref.WeakMethod(callback))
+            if self._worker is None:
+                self._block_number = self.w3.eth.blockNumber
+                self._worker = threading.Thread(target=self._run, name='zkay-block-watcher', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(cfg.blockchain_block_poll_interval_ms / 1000)
+            try:
+                block_number = self.w3.eth.blockNumber
+            except Exception:
+                block_number = None  # Try again in the next round
+
+            with self._lock:
+                self._subscribers = [s for s in self._subscribers if s() is not None]
+                if not self._subscribers:
+                    self._worker = None
+                    return
+                if block_number is None or block_number <= self._block_number:
+                    continue
+                self._block_number = block_number
+                subscribers = list(self._subscribers)
+
+            for subscriber in subscribers:
+                self._notify(subscriber, block_number)
+
+    @staticmethod
+    def _notify(subscriber: weakref.WeakMethod, block_number: int):
+        # Only dereference locally, the worker must not keep subscribers alive
+        callback = subscriber()
+        if callback is not None:
+            callback(block_number)
+
+
+def intrinsic_gas(calldata: str) -> int:
+    """Return the gas which a transaction with the given (hex encoded) call data costs in addition to its execution."""
+    data = bytes.fromhex(calldata[2:] if calldata.startswith('0x') else calldata)
+    return 21000 + sum(4 if b == 0 else 16 for b in data)
+
+
+class GasEstimateCache:
+    """
+    Gas estimates per (contract address, function name, calldata shape), see cfg.blockchain_gas_estimate_cache.
+
+    The calldata shape consists of the lengths of all array arguments. The estimates are the values returned by estimateGas
+    (gasUsed is lower than the gas which is required during execution if storage refunds apply).
+    Additionally, the static solc estimates from the gas_estimates.json file which the compiler generated for the contract
+    are available. These only contain the execution gas, without the intrinsic and calldata gas of the transaction.
+    """
+
+    def __init__(self):
+        self._estimates: Dict[Tuple, int] = {}
+        self._static_estimates: Dict[Tuple, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(address: str, function: str, actual_params: Tuple) -> Tuple:
+        return address, function, tuple(len(arg) if isinstance(arg, (list, tuple)) else None for arg in actual_params)
+
+    def load_static_estimates(self, address: str, filename: str, contract: str):
+        """Load the static estimates of the given contract deployed at address from filename (if it exists)."""
+        try:
+            with open(filename) as f:
+                estimates = json.load(f).get(contract, {})
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            for function, gas in estimates.items():
+                self._static_estimates[(address, function)] = gas
+
+    def get(self, key: Tuple) -> Optional[int]:
+        with self._lock:
+            return self._estimates.get(key)
+
+    def get_static(self, key: Tuple) -> Optional[int]:
+        """Return the static execution gas estimate for the function of key."""
+        with self._lock:
+            return self._static_estimates.get(key[:2])
+
+    def contains(self, key: Tuple) -> bool:
+        """Return whether a dynamic or static estimate for key is available."""
+        with self._lock:
+            return key in self._estimates or key[:2] in self._static_estimates
+
+    def update(self, key: Tuple, gas: int):
+        """Raise the estimate for key to gas."""
+        with self._lock:
+            if gas > self._estimates.get(key, 0):
+                self._estimates[key] = gas
+
+    def discard(self, key: Tuple):
+        """Drop the dynamic and static estimate for key (e.g. after a transaction ran out of gas)."""
+        with self._lock:
+            self._estimates.pop(key, None)
+            self._static_estimates.pop(key[:2], None)
 
 
 class Web3Blockchain(ZkayBlockchainInterface):
@@ -31,6 +280,12 @@ class Web3Blockchain(ZkayBlockchainInterface):
         self.w3 = self._create_w3_instance()
         if not self.w3.isConnected():
             raise BlockChainError(f'Failed to connect to blockchain: {self.w3.provider}')
+        self._nonces = NonceManager(self.w3)
+        self._receipts = ReceiptPoller(self.w3)
+        self._gas_estimates = GasEstimateCache()
+        self._blocks = BlockWatcher(self.w3)
+        self._block_gas_limit: Optional[Tuple[int, int, float]] = None
+        """Number of the most recent known block, its gas limit and the time until which it is considered current"""
 
     @staticmethod
     def compile_contract(sol_filename: str, contract_name: str, libs: Optional[Dict] = None, cwd=None):
@@ -49,11 +304,15 @@ class Web3Blockchain(ZkayBlockchainInterface):
 
     def get_special_variables(self, sender: AddressValue, wei_amount: int = 0) -> Tuple[MsgStruct, BlockStruct, TxStruct]:
         block = self.w3.eth.getBlock('pending')
+        self._update_block_gas_limit(block['number'], block['gasLimit'])
         zk_print(f'Current block timestamp: {block["timestamp"]}')
         return MsgStruct(sender, wei_amount), \
                BlockStruct(AddressValue(self.w3.eth.coinbase), block['difficulty'], block['gasLimit'], block['number'], block['timestamp']),\
                TxStruct(self.w3.eth.gasPrice, sender)
 
+    def subscribe_blocks(self, callback: Callable[[int], Any]):
+        self._blocks.subscribe(callback)
+
     @abstractmethod
     def _create_w3_instance(self) -> Web3:
         pass
@@ -85,30 +344,68 @@ class Web3Blockchain(ZkayBlockchainInterface):
 
     def _call(self, contract_handle, sender: Union[bytes, str], name: str, *args) -> Union[bool, int, str]:
         try:
-            fct = contract_handle.functions[name]
-            gas_amount = self._gas_heuristic(sender, fct(*args))
-            tx = {'from': sender, 'gas': gas_amount}
-            return fct(*args).call(tx)
+            # eth_call does not consume gas, no need for an estimate
+            tx = {'from': sender, 'gas': self._get_block_gas_limit()}
+            return contract_handle.functions[name](*args).call(tx)
         except Exception as e:
             raise BlockChainError(e.args)
 
     def _transact(self, contract_handle, sender: Union[bytes, str], function: str, *actual_params, wei_amount: Optional[int] = None) -> Any:
+        tx_hash, check_receipt = self._send_transaction(contract_handle, sender, function, *actual_params, wei_amount=wei_amount)
+        return self._receipts.add(tx_hash, check_receipt).result()
+
+    def _transact_async(self, contract_handle, sender: Union[bytes, str], function: str, *actual_params, wei_amount: Optional[int] = None) -> Future:
+        tx_hash, check_receipt = self._send_transaction(contract_handle, sender, function, *actual_params, wei_amount=wei_amount)
+        return self._receipts.add(tx_hash, partial(check_receipt, log_ctx=list(full_log_context)))
+
+    def _send_transaction(self, contract_handle, sender: Union[bytes, str], function: str, *actual_params,
+                          wei_amount: Optional[int] = None, allow_resubmit: bool = True) -> Tuple[bytes, Callable]:
+        """
+        Submit the transaction and return its hash and the function which checks its receipt.
+
+        If the gas amount is based on a cached (or static) estimate and the transaction runs out of gas, the receipt check
+        resubmits the transaction once with a new estimate (if allow_resubmit), and returns the future of its result.
+        """
+        gas_key, resubmit = None, None
+        if cfg.blockchain_gas_estimate_cache and function != 'constructor':
+            gas_key = GasEstimateCache.key(contract_handle.address, function, actual_params)
+            if allow_resubmit and self._gas_estimates.contains(gas_key):
+                resubmit = partial(self._resubmit, contract_handle, sender, function, actual_params, wei_amount)
         try:
             fct = contract_handle.constructor if function == 'constructor' else contract_handle.functions[function]
-            gas_amount = self._gas_heuristic(sender, fct(*actual_params))
+            calldata = None if gas_key is None else contract_handle.encodeABI(fn_name=function, args=list(actual_params))
+            gas_amount = self._gas_heuristic(sender, fct(*actual_params), gas_key, calldata)
             tx = {'from': sender, 'gas': gas_amount}
             if wei_amount:
                 tx['value'] = wei_amount
-            tx_hash = fct(*actual_params).transact(tx)
-            tx_receipt = self.w3.eth.waitForTransactionReceipt(tx_hash)
+            with self._nonces.next_nonce(sender) as nonce:
+                tx['nonce'] = nonce
+                tx_hash = fct(*actual_params).transact(tx)
         except Exception as e:
             raise BlockChainError(e.args)
+        return tx_hash, partial(self._check_receipt, gas_key=gas_key, gas_amount=gas_amount, resubmit=resubmit)
+
+    def _resubmit(self, contract_handle, sender: Union[bytes, str], function: str, actual_params: Tuple,
+                  wei_amount: Optional[int], log_ctx: Optional[List]) -> Future:
+        tx_hash, check_receipt = self._send_transaction(contract_handle, sender, function, *actual_params,
+                                                        wei_amount=wei_amount, allow_resubmit=False)
+        return self._receipts.add(tx_hash, partial(check_receipt, log_ctx=log_ctx))
 
+    def _check_receipt(self, tx_receipt, log_ctx: Optional[List] = None, gas_key: Optional[Tuple] = None, gas_amount: int = 0,
+                       resubmit: Optional[Callable[[Optional[List]], Future]] = None) -> Any:
+        self._observe_block(tx_receipt['blockNumber'])
+        gas = tx_receipt['gasUsed']
         if tx_receipt['status'] == 0:
+            if gas_key is not None and gas >= gas_amount:
+                # Ran out of gas, estimate again next time
+                self._gas_estimates.discard(gas_key)
+                if resubmit is not None:
+                    # The cached (or static) estimate was too low, e.g. since solc's static estimates use outdated gas costs
+                    zk_print(f'Transaction ran out of gas with {gas_amount} gas, resubmitting with a new estimate')
+                    return resubmit(log_ctx)
             raise TransactionFailedException("Transaction failed")
-        gas = tx_receipt['gasUsed']
         zk_print(f"Consumed gas: {gas}")
-        my_logging.data('gas', gas)
+        my_logging.data('gas', gas, context=log_ctx)
         return tx_receipt
 
     def _deploy(self, project_dir: str, sender: Union[bytes, str], contract: str, *actual_args, wei_amount: Optional[int] = None) -> Any:
@@ -122,6 +419,7 @@ class Web3Blockchain(ZkayBlockchainInterface):
         with log_context('constructor'):
             with log_context(f'{contract}'):
                 handle = self._deploy_contract(sender, cout, *actual_args, wei_amount=wei_amount)
+        self._gas_estimates.load_static_estimates(handle.address, os.path.join(project_dir, 'gas_estimates.json'), contract)
         zk_print(f'Deployed contract "{contract}" at address "{handle.address}"')
         return handle
 
@@ -183,9 +481,11 @@ class Web3Blockchain(ZkayBlockchainInterface):
     def _connect(self, project_dir: str, contract: str, address: Union[bytes, str]) -> Any:
         filename = os.path.join(project_dir, 'contract.sol')
         cout = self.compile_contract(filename, contract)
-        return self.w3.eth.contract(
+        handle = self.w3.eth.contract(
             address=address, abi=cout['abi']
         )
+        self._gas_estimates.load_static_estimates(handle.address, os.path.join(project_dir, 'gas_estimates.json'), contract)
+        return handle
 
     def _verify_contract_integrity(self, address: Union[bytes, str], sol_filename: str, *,
                                    libraries: Dict = None, contract_name: str = None, is_library: bool = False,
@@ -266,9 +566,42 @@ class Web3Blockchain(ZkayBlockchainInterface):
         val = val[2:] if val.startswith('0x') else val
         return val.lower()
 
-    def _gas_heuristic(self, sender, tx) -> int:
-        limit = self.w3.eth.getBlock('latest')['gasLimit']
-        estimate = tx.estimateGas({'from': sender, 'gas': limit})
+    def _get_block_gas_limit(self) -> int:
+        """
+        Return the gas limit of the most recent known block.
+
+        It is requested again after a receipt from a newer block was observed, or at the latest after
+        cfg.blockchain_block_poll_interval_ms milliseconds.
+        """
+        block_gas_limit = self._block_gas_limit
+        if block_gas_limit is None or time.monotonic() >= block_gas_limit[2]:
+            block = self.w3.eth.getBlock('latest')
+            self._update_block_gas_limit(block['number'], block['gasLimit'])
+            return block['gasLimit']
+        return block_gas_limit[1]
+
+    def _update_block_gas_limit(self, number: int, gas_limit: int):
+        if self._block_gas_limit is None or number >= self._block_gas_limit[0]:
+            self._block_gas_limit = (number, gas_limit, time.monotonic() + cfg.blockchain_block_poll_interval_ms / 1000)
+
+    def _observe_block(self, number: int):
+        """Invalidate the cached block gas limit if a newer block was mined."""
+        block_gas_limit = self._block_gas_limit
+        if block_gas_limit is not None and number > block_gas_limit[0]:
+            self._block_gas_limit = None
+
+    def _gas_heuristic(self, sender, tx, gas_key: Optional[Tuple] = None, calldata: Optional[str] = None) -> int:
+        limit = self._get_block_gas_limit()
+        estimate = None
+        if gas_key is not None:
+            estimate = self._gas_estimates.get(gas_key)
+            static_estimate = self._gas_estimates.get_static(gas_key) if estimate is None else None
+            if static_estimate is not None:
+                estimate = static_estimate + intrinsic_gas(calldata)
+        if estimate is None:
+            estimate = tx.estimateGas({'from': sender, 'gas': limit})
+            if gas_key is not None:
+                self._gas_estimates.update(gas_key, estimate)
         return min(int(estimate * 1.2), limit)
 
 
@@ -324,7 +657,7 @@ class Web3TesterBlockchain(Web3Blockchain):
         self.next_acc_idx += count
         return dummy_accounts
 
-    def _gas_heuristic(self, sender, tx) -> int:
+    def _gas_heuristic(self, sender, tx, gas_key: Optional[Tuple] = None, calldata: Optional[str] = None) -> int:
         return max_gas_limit
 
 
@@ -340,10 +673,71 @@ class Web3WebsocketBlockchain(Web3Blockchain):
         return Web3(Web3.WebsocketProvider(cfg.blockchain_node_uri))
 
 
+class BatchHTTPProvider(HTTPProvider):
+    """HTTP provider which can additionally send multiple requests within a single JSON-RPC batch request."""
+
+    def __init__(self, endpoint_uri: Optional[str] = None, request_kwargs: Optional[Dict] = None):
+        super().__init__(endpoint_uri, request_kwargs)
+        self._session = Session()
+
+    def make_batch_request(self, calls: List[Tuple[str, List]]) -> Optional[List[Dict]]:
+        """
+        Send all (method, params) calls within a single JSON-RPC batch request.
+
+        Contrary to make_request, the calls do not pass through the web3 middlewares.
+
+        :return: the responses in the order of calls, None if the node does not support batch requests
+        """
+        batch = [{'jsonrpc': '2.0', 'method': method, 'params': params, 'id': next(self.request_counter)}
+                 for method, params in calls]
+        kwargs = self.get_request_kwargs()
+        kwargs.setdefault('timeout', 10)
+        response = self._session.post(self.endpoint_uri, data=json.dumps(batch).encode('utf-8'), **kwargs)
+        response.raise_for_status()
+        responses = self.decode_rpc_response(response.content)
+        if not isinstance(responses, list):
+            return None
+        responses = {r['id']: r for r in responses}
+        return [responses[request['id']] for request in batch]
+
+
 class Web3HttpBlockchain(Web3Blockchain):
     def _create_w3_instance(self) -> Web3:
         assert cfg.blockchain_node_uri is None or isinstance(cfg.blockchain_node_uri, str)
-        return Web3(Web3.HTTPProvider(cfg.blockchain_node_uri))
+        return Web3(BatchHTTPProvider(cfg.blockchain_node_uri))
+
+    @classmethod
+    def supports_batched_requests(cls) -> bool:
+        return True
+
+    def _req_state_vars(self, contract_handle, requests: List[Tuple[str, Tuple]]) -> List[Any]:
+        if len(requests) <= 1:
+            return super()._req_state_vars(contract_handle, requests)
+
+        # Send all eth_call requests within a single JSON-RPC batch request
+        try:
+            calls = [('eth_call', [{'to': contract_handle.address,
+                                    'data': contract_handle.encodeABI(fn_name=name, args=list(indices))}, 'latest'])
+                     for name, indices in requests]
+            responses = self.w3.provider.make_batch_request(calls)
+            if responses is None:
+                return super()._req_state_vars(contract_handle, requests)
+
+            vals = []
+            for (name, _), response in zip(requests, responses):
+                if 'error' in response:
+                    raise BlockChainError(response['error'])
+                outputs = contract_handle.get_function_by_name(name).abi['outputs']
+                output_data = self.w3.codec.decode_abi([collapse_if_tuple(o) for o in outputs], HexBytes(response['result']))
+                # Same normalization as for calls
+                output_data = [self.w3.toChecksumAddress(v) if o['type'] == 'address' else v
+                               for o, v in zip(outputs, output_data)]
+                vals.append(output_data[0] if len(output_data) == 1 else output_data)
+            return vals
+        except BlockChainError:
+            raise
+        except Exception as e:
+            raise BlockChainError(e.args)
 
 
 class Web3HttpGanacheBlockchain(Web3HttpBlockchain):
@@ -363,8 +757,8 @@ class Web3HttpGanacheBlockchain(Web3HttpBlockchain):
         self.next_acc_idx += count
         return dummy_accounts
 
-    def _gas_heuristic(self, sender, tx) -> int:
-        return self.w3.eth.getBlock('latest')['gasLimit']
+    def _gas_heuristic(self, sender, tx, gas_key: Optional[Tuple] = None, calldata: Optional[str] = None) -> int:
+        return self._get_block_gas_limit()
 
 
 class Web3CustomBlockchain(Web3Blockchain):
@@ -31,57 +31,51 @@ CURVE_ORDER = 273603035897990940278080071815715938607681397215856725920021566094
 
 
 class FieldElement(object):
-    def __init__(self, t, s, modulus, strict=False):
-        if strict and not (0 <= s and s < modulus):
+    __slots__ = ('s', )
+    modulus: int = None
+
+    def __init__(self, s, strict=False):
+        if strict and not (0 <= s and s < self.modulus):
             raise ValueError
-        self.t = t
-        self.s = s % modulus
-        self.m = modulus
+        self.s = s % self.modulus
 
     def __neg__(self):
-        return self.t(-self.s)
+        return type(self)(-self.s)
 
     def __add__(self, a):
-        return self.t(self.s + a.s)
+        return type(self)(self.s + a.s)
 
     def __sub__(self, a):
-        return self.t(self.s - a.s)
+        return type(self)(self.s - a.s)
 
     def __mul__(self, a):
-        return self.t(self.s * a.s)
+        return type(self)(self.s * a.s)
 
     def __truediv__(self, a):
         assert a.s != 0
         return self * a.inv()
 
     def exp(self, e):
-        e = format(e, '0256b')
-        ret = self.t(1)
-        for c in e:
-            ret = ret * ret
-            if int(c):
-                ret = ret * self
-        return ret
+        return type(self)(pow(self.s, e, self.modulus))
 
     def inv(self):
-        return self.exp(self.m - 2)
+        return type(self)(pow(self.s, -1, self.modulus))
 
     def __eq__(self, a):
         return self.s == a.s
 
 
 class Fq(FieldElement):
-
-    def __init__(self, s, strict=False):
-        FieldElement.__init__(self, Fq, s, BASE_ORDER, strict=strict)
+    __slots__ = ()
+    modulus = BASE_ORDER
 
     def __str__(self):
         return 'Fq(%s)' % self.s
 
 
 class Fr(FieldElement):
-    def __init__(self, s, strict=False):
-        FieldElement.__init__(self, Fr, s, CURVE_ORDER, strict=strict)
+    __slots__ = ()
+    modulus = CURVE_ORDER
 
     def __str__(self):
         return 'Fr(%s)' % self.s
@@ -110,18 +104,122 @@ BABYJUBJUB_D = Fq(97065988484175450973722472235577194067841152194660602330809131
 BABYJUBJUB_GENERATOR_X = 11904062828411472290643689191857696496057424932476499415469791423656658550213
 BABYJUBJUB_GENERATOR_Y = 9356450144216313082194365820021861619676443907964402770398322487858544118183
 
+#
+# Internally, scalar multiplication works on plain integer tuples in extended twisted Edwards coordinates (X, Y, T, Z),
+# where x = X/Z, y = Y/Z and x*y = T/Z (Hisil et al., "Twisted Edwards Curves Revisited"). This avoids
+# one field inversion per point addition, only the final result is converted back to affine coordinates.
+#
+
+_P = BASE_ORDER
+_A = BABYJUBJUB_A.s
+_D = BABYJUBJUB_D.s
+
+_EXT_ZERO = (0, 1, 0, 1)
+
+
+def _ext_add(p1, p2):
+    """add-2008-hwcd"""
+    x1, y1, t1, z1 = p1
+    x2, y2, t2, z2 = p2
+    a = x1 * x2 % _P
+    b = y1 * y2 % _P
+    c = _D * t1 % _P * t2 % _P
+    d = z1 * z2 % _P
+    e = ((x1 + y1) * (x2 + y2) - a - b) % _P
+    f = d - c
+    g = d + c
+    h = b - _A * a
+    return e * f % _P, g * h % _P, e * h % _P, f * g % _P
+
+
+def _ext_add_precomputed(p1, p2):
+    """add-2008-hwcd with affine p2 = (x2, y2, d*x2*y2)"""
+    x1, y1, t1, z1 = p1
+    x2, y2, dt2 = p2
+    a = x1 * x2 % _P
+    b = y1 * y2 % _P
+    c = t1 * dt2 % _P
+    e = ((x1 + y1) * (x2 + y2) - a - b) % _P
+    f = z1 - c
+    g = z1 + c
+    h = b - _A * a
+    return e * f % _P, g * h % _P, e * h % _P, f * g % _P
+
+
+def _ext_double(p):
+    """dbl-2008-hwcd"""
+    x1, y1, _, z1 = p
+    a = x1 * x1 % _P
+    b = y1 * y1 % _P
+    c = 2 * z1 * z1 % _P
+    d = _A * a
+    e = ((x1 + y1) * (x1 + y1) - a - b) % _P
+    g = d + b
+    f = g - c
+    h = d - b
+    return e * f % _P, g * h % _P, e * h % _P, f * g % _P
+
+
+def _ext_mul(p, k: int):
+    """Fixed window (4 bit) scalar multiplication."""
+    if k == 0:
+        return _EXT_ZERO
+    table = [_EXT_ZERO, p]
+    for _ in range(14):
+        table.append(_ext_add(table[-1], p))
+
+    shift = (k.bit_length() - 1) // 4 * 4
+    acc = table[(k >> shift) & 15]
+    for shift in range(shift - 4, -1, -4):
+        acc = _ext_double(_ext_double(_ext_double(_ext_double(acc))))
+        nibble = (k >> shift) & 15
+        if nibble:
+            acc = _ext_add(acc, table[nibble])
+    return acc
+
+
+def _batch_to_affine(points):
+    """Convert extended points to affine (x, y) tuples using a single field inversion."""
+    prefix = [1]
+    for p in points:
+        prefix.append(prefix[-1] * p[3] % _P)
+    inv = pow(prefix[-1], -1, _P)
+    res = [None] * len(points)
+    for i in range(len(points) - 1, -1, -1):
+        x, y, _, z = points[i]
+        zi = inv * prefix[i] % _P
+        inv = inv * z % _P
+        res[i] = (x * zi % _P, y * zi % _P)
+    return res
+
 
 class Point(object):
+    __slots__ = ('u', 'v')
+
     def __init__(self, u, v):
         self.u = u
         self.v = v
 
+    @staticmethod
+    def _from_extended(p):
+        x, y, _, z = p
+        zi = pow(z, -1, _P)
+        return Point(Fq(x * zi), Fq(y * zi))
+
+    def _to_extended(self):
+        x, y = self.u.s, self.v.s
+        return x, y, x * y % _P, 1
+
     def __add__(self, a):
-        (u1, v1) = (self.u, self.v)
-        (u2, v2) = (a.u, a.v)
-        u3 = (u1*v2 + v1*u2) / (Fq.ONE + BABYJUBJUB_D * u1 * u2 * v1 * v2)
-        v3 = (v1 * v2 - BABYJUBJUB_A * u1 * u2) / (Fq.ONE - BABYJUBJUB_D * u1 * u2 * v1 * v2)
-        return Point(u3, v3)
+        (u1, v1) = (self.u.s, self.v.s)
+        (u2, v2) = (a.u.s, a.v.s)
+        duv = _D * u1 % _P * u2 % _P * v1 % _P * v2 % _P
+        den_u, den_v = 1 + duv, 1 - duv
+        # invert both denominators at once
+        inv = pow(den_u * den_v % _P, -1, _P)
+        u3 = (u1 * v2 + v1 * u2) * den_v % _P * inv
+        v3 = (v1 * v2 - _A * u1 * u2) * den_u % _P * inv
+        return Point(Fq(u3), Fq(v3))
 
     def double(self):
         return self + self
@@ -130,13 +228,9 @@ class Point(object):
         return Point(-self.u, self.v)
 
     def __mul__(self, s):
-        s = format(s.s, '0256b')
-        ret = self.ZERO
-        for c in s:
-            ret = ret.double()
-            if int(c):
-                ret = ret + self
-        return ret
+        if self == Point.GENERATOR:
+            return FixedBaseTable.for_generator().mul(s.s)
+        return Point._from_extended(_ext_mul(self._to_extended(), s.s))
 
     def __eq__(self, a):
         return self.u == a.u and self.v == a.v
@@ -149,3 +243,48 @@ Point.ZERO = Point(Fq.ZERO, Fq.ONE)
 Point.GENERATOR = Point(Fq(BABYJUBJUB_GENERATOR_X), Fq(BABYJUBJUB_GENERATOR_Y))
 
 assert Point.ZERO + Point.ZERO == Point.ZERO
+
+
+class FixedBaseTable(object):
+    """
+    Precomputed multiples j * 16^i * base of a fixed base point.
+
+    Scalar multiplication with the base point then requires one point addition per 4 bits of the scalar
+    and no point doublings.
+    """
+    __slots__ = ('windows', )
+
+    _generator_table = None
+
+    def __init__(self, base: Point, scalar_bits: int = CURVE_ORDER.bit_length()):
+        rows = []
+        b = base._to_extended()
+        for _ in range((scalar_bits + 3) // 4):
+            row = [b]
+            for _ in range(15):
+                row.append(_ext_add(row[-1], b))
+            # row[15] = 16 * b is the base of the next window
+            b = row.pop()
+            rows.append(row)
+
+        affine = _batch_to_affine([p for row in rows for p in row])
+        self.windows = [[(x, y, _D * x % _P * y % _P) for x, y in affine[i:i + 15]] for i in range(0, len(affine), 15)]
+
+    @classmethod
+    def for_generator(cls) -> 'FixedBaseTable':
+        if cls._generator_table is None:
+            cls._generator_table = FixedBaseTable(Point.GENERATOR)
+        return cls._generator_table
+
+    def mul(self, k: int) -> Point:
+        """Return k * base for 0 <= k < CURVE_ORDER."""
+        acc = _EXT_ZERO
+        for window in self.windows:
+            if not k:
+                break
+            nibble = k & 15
+            if nibble:
+                acc = _ext_add_precomputed(acc, window[nibble - 1])
+            k >>= 4
+        assert k == 0
+        return Point._from_extended(acc)
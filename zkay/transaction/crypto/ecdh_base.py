@@ -1,26 +1,89 @@
 import os
 import secrets
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from Crypto.Cipher import AES
+from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import HKDF
 
 from zkay.config import cfg, zk_print
-from zkay.jsnark_interface.jsnark_interface import circuit_builder_jar
+from zkay.transaction.crypto import ecdh_native
 from zkay.transaction.interface import PrivateKeyValue, PublicKeyValue, KeyPair
 from zkay.transaction.interface import ZkayCryptoInterface
-from zkay.utils.run_command import run_command
 
 
 class EcdhBase(ZkayCryptoInterface):
+    _shared_key_cache: 'OrderedDict[Tuple[int, int], bytes]' = OrderedDict()
+    """LRU cache of derived symmetric keys, indexed by (my_sk, other_pk)"""
+
+    _shared_key_cache_lock = threading.Lock()
 
     @staticmethod
     def _gen_keypair(rnd: bytes):
-        keys, _ = run_command(['java', '-Xms4096m', '-Xmx16384m', '-cp', f'{circuit_builder_jar}', 'zkay.ZkayECDHGenerator', rnd.hex()])
-        keys = keys.splitlines()[-2:]
-        return int(keys[0], 16), int(keys[1], 16)
+        return ecdh_native.gen_keypair(rnd)
+
+    @classmethod
+    def _ecdh_sha256(cls, other_pk: int, my_sk: int) -> bytes:
+        """Return the symmetric key shared with the owner of other_pk, key agreement is only performed on cache misses."""
+        cache_key = (my_sk, other_pk)
+        with cls._shared_key_cache_lock:
+            key = cls._shared_key_cache.get(cache_key)
+            if key is not None:
+                cls._shared_key_cache.move_to_end(cache_key)
+                return key
+
+        key = cls._load_shared_key(other_pk, my_sk) if cfg.ecdh_shared_key_disk_cache else None
+        if key is None:
+            key = ecdh_native.ecdh_sha256(other_pk, my_sk)
+            if cfg.ecdh_shared_key_disk_cache:
+                cls._store_shared_key(other_pk, my_sk, key)
+
+        with cls._shared_key_cache_lock:
+            cls._shared_key_cache[cache_key] = key
+            while len(cls._shared_key_cache) > max(cfg.ecdh_shared_key_cache_size, 0):
+                cls._shared_key_cache.popitem(last=False)
+        return key
 
     @staticmethod
-    def _ecdh_sha256(other_pk: int, my_sk: int):
-        ret, _ = run_command(['java', '-Xms4096m', '-Xmx16384m', '-cp', f'{circuit_builder_jar}', 'zkay.ZkayECDHGenerator', hex(my_sk)[2:], hex(other_pk)[2:]])
-        key = ret.splitlines()[-1]
-        return int(key, 16).to_bytes(16, byteorder='big')
+    def _shared_key_file(other_pk: int, my_sk: int) -> Tuple[str, bytes, bytes]:
+        """
+        Return the disk cache file for the given key pair, the key with which its content is encrypted (AES-GCM)
+        and the associated data which binds the content to the key pair.
+        """
+        owner_id, wrap_key = HKDF(my_sk.to_bytes(32, byteorder='big'), 32, b'', SHA256, num_keys=2,
+                                  context=b'zkay-ecdh-shared-key-cache')
+        filename = os.path.join(cfg.data_dir, 'keys', 'ecdh_shared', owner_id.hex()[:32], f'{other_pk:064x}.bin')
+        return filename, wrap_key, owner_id + other_pk.to_bytes(32, byteorder='big')
+
+    @classmethod
+    def _load_shared_key(cls, other_pk: int, my_sk: int) -> Optional[bytes]:
+        filename, wrap_key, associated_data = cls._shared_key_file(other_pk, my_sk)
+        try:
+            with open(filename, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            cipher = AES.new(wrap_key, AES.MODE_GCM, nonce=data[:12])
+            cipher.update(associated_data)
+            return cipher.decrypt_and_verify(data[28:], data[12:28])
+        except ValueError:
+            return None
+
+    @classmethod
+    def _store_shared_key(cls, other_pk: int, my_sk: int, key: bytes):
+        filename, wrap_key, associated_data = cls._shared_key_file(other_pk, my_sk)
+        cipher = AES.new(wrap_key, AES.MODE_GCM, nonce=secrets.token_bytes(12))
+        cipher.update(associated_data)
+        ciphertext, tag = cipher.encrypt_and_digest(key)
+        data = cipher.nonce + tag + ciphertext
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        tmp_file = f'{filename}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_file, filename)
 
     def _generate_or_load_key_pair(self, address: str) -> KeyPair:
         key_file = os.path.join(cfg.data_dir, 'keys', f'ec_{address}.bin')
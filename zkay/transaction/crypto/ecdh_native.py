@@ -0,0 +1,136 @@
+"""
+Pure python implementations of the ECDH and ChaskeyLTS primitives provided by the jsnark circuit builder jar.
+
+All functions are bit-compatible with the corresponding java implementations (zkay.ZkayECDHGenerator and zkay.ChaskeyLtsCbc),
+but avoid launching a JVM for every key derivation, encryption and decryption.
+"""
+
+import hashlib
+import struct
+from typing import Tuple
+
+FIELD_PRIME = 21888242871839275222246405745257275088548364400416034343698204186575808495617
+"""Prime of the field over which the curve is defined (bn128 scalar field)"""
+
+COEFF_A = 126932
+"""Coefficient A of the montgomery curve y^2 = x^3 + A*x^2 + x"""
+
+BASE_X = 4
+"""x coordinate of the base point"""
+
+_A24 = (COEFF_A + 2) * pow(4, -1, FIELD_PRIME) % FIELD_PRIME
+
+
+def _montgomery_ladder(k: int, x: int) -> int:
+    """Return the x coordinate of k*P where P is a curve point with x coordinate x (x-only montgomery ladder)."""
+    p = FIELD_PRIME
+    x2, z2, x3, z3 = 1, 0, x, 1
+    for i in reversed(range(k.bit_length())):
+        bit = (k >> i) & 1
+        if bit:
+            x2, x3, z2, z3 = x3, x2, z3, z2
+        a, b = x2 + z2, x2 - z2
+        c, d = x3 + z3, x3 - z3
+        aa, bb = a * a % p, b * b % p
+        e = aa - bb
+        da, cb = d * a % p, c * b % p
+        x3, z3 = (da + cb) ** 2 % p, x * (da - cb) ** 2 % p
+        x2, z2 = aa * bb % p, e * (bb + _A24 * e) % p
+        if bit:
+            x2, x3, z2, z3 = x3, x2, z3, z2
+    return x2 * pow(z2, -1, p) % p if z2 else 0
+
+
+def rnd_to_secret(rnd: bytes) -> int:
+    """Derive a secret key from 32 bytes of randomness (clamped such that it is a 253 bit multiple of the cofactor)."""
+    assert len(rnd) == 32
+    b = bytearray(rnd)
+    b[0] &= 0x0f
+    b[0] |= 0x10
+    b[31] &= 0xf8
+    return int.from_bytes(b, byteorder='big')
+
+
+def derive_public_key(sk: int) -> int:
+    """Return the public key (x coordinate of sk*G) corresponding to secret key sk."""
+    return _montgomery_ladder(sk, BASE_X)
+
+
+def gen_keypair(rnd: bytes) -> Tuple[int, int]:
+    """Return a (public key, secret key) tuple derived from 32 bytes of randomness."""
+    sk = rnd_to_secret(rnd)
+    return derive_public_key(sk), sk
+
+
+def ecdh_sha256(other_pk: int, my_sk: int) -> bytes:
+    """Return the 128 bit symmetric key H(x(my_sk * other_pk)), where H is SHA-256 truncated to 128 bits."""
+    shared_secret = _montgomery_ladder(my_sk, other_pk)
+    return hashlib.sha256(shared_secret.to_bytes(32, byteorder='big')).digest()[:16]
+
+
+_MASK32 = 0xffffffff
+
+
+def _rotl(v: int, n: int) -> int:
+    return ((v << n) | (v >> (32 - n))) & _MASK32
+
+
+def _rotr(v: int, n: int) -> int:
+    return ((v >> n) | (v << (32 - n))) & _MASK32
+
+
+def _chaskey_lts_encrypt_block(key: Tuple[int, ...], block: bytes) -> bytes:
+    v0, v1, v2, v3 = (w ^ k for w, k in zip(struct.unpack('<4I', block), key))
+    for _ in range(16):
+        v0 = (v0 + v1) & _MASK32
+        v1 = _rotl(v1, 5) ^ v0
+        v0 = _rotl(v0, 16)
+        v2 = (v2 + v3) & _MASK32
+        v3 = _rotl(v3, 8) ^ v2
+        v0 = (v0 + v3) & _MASK32
+        v3 = _rotl(v3, 13) ^ v0
+        v2 = (v2 + v1) & _MASK32
+        v1 = _rotl(v1, 7) ^ v2
+        v2 = _rotl(v2, 16)
+    return struct.pack('<4I', v0 ^ key[0], v1 ^ key[1], v2 ^ key[2], v3 ^ key[3])
+
+
+def _chaskey_lts_decrypt_block(key: Tuple[int, ...], block: bytes) -> bytes:
+    v0, v1, v2, v3 = (w ^ k for w, k in zip(struct.unpack('<4I', block), key))
+    for _ in range(16):
+        v2 = _rotr(v2, 16)
+        v1 = _rotr(v1 ^ v2, 7)
+        v2 = (v2 - v1) & _MASK32
+        v3 = _rotr(v3 ^ v0, 13)
+        v0 = (v0 - v3) & _MASK32
+        v3 = _rotr(v3 ^ v2, 8)
+        v2 = (v2 - v3) & _MASK32
+        v0 = _rotr(v0, 16)
+        v1 = _rotr(v1 ^ v0, 5)
+        v0 = (v0 - v1) & _MASK32
+    return struct.pack('<4I', v0 ^ key[0], v1 ^ key[1], v2 ^ key[2], v3 ^ key[3])
+
+
+def chaskey_lts_cbc_encrypt(key: bytes, iv: bytes, plain: bytes) -> bytes:
+    """Encrypt plain (multiple of 16 bytes, no padding) using ChaskeyLTS-128 in CBC mode."""
+    assert len(key) == 16 and len(iv) == 16 and len(plain) % 16 == 0
+    k = struct.unpack('<4I', key)
+    prev = iv
+    blocks = []
+    for i in range(0, len(plain), 16):
+        prev = _chaskey_lts_encrypt_block(k, bytes(a ^ b for a, b in zip(plain[i:i + 16], prev)))
+        blocks.append(prev)
+    return b''.join(blocks)
+
+
+def chaskey_lts_cbc_decrypt(key: bytes, iv: bytes, cipher: bytes) -> bytes:
+    """Decrypt cipher (multiple of 16 bytes, no padding) using ChaskeyLTS-128 in CBC mode."""
+    assert len(key) == 16 and len(iv) == 16 and len(cipher) % 16 == 0
+    k = struct.unpack('<4I', key)
+    prev = iv
+    blocks = []
+    for i in range(0, len(cipher), 16):
+        block = cipher[i:i + 16]
+        blocks.append(bytes(a ^ b for a, b in zip(_chaskey_lts_decrypt_block(k, block), prev)))
+        prev = block
+    return b''.join(blocks)
@@ -1,11 +1,14 @@
 import os
-from typing import Tuple, List, Any, Union
+import threading
+from collections import OrderedDict
+from typing import Tuple, List, Any, Union, Optional
 
 from Crypto.Random.random import randrange
 
 from zkay.config import cfg, zk_print
 from zkay.transaction.crypto import babyjubjub
 from zkay.transaction.crypto.params import CryptoParams
+from zkay.transaction.crypto.randomness_pool import RandomnessPool
 from zkay.transaction.interface import ZkayHomomorphicCryptoInterface
 from zkay.transaction.types import KeyPair, CipherValue, PrivateKeyValue, PublicKeyValue
 
@@ -20,18 +23,86 @@ def to_le_32_hex_bytes(num):
     return b
 
 
+max_in_memory_dlog_table_bits = 24
+"""Larger discrete log tables (> 400 MB) are not built on the fly, they must be generated using 'zkay generate-dlog-table'"""
+
+
+def dlog_table_file(table_bits: int) -> str:
+    """Return the path of the precomputed discrete log table with 2^table_bits entries."""
+    return os.path.join(cfg.data_dir, 'babygiant', f'baby_steps_{table_bits}.bin')
+
+
+def generate_dlog_table(table_bits: int) -> str:
+    """Precompute the discrete log table with 2^table_bits entries and store it in the data directory."""
+    table_file = dlog_table_file(table_bits)
+    zk_print(f'Generating discrete log table with 2^{table_bits} entries at {table_file}...')
+    babygiant.generate_table(table_bits, table_file)
+    return table_file
+
+
 def get_dlog(x: int, y: int):
-    zk_print(f'Fetching discrete log for {x}, {y}...', verbosity_level=2)
-    xb = to_le_32_hex_bytes(x)
-    yb = to_le_32_hex_bytes(y)
-    zk_print(f'Running babygiant with arguments {xb}, {yb}...', verbosity_level=2)
+    return get_dlog_batch([(x, y)])[0]
+
 
-    return int(babygiant.compute_dlog(xb, yb))
+def get_dlog_batch(points: List[Tuple[int, int]]) -> List[int]:
+    zk_print(f'Fetching discrete logs for {len(points)} points...', verbosity_level=2)
+    args = [(to_le_32_hex_bytes(x), to_le_32_hex_bytes(y)) for x, y in points]
+    table_file = dlog_table_file(cfg.elgamal_dlog_table_bits)
+    if not os.path.exists(table_file):
+        if cfg.elgamal_dlog_table_bits > max_in_memory_dlog_table_bits:
+            raise ValueError(f'Discrete log table {table_file} does not exist, generate it using '
+                             f'"zkay generate-dlog-table --elgamal-dlog-table-bits {cfg.elgamal_dlog_table_bits}"')
+        # build table in memory
+        table_file = ''
+    zk_print(f'Running babygiant with arguments {args}, {cfg.elgamal_dlog_bits}, {cfg.elgamal_dlog_table_bits}, "{table_file}"...', verbosity_level=2)
+    return [int(d) for d in babygiant.compute_dlog_batch(args, cfg.elgamal_dlog_bits, cfg.elgamal_dlog_table_bits, table_file)]
 
 
 class ElgamalCrypto(ZkayHomomorphicCryptoInterface):
     params = CryptoParams('elgamal')
 
+    _pk_tables: 'OrderedDict[Tuple[int, int], babyjubjub.FixedBaseTable]' = OrderedDict()
+    """LRU cache of fixed-base tables for frequently used recipient public keys"""
+
+    _pk_uses: 'OrderedDict[Tuple[int, int], int]' = OrderedDict()
+    """Number of scalar multiplications with recipient public keys for which no table exists yet"""
+
+    _pk_tables_lock = threading.Lock()
+
+    _randomness_pool: RandomnessPool[Tuple[int, babyjubjub.Point, babyjubjub.Point]]
+    """Precomputed (r, r * G, r * pk) triples per recipient public key (opt-in, see cfg.randomness_pool_depth)"""
+
+    @classmethod
+    def _mul_pk(cls, pk: List[int], scalar: int) -> babyjubjub.Point:
+        """Return scalar * pk, using a precomputed table once the same public key was used often enough."""
+        cache_key = (pk[0], pk[1])
+        cache_size = max(cfg.elgamal_pk_table_cache_size, 0)
+        build_table = False
+        with cls._pk_tables_lock:
+            table = cls._pk_tables.get(cache_key)
+            if table is not None:
+                cls._pk_tables.move_to_end(cache_key)
+            elif cache_size > 0:
+                uses = cls._pk_uses.pop(cache_key, 0) + 1
+                if uses >= cfg.elgamal_pk_table_threshold:
+                    build_table = True
+                else:
+                    cls._pk_uses[cache_key] = uses
+                    while len(cls._pk_uses) > cache_size:
+                        cls._pk_uses.popitem(last=False)
+
+        point = babyjubjub.Point(babyjubjub.Fq(pk[0]), babyjubjub.Fq(pk[1]))
+        if build_table:
+            table = babyjubjub.FixedBaseTable(point)
+            with cls._pk_tables_lock:
+                cls._pk_tables[cache_key] = table
+                while len(cls._pk_tables) > cache_size:
+                    cls._pk_tables.popitem(last=False)
+
+        if table is not None:
+            return table.mul(scalar % babyjubjub.CURVE_ORDER)
+        return point * babyjubjub.Fr(scalar)
+
     def _generate_or_load_key_pair(self, address: str) -> KeyPair:
         key_file = os.path.join(cfg.data_dir, 'keys', f'elgamal_{self.params.key_bits}_{address}.bin')
         os.makedirs(os.path.dirname(key_file), exist_ok=True)
@@ -67,9 +138,9 @@ class ElgamalCrypto(ZkayHomomorphicCryptoInterface):
 
     def _enc(self, plain: int, _: int, target_pk: int) -> Tuple[List[int], List[int]]:
         pk = self.serialize_pk(target_pk, self.params.key_bytes)
-        r = randrange(babyjubjub.CURVE_ORDER)
-        cipher_chunks = self._enc_with_rand(plain, r, pk)
-        return cipher_chunks, [r]
+        r, c1, shared_secret = self._get_randomness(pk)
+        c2 = babyjubjub.Point.GENERATOR * babyjubjub.Fr(plain) + shared_secret
+        return [c1.u.s, c1.v.s, c2.u.s, c2.v.s], [r]
 
     def _dec(self, cipher: Tuple[int, ...], sk: Any) -> Tuple[int, List[int]]:
         with time_measure("elgamal_decrypt"):
@@ -82,13 +153,37 @@ class ElgamalCrypto(ZkayHomomorphicCryptoInterface):
         # TODO randomness misused for the secret key, which is an extremely ugly hack...
         return plain, [sk]
 
-    def _de_embed(self, plain_embedded: babyjubjub.Point) -> int:
+    def _dec_batch(self, ciphers: List[Tuple[int, ...]], sk: Any) -> List[Tuple[int, List[int]]]:
+        with time_measure("elgamal_decrypt_batch"):
+            plains_embedded = []
+            for cipher in ciphers:
+                c1 = babyjubjub.Point(babyjubjub.Fq(cipher[0]), babyjubjub.Fq(cipher[1]))
+                c2 = babyjubjub.Point(babyjubjub.Fq(cipher[2]), babyjubjub.Fq(cipher[3]))
+                plains_embedded.append(c2 + (c1 * babyjubjub.Fr(sk)).negate())
+
+            # compute all required discrete logs in a single call
+            plains = [self._de_embed_special(p) for p in plains_embedded]
+            missing = [idx for idx, plain in enumerate(plains) if plain is None]
+            dlogs = get_dlog_batch([(plains_embedded[idx].u.s, plains_embedded[idx].v.s) for idx in missing])
+            for idx, dlog in zip(missing, dlogs):
+                plains[idx] = dlog
+
+        return [(plain, [sk]) for plain in plains]
+
+    @staticmethod
+    def _de_embed_special(plain_embedded: babyjubjub.Point) -> Optional[int]:
         # handle basic special cases without expensive discrete log computation
         if plain_embedded == babyjubjub.Point.ZERO:
             return 0
         if plain_embedded == babyjubjub.Point.GENERATOR:
             return 1
-        return get_dlog(plain_embedded.u.s, plain_embedded.v.s)
+        return None
+
+    def _de_embed(self, plain_embedded: babyjubjub.Point) -> int:
+        plain = self._de_embed_special(plain_embedded)
+        if plain is None:
+            plain = get_dlog(plain_embedded.u.s, plain_embedded.v.s)
+        return plain
 
     def do_op(self, op: str, public_key: List[int], *args: Union[CipherValue, int]) -> List[int]:
         def deserialize(operand: Union[CipherValue, int]) -> Union[Tuple[babyjubjub.Point, babyjubjub.Point], int]:
@@ -123,13 +218,28 @@ class ElgamalCrypto(ZkayHomomorphicCryptoInterface):
 
     def do_rerand(self, arg: CipherValue, public_key: List[int]) -> Tuple[List[int], List[int]]:
         # homomorphically add encryption of zero to re-randomize
-        r = randrange(babyjubjub.CURVE_ORDER)
-        enc_zero = CipherValue(self._enc_with_rand(0, r, public_key), params=arg.params)
+        r, c1, shared_secret = self._get_randomness(public_key)
+        enc_zero = CipherValue([c1.u.s, c1.v.s, shared_secret.u.s, shared_secret.v.s], params=arg.params)
         return self.do_op('+', public_key, arg, enc_zero), [r]
 
+    @classmethod
+    def _get_randomness(cls, pk: List[int]) -> Tuple[int, babyjubjub.Point, babyjubjub.Point]:
+        """Return (r, r * G, r * pk) for fresh randomness r, taken from the randomness pool if available."""
+        cache_key = (pk[0], pk[1])
+        val = cls._randomness_pool.get(cache_key)
+        return val if val is not None else cls._gen_randomness(cache_key)
+
+    @classmethod
+    def _gen_randomness(cls, pk: Tuple[int, int]) -> Tuple[int, babyjubjub.Point, babyjubjub.Point]:
+        r = randrange(babyjubjub.CURVE_ORDER)
+        return r, babyjubjub.Point.GENERATOR * babyjubjub.Fr(r), cls._mul_pk(list(pk), r)
+
     def _enc_with_rand(self, plain: int, random: int, pk: List[int]) -> List[int]:
         plain_embedded = babyjubjub.Point.GENERATOR * babyjubjub.Fr(plain)
-        shared_secret = babyjubjub.Point(babyjubjub.Fq(pk[0]), babyjubjub.Fq(pk[1])) * babyjubjub.Fr(random)
+        shared_secret = self._mul_pk(pk, random)
         c1 = babyjubjub.Point.GENERATOR * babyjubjub.Fr(random)
         c2 = plain_embedded + shared_secret
         return [c1.u.s, c1.v.s, c2.u.s, c2.v.s]
+
+
+ElgamalCrypto._randomness_pool = RandomnessPool('elgamal', ElgamalCrypto._gen_randomness)
@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from math import gcd
 from typing import Tuple, Any, List, Union
 
@@ -7,13 +8,61 @@ from Crypto.Random.random import randrange
 
 from zkay.config import cfg, zk_print
 from zkay.transaction.crypto.params import CryptoParams
+from zkay.transaction.crypto.randomness_pool import RandomnessPool
 from zkay.transaction.interface import ZkayHomomorphicCryptoInterface
 from zkay.transaction.types import CipherValue, KeyPair, PublicKeyValue, PrivateKeyValue
 
 
+class PaillierDecryptionContext:
+    """Values derived from a Paillier secret key (p, q), which are required for CRT decryption with generator g = n + 1."""
+    __slots__ = ('p', 'q', 'n', 'p_sqr', 'q_sqr', 'h_p', 'h_q', 'p_inv_q', 'rnd_exp_p', 'rnd_exp_q')
+
+    def __init__(self, p: int, q: int):
+        self.p, self.q = p, q
+        self.n = p * q
+        self.p_sqr, self.q_sqr = p * p, q * q
+
+        # h_p = L_p(g^(p-1) mod p^2)^-1 mod p, where L_p(x) = (x - 1) / p
+        self.h_p = pow((pow(self.n + 1, p - 1, self.p_sqr) - 1) // p, -1, p)
+        self.h_q = pow((pow(self.n + 1, q - 1, self.q_sqr) - 1) // q, -1, q)
+        self.p_inv_q = pow(p, -1, q)
+
+        # random^n == random^q (mod p), so random == (random^n)^(q^-1 mod p-1) (mod p)
+        self.rnd_exp_p = pow(q, -1, p - 1)
+        self.rnd_exp_q = pow(p, -1, q - 1)
+
+    def crt(self, x_p: int, x_q: int) -> int:
+        """Return the x mod n with x == x_p (mod p) and x == x_q (mod q)."""
+        return x_p + self.p * ((x_q - x_p) * self.p_inv_q % self.q)
+
+    def decrypt(self, c: int) -> Tuple[int, int]:
+        """Return (plain mod n, randomness) for cipher c."""
+        m_p = (pow(c, self.p - 1, self.p_sqr) - 1) // self.p * self.h_p % self.p
+        m_q = (pow(c, self.q - 1, self.q_sqr) - 1) // self.q * self.h_q % self.q
+        plain = self.crt(m_p, m_q)
+
+        # c = g^plain * random^n mod n^2 and g == 1 (mod p), hence c == random^n (mod p) (and mod q respectively)
+        r_p = pow(c % self.p, self.rnd_exp_p, self.p)
+        r_q = pow(c % self.q, self.rnd_exp_q, self.q)
+        return plain, self.crt(r_p, r_q)
+
+
+@lru_cache(maxsize=64)
+def _decryption_context(p: int, q: int) -> PaillierDecryptionContext:
+    return PaillierDecryptionContext(p, q)
+
+
+@lru_cache(maxsize=64)
+def _n_sqr(n: int) -> int:
+    return n * n
+
+
 class PaillierCrypto(ZkayHomomorphicCryptoInterface):
     params = CryptoParams('paillier')
 
+    _randomness_pool: RandomnessPool[Tuple[int, int]]
+    """Precomputed (random, random^n mod n^2) pairs per recipient public key n (opt-in, see cfg.randomness_pool_depth)"""
+
     def _generate_or_load_key_pair(self, address: str) -> KeyPair:
         key_file = os.path.join(cfg.data_dir, 'keys', f'paillier_{self.params.key_bits}_{address}.bin')
         os.makedirs(os.path.dirname(key_file), exist_ok=True)
@@ -74,19 +123,28 @@ class PaillierCrypto(ZkayHomomorphicCryptoInterface):
             if not co_prime or (gcd(random, n) == 1):
                 return random
 
-    def _enc_with_rand(self, plain: int, random: int, n: int) -> List[int]:
-        n_sqr = n * n
+    @classmethod
+    def _gen_randomness(cls, n: int) -> Tuple[int, int]:
+        random = cls.sample_below(n, co_prime=True)
+        return random, pow(random, n, _n_sqr(n))
+
+    def _enc_with_rand_pow_n(self, plain: int, rand_pow_n: int, n: int) -> List[int]:
+        n_sqr = _n_sqr(n)
         g_pow_plain = n * plain + 1
-        rand_pow_n = pow(random, n, n_sqr)
         cipher = (g_pow_plain * rand_pow_n) % n_sqr
         return self.serialize_pk(cipher, self.params.cipher_bytes_payload)
 
+    def _enc_with_rand(self, plain: int, random: int, n: int) -> List[int]:
+        return self._enc_with_rand_pow_n(plain, pow(random, n, _n_sqr(n)), n)
+
     def _enc(self, plain: int, _: int, target_pk: int) -> Tuple[List[int], List[int]]:
         n = target_pk
         plain = plain % n  # handle negative numbers
-        random = self.sample_below(n, co_prime=True)
+        # random^n does not depend on the plaintext and can be precomputed
+        pooled = self._randomness_pool.get(n)
+        random, rand_pow_n = pooled if pooled is not None else self._gen_randomness(n)
 
-        cipher_chunks = self._enc_with_rand(plain, random, n)
+        cipher_chunks = self._enc_with_rand_pow_n(plain, rand_pow_n, n)
         random_chunks = self.serialize_pk(random, self.params.rnd_bytes)
 
         return cipher_chunks, random_chunks
@@ -94,46 +152,21 @@ class PaillierCrypto(ZkayHomomorphicCryptoInterface):
     def _dec(self, cipher: Tuple[int, ...], sk: Any) -> Tuple[int, List[int]]:
         p = self.deserialize_pk(sk[:self.params.key_len])
         q = self.deserialize_pk(sk[self.params.key_len:])
-        n = p * q
-        n_sqr = n * n
-        lambda_ = (p - 1) * (q - 1)
-        lambda_inv = pow(lambda_, -1, n)
+        ctx = _decryption_context(p, q)
         c = self.deserialize_pk(cipher)
 
-        # Compute the plaintext: plain = L(cipher^lambda mod n^2) / lambda mod n
-        c_pow_lambda = pow(c, lambda_, n_sqr)
-        l = (c_pow_lambda - 1) // n
-        plain = (l * lambda_inv) % n
-
-        # Compute the randomness that was used
-        # Fortunately, this has been asked and answered on stackexchange: https://math.stackexchange.com/a/114142
-        generator = n + 1
-        g_pow_plain_inv = pow(generator, -plain, n_sqr)
-        rand_pow_n = (c * g_pow_plain_inv) % n_sqr
-        p_inv = pow(p, -1, q - 1)  # Inverse of p modulo q-1
-        q_inv = pow(q, -1, p - 1)  # Inverse of q modulo p-1
-        c_pow_p_inv = pow(rand_pow_n, p_inv, q)
-        c_pow_q_inv = pow(rand_pow_n, q_inv, p)
-        # random == c_pow_q_inv mod p
-        # random == c_pow_p_inv mod q
-        # Compute random using the Chinese Remainder Theorem
-        y_1 = pow(q, -1, p)
-        y_2 = pow(p, -1, q)
-        w_1 = (y_1 * q) % n
-        w_2 = (y_2 * p) % n
-
-        random = (c_pow_q_inv * w_1 + c_pow_p_inv * w_2) % n
+        plain, random = ctx.decrypt(c)
         random_chunks = self.serialize_pk(random, self.params.rnd_bytes)
 
         # Handle possible negative plaintexts
-        if plain > n // 2:
-            plain = plain - n
+        if plain > ctx.n // 2:
+            plain = plain - ctx.n
 
         return plain, random_chunks
 
     def do_op(self, op: str, public_key: Union[List[int], int], *args: Union[CipherValue, int]) -> List[int]:
         n = self.deserialize_pk(public_key)
-        n_sqr = n * n
+        n_sqr = _n_sqr(n)
 
         def deserialize(operand: Union[CipherValue, int]) -> int:
             if isinstance(operand, CipherValue):
@@ -165,3 +198,6 @@ class PaillierCrypto(ZkayHomomorphicCryptoInterface):
 
     def do_rerand(self, arg: CipherValue, public_key: List[int]) -> Tuple[List[int], List[int]]:
         raise NotImplementedError("Rerandomization not implemented for Paillier backend")
+
+
+PaillierCrypto._randomness_pool = RandomnessPool('paillier', PaillierCrypto._gen_randomness)
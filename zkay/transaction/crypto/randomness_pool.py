@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Generic, Hashable, Optional, TypeVar
+
+from zkay.config import cfg, zk_print
+
+T = TypeVar('T')
+
+
+class RandomnessPool(Generic[T]):
+    """
+    Per-recipient pools of precomputed, plaintext-independent encryption values (e.g. (r, r^n mod n^2)).
+
+    A daemon thread fills a bounded queue (cfg.randomness_pool_depth entries) for each recipient key which was requested.
+    Refill policy: once a queue drops to half of its depth (or a new key is requested), the thread refills all
+    queues up to full depth, generating one value per key in round-robin fashion.
+    At most max_keys recipient keys are pooled, the least recently used key is dropped first.
+
+    Since the worker is a thread, it mostly makes progress while the client is idle (e.g. waiting for the blockchain or the prover).
+    """
+
+    def __init__(self, name: str, generate: Callable[[Hashable], T], max_keys: int = 16):
+        self._name = name
+        self._generate = generate
+        self._max_keys = max_keys
+        self._queues: 'OrderedDict[Hashable, Deque[T]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def get(self, key: Hashable) -> Optional[T]:
+        """Return a precomputed value for key, or None if the pool is disabled or currently empty."""
+        depth = cfg.randomness_pool_depth
+        if depth <= 0:
+            return None
+
+        with self._lock:
+            q = self._queues.get(key)
+            if q is None:
+                q = self._queues[key] = deque()
+                while len(self._queues) > self._max_keys:
+                    self._queues.popitem(last=False)
+            else:
+                self._queues.move_to_end(key)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=f'{self._name}-randomness-pool', daemon=True)
+                self._worker.start()
+
+        try:
+            val = q.popleft()
+        except IndexError:
+            val = None
+        if len(q) <= depth // 2:
+            self._wakeup.set()
+        return val
+
+    def clear(self):
+        with self._lock:
+            self._queues.clear()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while True:
+                depth = cfg.randomness_pool_depth
+                with self._lock:
+                    todo = [(key, q) for key, q in self._queues.items() if len(q) < depth]
+                if not todo:
+                    break
+                for key, q in todo:
+                    try:
+                        q.append(self._generate(key))
+                    except Exception as e:
+                        zk_print(f'WARNING: Failed to precompute {self._name} randomness, disabling pool for this key\n{e}')
+                        with self._lock:
+                            if self._queues.get(key) is q:
+                                del self._queues[key]
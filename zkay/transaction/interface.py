@@ -11,7 +11,8 @@ It provides high level functions for
 import os
 from abc import ABCMeta, abstractmethod
 from builtins import type
-from typing import Tuple, List, Optional, Union, Any, Dict, Collection
+from concurrent.futures import Future
+from typing import Tuple, List, Optional, Union, Any, Dict, Collection, Callable
 
 from zkay.compiler.privacy.library_contracts import bn128_scalar_field
 from zkay.compiler.privacy.proving_scheme.proving_scheme import ProvingScheme
@@ -103,6 +104,18 @@ class ZkayBlockchainInterface(metaclass=ABCMeta):
         # may not be supported by all backends
         raise NotImplementedError('Current blockchain backend does not support creating pre-funded test accounts.')
 
+    def subscribe_blocks(self, callback: Callable[[int], Any]):
+        """
+        Call callback with the new block number (in a background thread) whenever a new block was mined.
+
+        Only a weak reference to callback is kept, the subscription ends when the object of the bound method is garbage collected.
+
+        :param callback: bound method
+        :raise NotImplementedError: if the backend does not support block subscriptions
+        """
+        # may not be supported by all backends
+        raise NotImplementedError('Current blockchain backend does not support block subscriptions.')
+
     @abstractmethod
     def get_special_variables(self, sender: AddressValue, wei_amount: int = 0) -> Tuple[MsgStruct, BlockStruct, TxStruct]:
         """
@@ -163,6 +176,25 @@ class ZkayBlockchainInterface(metaclass=ABCMeta):
         zk_print(f'Got value {val} for state variable "{name}"', verbosity_level=2)
         return val
 
+    def req_state_vars(self, contract_handle, requests: List[Tuple[str, Tuple]]) -> List[Union[bool, int, str, bytes]]:
+        """
+        Request multiple contract state variable values from the chain at once.
+
+        Depending on the backend (see supports_batched_requests), all values are requested within a single round trip.
+
+        :param contract_handle: contract from which to read state
+        :param requests: list of (name, indices) tuples, see req_state_var
+        :raise BlockChainError: if request fails
+        :return: The values (in the same order as requests)
+        """
+        assert contract_handle is not None
+        if not requests:
+            return []
+        zk_print(f'Requesting {len(requests)} state variable values', verbosity_level=2)
+        vals = self._req_state_vars(contract_handle, [(name, tuple(Value.unwrap_values(list(indices)))) for name, indices in requests])
+        zk_print(f'Got values {vals} for state variables {[name for name, _ in requests]}', verbosity_level=2)
+        return vals
+
     def call(self, contract_handle, sender: AddressValue, name: str, *args) -> Union[bool, int, str, bytes, List]:
         """
         Call the specified pure/view function in the given contract with the provided arguments.
@@ -205,6 +237,30 @@ class ZkayBlockchainInterface(metaclass=ABCMeta):
         zk_print()
         return ret
 
+    def transact_async(self, contract_handle, sender: AddressValue, function: str, actual_args: List, should_encrypt: List[bool], wei_amount: Optional[int] = None) -> Future:
+        """
+        Submit a transaction for the specified function in the given contract without waiting until it is mined.
+
+        Nonces are assigned locally per sender, so multiple transactions can be submitted back to back \
+        (they are mined in submission order). Note that each transaction is simulated on the current chain state, \
+        transactions whose simulation depends on the effects of a still outstanding transaction will fail.
+
+        **WARNING: THIS ISSUES A CRYPTO CURRENCY TRANSACTION (GAS COST)**
+
+        See transact for a description of the parameters.
+
+        :raise BlockChainError: if the transaction cannot be submitted
+        :return: future which resolves to the backend-specific transaction receipt, or raises BlockChainError or \
+                 TransactionFailedException if the transaction failed
+        """
+        assert contract_handle is not None
+        self.__check_args(actual_args, should_encrypt)
+        zk_print(f'Submitting transaction for function "{function}" from account "{sender}"')
+        zk_print(Value.collection_to_string(actual_args), verbosity_level=2)
+        ret = self._transact_async(contract_handle, sender.val, function, *Value.unwrap_values(actual_args), wei_amount=wei_amount)
+        zk_print()
+        return ret
+
     def deploy(self, project_dir: str, sender: AddressValue, contract: str, actual_args: List, should_encrypt: List[bool], wei_amount: Optional[int] = None) -> Any:
         """
         Issue a deployment transaction which constructs the specified contract with the provided constructor arguments on the chain.
@@ -351,6 +407,11 @@ class ZkayBlockchainInterface(metaclass=ABCMeta):
     def is_debug_backend(cls) -> bool:
         return False
 
+    @classmethod
+    def supports_batched_requests(cls) -> bool:
+        """Return true if req_state_vars requests all values within a single round trip."""
+        return False
+
     # INTERNAL FUNCTIONALITY
 
     @abstractmethod
@@ -420,10 +481,23 @@ class ZkayBlockchainInterface(metaclass=ABCMeta):
     def _req_state_var(self, contract_handle, name: str, *indices) -> Union[bool, int, str]:
         pass
 
+    def _req_state_vars(self, contract_handle, requests: List[Tuple[str, Tuple]]) -> List[Union[bool, int, str]]:
+        # Backends which support batched requests should override this
+        return [self._req_state_var(contract_handle, name, *indices) for name, indices in requests]
+
     @abstractmethod
     def _transact(self, contract_handle, sender: Union[bytes, str], function: str, *actual_args, wei_amount: Optional[int] = None) -> Any:
         pass
 
+    def _transact_async(self, contract_handle, sender: Union[bytes, str], function: str, *actual_args, wei_amount: Optional[int] = None) -> Future:
+        # Backends which can submit transactions without waiting for their receipts should override this
+        future = Future()
+        try:
+            future.set_result(self._transact(contract_handle, sender, function, *actual_args, wei_amount=wei_amount))
+        except TransactionFailedException as e:
+            future.set_exception(e)
+        return future
+
     @abstractmethod
     def _deploy(self, project_dir: str, sender: Union[bytes, str], contract: str, *actual_args, wei_amount: Optional[int] = None) -> Any:
         pass
@@ -448,6 +522,17 @@ class ZkayKeystoreInterface(metaclass=ABCMeta):
         self.crypto_params = crypto_params
         self.local_pk_store: Dict[AddressValue, PublicKeyValue] = {}
         self.local_key_pairs: Dict[AddressValue, KeyPair] = {}
+        self._decryption_cache = None
+
+    @property
+    def decryption_cache(self):
+        """Return the DecryptionCache of this keystore, None if decryption results should not be cached (see cfg.decryption_cache_size)."""
+        if cfg.decryption_cache_size <= 0 and not cfg.decryption_disk_cache:
+            return None
+        if self._decryption_cache is None:
+            from zkay.transaction.keystore.decryption_cache import DecryptionCache
+            self._decryption_cache = DecryptionCache(self.crypto_params)
+        return self._decryption_cache
 
     def add_keypair(self, address: AddressValue, key_pair: KeyPair):
         """
@@ -585,10 +670,56 @@ class ZkayCryptoInterface(metaclass=ABCMeta):
             # Ciphertext is all zeros, i.e. uninitialized -> zero
             return 0, (None if self.params.is_symmetric_cipher() else RandomnessValue(params=self.params))
         else:
-            sk = self.keystore.sk(my_addr)
-            plain, rnd = self._dec(cipher[:], sk.val)
+            cache = self.keystore.decryption_cache
+            digest = None if cache is None else cache.digest(self.keystore.pk(my_addr), cipher)
+            res = None if cache is None else cache.get(my_addr, digest)
+            if res is None:
+                sk = self.keystore.sk(my_addr)
+                res = self._dec(cipher[:], sk.val)
+                if cache is not None:
+                    cache.put(my_addr, digest, *res)
+            plain, rnd = res
             return plain, (None if rnd is None else RandomnessValue(rnd, params=self.params))
 
+    def dec_batch(self, ciphers: List[CipherValue], my_addr: AddressValue) -> List[Tuple[int, Optional[RandomnessValue]]]:
+        """
+        Decrypt multiple ciphers encrypted for my_addr.
+
+        :param ciphers: encrypted values
+        :param my_addr: all ciphers are encrypted for this address
+        :return: list with the result of dec(cipher, my_addr) for each cipher
+        """
+        assert all(isinstance(c, CipherValue) for c in ciphers)
+        assert isinstance(my_addr, AddressValue)
+        zk_print(f'Decrypting {len(ciphers)} values for {my_addr}', verbosity_level=2)
+
+        res: List[Optional[Tuple[int, Optional[RandomnessValue]]]] = [None] * len(ciphers)
+        cache = self.keystore.decryption_cache
+        pk = None if cache is None else self.keystore.pk(my_addr)
+        digests = {}
+        to_decrypt = []
+        for idx, cipher in enumerate(ciphers):
+            if cipher == CipherValue(params=self.params):
+                # Ciphertext is all zeros, i.e. uninitialized -> zero
+                res[idx] = 0, (None if self.params.is_symmetric_cipher() else RandomnessValue(params=self.params))
+                continue
+            if cache is not None:
+                digests[idx] = cache.digest(pk, cipher)
+                cached = cache.get(my_addr, digests[idx])
+                if cached is not None:
+                    plain, rnd = cached
+                    res[idx] = plain, (None if rnd is None else RandomnessValue(rnd, params=self.params))
+                    continue
+            to_decrypt.append(idx)
+
+        if to_decrypt:
+            sk = self.keystore.sk(my_addr)
+            for idx, (plain, rnd) in zip(to_decrypt, self._dec_batch([ciphers[idx][:] for idx in to_decrypt], sk.val)):
+                if cache is not None:
+                    cache.put(my_addr, digests[idx], plain, rnd)
+                res[idx] = plain, (None if rnd is None else RandomnessValue(rnd, params=self.params))
+        return res
+
     def serialize_pk(self, key: int, total_bytes: int) -> List[int]:
         """Serialize a large integer into an array of {params.cipher_chunk_size}-byte ints."""
         data = key.to_bytes(total_bytes, byteorder='big')
@@ -628,6 +759,10 @@ class ZkayCryptoInterface(metaclass=ABCMeta):
     def _dec(self, cipher: Tuple[int, ...], sk: Any) -> Tuple[int, List[int]]:
         pass
 
+    def _dec_batch(self, ciphers: List[Tuple[int, ...]], sk: Any) -> List[Tuple[int, List[int]]]:
+        """Decrypt multiple ciphers, backends which support bulk decryption can override this."""
+        return [self._dec(cipher, sk) for cipher in ciphers]
+
 
 class ZkayHomomorphicCryptoInterface(ZkayCryptoInterface):
 
@@ -649,6 +784,21 @@ class ZkayProverInterface(metaclass=ABCMeta):
 
     def __init__(self, proving_scheme: str = None):
         self.proving_scheme = cfg.proving_scheme if proving_scheme is None else proving_scheme
+        self._pool = None
+
+    @property
+    def pool(self):
+        """Return the ProverPool which generates the proofs requested via generate_proof_async (created on first use)."""
+        if self._pool is None:
+            from zkay.transaction.prover.pool import ProverPool
+            self._pool = ProverPool(self)
+        return self._pool
+
+    def shutdown_pool(self, wait: bool = True):
+        """Shut down the prover pool (if it was created), a new pool is created on the next asynchronous request."""
+        if self._pool is not None:
+            self._pool.shutdown(wait)
+            self._pool = None
 
     def generate_proof(self, project_dir: str, contract: str, function: str, priv_values: List, in_vals: List, out_vals: List[Union[int, CipherValue]]) -> List[int]:
         """
@@ -665,6 +815,23 @@ class ZkayProverInterface(metaclass=ABCMeta):
         :raise ProofGenerationError: if proof generation fails
         :return: the proof, serialized into an uint256 array
         """
+        verify_dir, priv_values, in_vals, out_vals = self.__prepare_args(project_dir, contract, function, priv_values, in_vals, out_vals)
+        with time_measure(f'generate_proof', True):
+            return self._generate_proof(verify_dir, priv_values, in_vals, out_vals)
+
+    def generate_proof_async(self, project_dir: str, contract: str, function: str, priv_values: List, in_vals: List, out_vals: List[Union[int, CipherValue]]) -> Future:
+        """
+        Schedule the generation of a NIZK-proof on the prover pool and return immediately.
+
+        See generate_proof for a description of the parameters, the arguments are serialized before this function returns.
+
+        :return: future which resolves to the proof (or raises ProofGenerationError if proof generation fails)
+        """
+        verify_dir, priv_values, in_vals, out_vals = self.__prepare_args(project_dir, contract, function, priv_values, in_vals, out_vals)
+        return self.pool.submit(verify_dir, priv_values, in_vals, out_vals)
+
+    @staticmethod
+    def __prepare_args(project_dir: str, contract: str, function: str, priv_values: List, in_vals: List, out_vals: List[Union[int, CipherValue]]) -> Tuple[str, List[int], List[int], List[int]]:
         for i in range(len(priv_values)):
             arg = priv_values[i]
             assert not isinstance(arg, Value) or isinstance(arg, (RandomnessValue, AddressValue))
@@ -681,14 +848,21 @@ class ZkayProverInterface(metaclass=ABCMeta):
         for arg in priv_values + in_vals + out_vals:
             assert int(arg) < bn128_scalar_field, 'argument overflow'
 
-        with time_measure(f'generate_proof', True):
-            verify_dir = cfg.get_circuit_output_dir_name(cfg.get_verification_contract_name(contract, function))
-            return self._generate_proof(os.path.abspath(os.path.join(project_dir, verify_dir)), priv_values, in_vals, out_vals)
+        verify_dir = cfg.get_circuit_output_dir_name(cfg.get_verification_contract_name(contract, function))
+        return os.path.abspath(os.path.join(project_dir, verify_dir)), priv_values, in_vals, out_vals
 
     @abstractmethod
     def _generate_proof(self, verifier_dir: str, priv_values: List[int], in_vals: List[int], out_vals: List[int]) -> List[int]:
         pass
 
+    def _estimate_proof_memory(self, verifier_dir: str) -> int:
+        """
+        Return an estimate of the peak memory usage (in bytes) of proof generation for the circuit in verifier_dir.
+
+        Backends without an estimate are only limited by the size of the prover pool.
+        """
+        return 0
+
     @abstractmethod
     def get_prover_key_hash(self, verifier_directory: str) -> bytes:
         """Return the hash of the prover key stored in the given verification contract output directory."""
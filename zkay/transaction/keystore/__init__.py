@@ -5,6 +5,7 @@ This package contains the keystore backends.
 Submodules
 ==========
 * :py:mod:`.simple`: Basic key store implementation
+* :py:mod:`.decryption_cache`: Cache of decryption results (see cfg.decryption_cache_size)
 """
 
 from .simple import SimpleKeystore
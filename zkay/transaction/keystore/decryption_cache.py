@@ -0,0 +1,168 @@
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Collection, Dict, List, Optional, Tuple
+
+from Crypto.Cipher import AES
+
+from zkay.config import cfg
+from zkay.transaction.crypto.params import CryptoParams
+from zkay.transaction.types import AddressValue
+
+DecryptionResult = Tuple[int, Optional[List[int]]]
+
+
+class DecryptionCache:
+    """
+    Cache of decryption results (plain, randomness) of a keystore, see cfg.decryption_cache_size.
+
+    Entries are indexed by (owner address, digest of the owner's public key and the cipher text). The least recently used
+    entries are kept in memory. If cfg.decryption_disk_cache is set, all entries are additionally stored in the data
+    directory, encrypted (AES-GCM) with a random key per owner which is stored next to the owner's secret keys.
+    The size of the disk cache is tracked incrementally, it is only scanned (and trimmed) once the estimate exceeds
+    cfg.decryption_disk_cache_size_mb.
+    """
+
+    def __init__(self, crypto_params: CryptoParams):
+        self.crypto_params = crypto_params
+        self._entries: 'OrderedDict[Tuple[AddressValue, bytes], DecryptionResult]' = OrderedDict()
+        self._disk_keys: Dict[AddressValue, bytes] = {}
+        self._disk_size: Optional[int] = None
+        """Estimated size of the disk cache in bytes (None until the cache directory was scanned once)"""
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+
+    @staticmethod
+    def digest(pk: Collection[int], cipher: Collection[int]) -> bytes:
+        return hashlib.sha256(repr((tuple(pk), tuple(cipher))).encode()).digest()
+
+    def get(self, owner: AddressValue, digest: bytes) -> Optional[DecryptionResult]:
+        """Return the cached (plain, randomness) for the cipher with the given digest, None if not cached."""
+        with self._lock:
+            res = self._entries.get((owner, digest))
+            if res is not None:
+                self._entries.move_to_end((owner, digest))
+                return res
+
+        res = self._load(owner, digest) if cfg.decryption_disk_cache else None
+        if res is not None:
+            self._insert(owner, digest, res)
+        return res
+
+    def put(self, owner: AddressValue, digest: bytes, plain: int, rnd: Optional[List[int]]):
+        res = (plain, None if rnd is None else list(rnd))
+        self._insert(owner, digest, res)
+        if cfg.decryption_disk_cache:
+            self._store(owner, digest, res)
+
+    def _insert(self, owner: AddressValue, digest: bytes, res: DecryptionResult):
+        with self._lock:
+            self._entries[(owner, digest)] = res
+            while len(self._entries) > max(cfg.decryption_cache_size, 0):
+                self._entries.popitem(last=False)
+
+    def _disk_key(self, owner: AddressValue) -> bytes:
+        with self._lock:
+            key = self._disk_keys.get(owner)
+            if key is not None:
+                return key
+
+            key_file = os.path.join(cfg.data_dir, 'keys', f'dec_cache_{self.crypto_params.crypto_name}_{owner.val.hex()}.bin')
+            try:
+                with open(key_file, 'rb') as f:
+                    key = f.read()
+            except OSError:
+                key = None
+            if key is None or len(key) != 32:
+                # Entries which were encrypted with a lost key are just unreadable
+                key = secrets.token_bytes(32)
+                _write_file(key_file, key)
+            self._disk_keys[owner] = key
+            return key
+
+    def _entry_file(self, owner: AddressValue, digest: bytes) -> Tuple[str, bytes]:
+        """Return the disk cache file for the given entry and the key with which its content is encrypted."""
+        key = self._disk_key(owner)
+        name = hmac.new(key, digest, hashlib.sha256).hexdigest()
+        return os.path.join(_disk_cache_dir(), self.crypto_params.crypto_name, owner.val.hex(), f'{name}.bin'), key
+
+    def _load(self, owner: AddressValue, digest: bytes) -> Optional[DecryptionResult]:
+        filename, key = self._entry_file(owner, digest)
+        try:
+            with open(filename, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            cipher = AES.new(key, AES.MODE_GCM, nonce=data[:12])
+            cipher.update(digest)
+            plain, rnd = json.loads(cipher.decrypt_and_verify(data[28:], data[12:28]))
+        except ValueError:
+            return None
+        try:
+            os.utime(filename)  # Mark as recently used
+        except OSError:
+            pass
+        return plain, rnd
+
+    def _store(self, owner: AddressValue, digest: bytes, res: DecryptionResult):
+        filename, key = self._entry_file(owner, digest)
+        cipher = AES.new(key, AES.MODE_GCM, nonce=secrets.token_bytes(12))
+        cipher.update(digest)
+        data, tag = cipher.encrypt_and_digest(json.dumps(res).encode())
+        data = cipher.nonce + tag + data
+        _write_file(filename, data)
+        self._add_disk_usage(len(data))
+
+    def _add_disk_usage(self, size: int):
+        max_size = cfg.decryption_disk_cache_size_mb * 1024 * 1024
+        with self._disk_lock:
+            if self._disk_size is None:
+                self._disk_size = _evict(_disk_cache_dir(), max_size)
+            else:
+                self._disk_size += size
+            if self._disk_size > max_size:
+                # Leave some room, such that the directory is not scanned again on the next store
+                self._disk_size = _evict(_disk_cache_dir(), max_size * 3 // 4)
+
+
+def _disk_cache_dir() -> str:
+    return os.path.join(cfg.data_dir, 'decryption_cache')
+
+
+def _evict(cache_dir: str, max_size: int) -> int:
+    """Remove the least recently used entries until the cache is at most max_size bytes large, return its size."""
+    entries: List[Tuple[float, int, str]] = []
+    for d, _, files in os.walk(cache_dir):
+        for f in files:
+            if f.endswith('.tmp'):
+                continue  # Written concurrently
+            path = os.path.join(d, f)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue  # Removed concurrently
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total_size -= size
+    return total_size
+
+
+def _write_file(filename: str, data: bytes):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp_file = f'{filename}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_file, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_file, filename)
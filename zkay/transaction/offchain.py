@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import inspect
+import threading
+from concurrent.futures import Future
 from contextlib import contextmanager, nullcontext
 from enum import IntEnum
 from typing import Dict, Union, Callable, Any, Optional, List, Tuple, ContextManager
@@ -26,6 +28,44 @@ class RequireException(Exception):
     pass
 
 
+class StateMirror:
+    """
+    Local copy of the on-chain state of a connected contract, see cfg.blockchain_state_mirror.
+
+    The copy is only valid for a single block, all values are dropped when a new block is mined.
+    """
+
+    def __init__(self) -> None:
+        self.__values: Dict[str, Any] = {}
+        self.__block_number: Optional[int] = None
+        self.__version = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        """Counter which is incremented whenever the copy is invalidated (pass to put)."""
+        return self.__version
+
+    def get(self, loc: str) -> Optional[Any]:
+        return self.__values.get(loc)
+
+    def put(self, loc: str, val: Any, version: int):
+        """Store val for loc if it was requested from the chain after the copy was last invalidated (i.e. at version)."""
+        with self.__lock:
+            if version == self.__version:
+                self.__values[loc] = val
+
+    def invalidate(self):
+        with self.__lock:
+            self.__values.clear()
+            self.__version += 1
+
+    def on_new_block(self, block_number: int):
+        if self.__block_number is None or block_number > self.__block_number:
+            self.__block_number = block_number
+            self.invalidate()
+
+
 class StateDict:
     """Dictionary which wraps access to state variables"""
 
@@ -49,7 +89,7 @@ class StateDict:
 
     def get_plain(self, name: str, *indices):
         is_cipher, crypto_params, constr = self.__constructors[name]
-        val = self.__get((name, *indices), cache=False)
+        val = self.__get((name, *indices), cache=False, mirrored=True)
         if is_cipher:
             ret, _ = self.api.dec(val, constr, crypto_params.crypto_name)
             return ret
@@ -57,7 +97,7 @@ class StateDict:
             return val
 
     def get_raw(self, name: str, *indices):
-        return self.__get((name, *indices), cache=False)
+        return self.__get((name, *indices), cache=False, mirrored=True)
 
     def __getitem__(self, key: Union[str, Tuple]):
         """
@@ -85,7 +125,51 @@ class StateDict:
         # Write to state
         self.__state[loc] = value
 
-    def __get(self, key: Union[str, Tuple], cache: bool):
+    def prefetch(self, keys: List[Tuple]):
+        """
+        Request the values of all given state locations, which are not yet in the local state, at once.
+
+        Locations which cannot be requested are not fetched, they are requested again (and fail) when they are accessed.
+        Nothing is fetched if the backend does not support batched requests, as keys may contain locations which are
+        never accessed (e.g. within branches which are not taken).
+
+        :param keys: list of tuples with the state variable name and all index key values (see __getitem__)
+        """
+        if not self.api.supports_batched_requests:
+            return
+        locs: Dict[str, Tuple[str, int, int]] = {}
+        requests = []
+        for key in keys:
+            var, indices = key[0], key[1:]
+            loc = var + ''.join(f'[{k}]' for k in indices)
+            if loc in self.__state or loc in locs:
+                continue
+            is_cipher, crypto_params, _ = self.__constructors[var]
+            count = crypto_params.cipher_len if is_cipher else 1
+            locs[loc] = (var, len(requests), count)
+            if is_cipher:
+                requests += [(var, (*indices, i)) for i in range(count)]
+            else:
+                requests.append((var, indices))
+        if not requests:
+            return
+
+        mirror = self.api.state_mirror
+        version = None if mirror is None else mirror.version
+        try:
+            vals = self.api._req_state_vars(requests)
+        except BlockChainError:
+            return
+        for loc, (var, start, count) in locs.items():
+            is_cipher, crypto_params, constr = self.__constructors[var]
+            if is_cipher:
+                self.__state[loc] = CipherValue(vals[start:start + count], params=crypto_params)
+            else:
+                self.__state[loc] = constr(vals[start])
+            if mirror is not None:
+                mirror.put(loc, self.__state[loc], version)
+
+    def __get(self, key: Union[str, Tuple], cache: bool, mirrored: bool = False):
         if not isinstance(key, Tuple):
             key = (key, )
         var, indices = key[0], key[1:]
@@ -95,6 +179,14 @@ class StateDict:
         if cache and loc in self.__state:
             return self.__state[loc]
         else:
+            # Values which were requested during transactions are mirrored as well, but transactions never use the mirror
+            mirror = self.api.state_mirror
+            if mirror is not None:
+                val = mirror.get(loc) if mirrored else None
+                if val is not None:
+                    return val
+                version = mirror.version
+
             is_cipher, crypto_params, constr = self.__constructors[var]
             try:
                 if is_cipher:
@@ -106,6 +198,8 @@ class StateDict:
                 raise KeyError(key)
             if cache:
                 self.__state[loc] = val
+            if mirror is not None:
+                mirror.put(loc, val, version)
             return val
 
 
@@ -192,6 +286,25 @@ class ContractSimulator:
         yield
         self.locals.pop_scope()
 
+    @contextmanager
+    def async_transactions(self) -> ContextManager:
+        """
+        Return context manager within which transactions of this contract instance are submitted without waiting until they are mined.
+
+        Within the context, functions which issue a transaction return a concurrent.futures.Future for the transaction receipt.
+        Proofs are generated on the prover pool (see Runtime.prover().pool) while the next transaction is simulated,
+        each transaction is submitted as soon as its proof is available. The receipts of all outstanding transactions are
+        collected in the background.
+        Each transaction is simulated (and proven) on the current chain state, so transactions whose simulation depends on
+        the effects of a still outstanding transaction fail.
+        """
+        prev = self.api.submit_async
+        self.api.submit_async = True
+        try:
+            yield
+        finally:
+            self.api.submit_async = prev
+
     @staticmethod
     def help(module, contract, contract_name):
         def pred(obj):
@@ -332,6 +445,12 @@ class ApiWrapper:
         to designate where in the public IO arrays the functions should store/retrieve public circuit inputs/outputs.
         """
 
+        self.state_mirror: Optional[StateMirror] = None
+        """Local copy of the contract state for reads outside of transactions (only if cfg.blockchain_state_mirror is set)"""
+
+        self.submit_async: bool = False
+        """If true, transactions are submitted without waiting for their receipts (transact returns a future for the receipt)"""
+
         self.is_external: Optional[bool] = None
         """
         True whenever simulation is inside a function which was directly (without transitivity) called by the user.
@@ -347,6 +466,10 @@ class ApiWrapper:
     def user_address(self):
         return self.__user_addr
 
+    @property
+    def supports_batched_requests(self) -> bool:
+        return self.__conn.supports_batched_requests()
+
     @property
     def keystore(self) -> ZkayKeystoreInterface:
         # Method only exists for compatibility, new code generators only generate calls to get_keystore
@@ -380,12 +503,52 @@ class ApiWrapper:
     def deploy(self, actual_args: List, should_encrypt: List[bool], wei_amount: Optional[int] = None):
         self.__contract_handle = self.__conn.deploy(self.__project_dir, self.__user_addr, self.__contract_name,
                                                     actual_args, should_encrypt, wei_amount=wei_amount)
+        self.__create_state_mirror()
 
     def connect(self, address: AddressValue):
         self.__contract_handle = self.__conn.connect(self.__project_dir, self.__contract_name, address, self.user_address)
+        self.__create_state_mirror()
+
+    def __create_state_mirror(self):
+        self.state_mirror = None
+        if cfg.blockchain_state_mirror:
+            mirror = StateMirror()
+            try:
+                self.__conn.subscribe_blocks(mirror.on_new_block)
+            except NotImplementedError:
+                return
+            self.state_mirror = mirror
 
     def transact(self, fname: str, args: List, should_encrypt: List[bool], wei_amount: Optional[int] = None) -> Any:
-        return self.__conn.transact(self.__contract_handle, self.__user_addr, fname, args, should_encrypt, wei_amount=wei_amount)
+        if self.submit_async:
+            receipt = self.__transact_async(fname, args, should_encrypt, wei_amount)
+            mirror = self.state_mirror
+            if mirror is not None:
+                receipt.add_done_callback(lambda _: mirror.invalidate())
+            return receipt
+        try:
+            return self.__conn.transact(self.__contract_handle, self.__user_addr, fname, args, should_encrypt, wei_amount=wei_amount)
+        finally:
+            if self.state_mirror is not None:
+                self.state_mirror.invalidate()
+
+    def __transact_async(self, fname: str, args: List, should_encrypt: List[bool], wei_amount: Optional[int]) -> Future:
+        if not args or not isinstance(args[-1], Future):
+            return self.__conn.transact_async(self.__contract_handle, self.__user_addr, fname, args, should_encrypt, wei_amount=wei_amount)
+
+        # The proof (last argument) is still being generated, submit the transaction once it is available
+        contract_handle, user_addr, proof = self.__contract_handle, self.__user_addr, args[-1]
+        receipt = Future()
+
+        def submit(_):
+            try:
+                tx = self.__conn.transact_async(contract_handle, user_addr, fname, args[:-1] + [proof.result()], should_encrypt, wei_amount=wei_amount)
+            except Exception as e:
+                receipt.set_exception(e)
+            else:
+                tx.add_done_callback(lambda f: receipt.set_result(f.result()) if f.exception() is None else receipt.set_exception(f.exception()))
+        proof.add_done_callback(submit)
+        return receipt
 
     def call(self, fname: str, args: List, ret_val_constructors: List[Tuple[bool, str, Callable]]):
         retvals = self.__conn.call(self.__contract_handle, self.__user_addr, fname, *args)
@@ -450,9 +613,15 @@ class ApiWrapper:
         if count == 0:
             val = self.__conn.req_state_var(self.__contract_handle, name, *indices)
         else:
-            val = [self.__conn.req_state_var(self.__contract_handle, name, *indices, i) for i in range(count)]
+            # Request all cipher elements at once
+            val = self.__conn.req_state_vars(self.__contract_handle, [(name, (*indices, i)) for i in range(count)])
         return val
 
+    def _req_state_vars(self, requests: List[Tuple[str, Tuple]]) -> List[Any]:
+        if self.__contract_handle is None:
+            raise ValueError(f'Cannot read state variables within constructor before they are assigned a value.')
+        return self.__conn.req_state_vars(self.__contract_handle, requests)
+
     @staticmethod
     def __serialize_val(val: Any, bitwidth: int):
         if isinstance(val, AddressValue):
@@ -489,7 +658,10 @@ class ApiWrapper:
     def serialize_private_inputs(self, zk_priv: dict, priv_elem_bitwidths: List[int]):
         self.__serialize_circuit_array(zk_priv, self.all_priv_values, self.current_all_index, priv_elem_bitwidths)
 
-    def gen_proof(self, fname: str, in_vals: List, out_vals: List[Union[int, CipherValue]]) -> List[int]:
+    def gen_proof(self, fname: str, in_vals: List, out_vals: List[Union[int, CipherValue]]) -> Union[List[int], Future]:
+        if self.submit_async:
+            # Hand proof generation off to the prover pool, the transaction is submitted once the proof is available
+            return self.__prover.generate_proof_async(self.__project_dir, self.__contract_name, fname, self.all_priv_values, in_vals, out_vals)
         return self.__prover.generate_proof(self.__project_dir, self.__contract_name, fname, self.all_priv_values, in_vals, out_vals)
 
     @contextmanager
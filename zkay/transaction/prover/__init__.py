@@ -5,6 +5,8 @@ This package contains the proof-generation backends.
 Submodules
 ==========
 * :py:mod:`.jsnark`: Proof generation using zkay jsnark/libsnark interface
+* :py:mod:`.pool`: Bounded pool which generates multiple proofs concurrently
 """
 
 from .jsnark import JsnarkProver
+from .pool import ProverPool
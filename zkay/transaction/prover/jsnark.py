@@ -6,7 +6,7 @@ from typing import List
 import zkay.jsnark_interface.jsnark_interface as jsnark
 import zkay.jsnark_interface.libsnark_interface as libsnark
 from zkay.transaction.interface import ZkayProverInterface, ProofGenerationError
-from zkay.utils.helpers import hash_file
+from zkay.utils.helpers import hash_file_cached
 from zkay.utils.timer import time_measure
 
 
@@ -31,5 +31,8 @@ class JsnarkProver(ZkayProverInterface):
         proof = list(map(lambda x: int(x, 0), proof_lines))
         return proof
 
+    def _estimate_proof_memory(self, verifier_dir: str) -> int:
+        return libsnark.estimate_proofgen_memory(verifier_dir)
+
     def get_prover_key_hash(self, verifier_directory: str) -> bytes:
-        return hash_file(os.path.join(verifier_directory, 'proving.key'))
+        return hash_file_cached(os.path.join(verifier_directory, 'proving.key'))
@@ -0,0 +1,88 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from zkay.config import cfg, zk_print
+from zkay.utils.helpers import get_available_memory
+
+
+def get_prover_memory_limit() -> Optional[int]:
+    """Return the memory ceiling (in bytes) for concurrently running proof generations, None if it cannot be determined."""
+    if cfg.prover_memory_limit_mb > 0:
+        return cfg.prover_memory_limit_mb * 1024 * 1024
+    return get_available_memory()
+
+
+class ProverPool:
+    """
+    Generates proofs for arbitrary verifier directories on a bounded pool of workers.
+
+    Proof generation runs in separate processes (jsnark and libsnark), so the workers are threads which wait for them.
+    At most cfg.prover_pool_size (0 = number of cores) proofs are generated at once. A job is only started if the
+    estimated peak memory usage of all running jobs stays below cfg.prover_memory_limit_mb, a job which exceeds the
+    limit on its own runs alone. Jobs are started in submission order.
+    """
+
+    def __init__(self, prover):
+        """
+        Create a new pool.
+
+        :param prover: ZkayProverInterface instance which generates the proofs
+        """
+        self._prover = prover
+        self._num_workers = cfg.prover_pool_size if cfg.prover_pool_size > 0 else os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self._num_workers, thread_name_prefix='zkay-prover')
+        self._mem_limit = get_prover_memory_limit()
+        self._mem = 0
+        self._running = 0
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._admitted = 0
+
+    @property
+    def num_workers(self) -> int:
+        return self._num_workers
+
+    def submit(self, verifier_dir: str, priv_values: List[int], in_vals: List[int], out_vals: List[int]) -> Future:
+        """
+        Schedule the generation of a proof for the circuit in verifier_dir.
+
+        :param verifier_dir: absolute path of the circuit output directory of the verification contract
+        :param priv_values: serialized private circuit inputs
+        :param in_vals: serialized public circuit inputs
+        :param out_vals: serialized public circuit outputs
+        :return: future which resolves to the proof (or raises ProofGenerationError)
+        """
+        mem = self._prover._estimate_proof_memory(verifier_dir)
+        if self._mem_limit is not None:
+            mem = min(mem, self._mem_limit)
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+        return self._executor.submit(self._run, ticket, mem, verifier_dir, priv_values, in_vals, out_vals)
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting new jobs, if wait is true, block until all scheduled jobs finished."""
+        self._executor.shutdown(wait=wait)
+
+    def _can_start(self, ticket: int, mem: int) -> bool:
+        if ticket != self._admitted:
+            return False
+        return self._running == 0 or self._mem_limit is None or self._mem + mem <= self._mem_limit
+
+    def _run(self, ticket: int, mem: int, verifier_dir: str, priv_values: List[int], in_vals: List[int], out_vals: List[int]) -> List[int]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._can_start(ticket, mem))
+            self._admitted += 1
+            self._mem += mem
+            self._running += 1
+            self._cond.notify_all()
+        try:
+            zk_print(f'Generating proof in {os.path.basename(verifier_dir)} [{self._running}/{self._num_workers} running]', verbosity_level=2)
+            return self._prover._generate_proof(verifier_dir, priv_values, in_vals, out_vals)
+        finally:
+            with self._cond:
+                self._mem -= mem
+                self._running -= 1
+                self._cond.notify_all()
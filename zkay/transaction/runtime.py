@@ -61,6 +61,8 @@ class Runtime:
         Runtime.__blockchain = None
         Runtime.__crypto = {}
         Runtime.__keystore = {}
+        if Runtime.__prover is not None:
+            Runtime.__prover.shutdown_pool(wait=False)
         Runtime.__prover = None
 
     @staticmethod
@@ -90,7 +92,7 @@ class Runtime:
 
     @staticmethod
     def prover() -> ZkayProverInterface:
-        """Return singleton object which implements ZkayProverInterface."""
+        """Return singleton object which implements ZkayProverInterface (proofs can be generated concurrently via its pool)."""
         if Runtime.__prover is None:
             Runtime.__prover = _prover_classes[cfg.snark_backend]()
         return Runtime.__prover
@@ -1,7 +1,7 @@
 import os
 import re
 import hashlib
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 from zkay.compiler.solidity.fake_solidity_generator import WS_PATTERN, ID_PATTERN
 
 
@@ -40,6 +40,49 @@ def hash_file(filename: str, chunk_size: int = 1 << 27) -> bytes:
     return digest[:32]
 
 
+_file_digests: Dict[str, Tuple[int, int, bytes]] = {}
+"""Maps absolute file paths to the size, modification time and digest of the file when it was last hashed"""
+
+
+def hash_file_cached(filename: str) -> bytes:
+    """
+    Return hash_file(filename), reusing the digest computed by a previous call if the file was not modified in the meantime.
+
+    Files are considered unmodified if their size and modification time did not change.
+    """
+    st = os.stat(filename)
+    path = os.path.abspath(filename)
+    entry = _file_digests.get(path)
+    if entry is None or entry[:2] != (st.st_size, st.st_mtime_ns):
+        entry = (st.st_size, st.st_mtime_ns, hash_file(filename))
+        _file_digests[path] = entry
+    return entry[2]
+
+
+def get_available_memory(meminfo_file: str = '/proc/meminfo') -> Optional[int]:
+    """
+    Return the currently available physical memory (in bytes), half of the physical memory if unknown, None if neither can be determined.
+
+    On linux, this is MemAvailable from meminfo_file, which contrary to the free memory includes reclaimable caches.
+    """
+    try:
+        with open(meminfo_file) as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        # Available memory cannot be determined on this platform, fall back to half of the physical memory
+        try:
+            return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // 2
+        except (ValueError, OSError, AttributeError):
+            return None
+
+
 def without_extension(filename: str) -> str:
     ext_idx = filename.rfind('.')
     ext_idx = len(filename) if ext_idx == -1 else ext_idx
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Set, Dict, Optional, Generic, TypeVar
+from typing import Set, Dict, Optional, Generic, TypeVar, Tuple
 
 T = TypeVar('T')
 
@@ -11,18 +11,46 @@ class PartitionState(Generic[T]):
     * insert: create a new partition with a single element
     * merge: merge partitions
     * ...
+
+    Every element is indexed by the key of its partition, so lookups take constant time.
+    Copies share the partitions (and the index) with the original until they are modified (copy-on-write),
+    since the alias analysis copies the whole state for almost every statement but only changes a few partitions.
     """
 
     def __init__(self):
         self._partitions: Dict[int, Set[T]] = {}
+        self._index: Dict[T, int] = {}
         self._next_unused = 0
 
+        # True if _partitions and _index may be shared with other states
+        self._shared = False
+        # Keys of the partitions which are not shared with other states
+        self._owned: Set[int] = set()
+
+    def _make_writable(self):
+        if self._shared:
+            self._partitions = dict(self._partitions)
+            self._index = dict(self._index)
+            self._shared = False
+
+    def _writable_partition(self, key: int) -> Set[T]:
+        self._make_writable()
+        if key not in self._owned:
+            self._partitions[key] = set(self._partitions[key])
+            self._owned.add(key)
+        return self._partitions[key]
+
     def insert(self, x):
         p = {x}
         self._insert_partition(p)
 
     def _insert_partition(self, p):
-        self._partitions[self._next_unused] = p
+        self._make_writable()
+        key = self._next_unused
+        self._partitions[key] = p
+        self._owned.add(key)
+        for x in p:
+            self._index[x] = key
         self._next_unused += 1
 
     def get_index(self, x: T) -> Optional[int]:
@@ -32,13 +60,10 @@ class PartitionState(Generic[T]):
         :param x:
         :return: the index of the partition containing x
         """
-        for k, p in self._partitions.items():
-            if x in p:
-                return k
-        return None
+        return self._index.get(x)
 
     def has(self, x: T) -> bool:
-        return self.get_index(x) is not None
+        return x in self._index
 
     def same_partition(self, x: T, y: T) -> bool:
         if x == y:
@@ -64,11 +89,19 @@ class PartitionState(Generic[T]):
             # merging not necessary
             return
 
+        # move the elements of the smaller partition to the larger one
+        if len(self._partitions[xp_key]) < len(self._partitions[yp_key]):
+            xp_key, yp_key = yp_key, xp_key
+
         # remove y
+        self._make_writable()
         yp = self._partitions.pop(yp_key)
+        self._owned.discard(yp_key)
 
         # insert y
-        self._partitions[xp_key].update(yp)
+        self._writable_partition(xp_key).update(yp)
+        for e in yp:
+            self._index[e] = xp_key
 
     def remove(self, x: T):
         """
@@ -83,11 +116,14 @@ class PartitionState(Generic[T]):
         assert xp_key is not None, f'element {x} not found'
 
         # remove x
-        self._partitions[xp_key].remove(x)
+        xp = self._writable_partition(xp_key)
+        xp.remove(x)
+        del self._index[x]
 
         # potentially remove whole partition
-        if len(self._partitions[xp_key]) == 0:
+        if len(xp) == 0:
             del self._partitions[xp_key]
+            self._owned.discard(xp_key)
 
     def move_to(self, x: T, y: T):
         """
@@ -107,7 +143,8 @@ class PartitionState(Generic[T]):
         yp_key = self.get_index(y)
 
         # insert x
-        self._partitions[yp_key].add(x)
+        self._writable_partition(yp_key).add(x)
+        self._index[x] = yp_key
 
     def move_to_separate(self, x: T):
         """
@@ -148,21 +185,15 @@ class PartitionState(Generic[T]):
         s = PartitionState()
 
         # Collect all values
-        my_vals = frozenset([item for subset in self._partitions.values() for item in subset])
-        other_vals = frozenset([item for subset in other._partitions.values() for item in subset])
-        assert not my_vals.symmetric_difference(other_vals), 'joined branches do not contain the same values'
-        values_in_both = my_vals.intersection(other_vals)
-
-        new_parts = set()
-        for val in values_in_both:
-            my_part = self._partitions[self.get_index(val)]
-            other_part = other._partitions[other.get_index(val)]
+        assert not self._index.keys() ^ other._index.keys(), 'joined branches do not contain the same values'
 
-            shared_elems = my_part.intersection(other_part)
-            new_parts.add(frozenset(shared_elems))
+        # Two values share a partition in the joined state iff they share a partition in both states
+        new_parts: Dict[Tuple[int, int], Set[T]] = {}
+        for val, my_key in self._index.items():
+            new_parts.setdefault((my_key, other._index[val]), set()).add(val)
 
-        for part in new_parts:
-            s._insert_partition(set(part))
+        for part in new_parts.values():
+            s._insert_partition(part)
         return s
 
     def copy(self, project=None) -> PartitionState[T]:
@@ -174,11 +205,20 @@ class PartitionState(Generic[T]):
         """
         c = PartitionState()
         c._next_unused = self._next_unused
-        for k, p in self._partitions.items():
-            # shallow copy
-            kept = {x for x in p if project is None or x in project}
-            if len(kept) > 0:
-                c._partitions[k] = kept
+        if project is None:
+            # share everything until modified
+            c._partitions, c._index = self._partitions, self._index
+            c._shared = self._shared = True
+            self._owned = set()
+        else:
+            for k, p in self._partitions.items():
+                # shallow copy
+                kept = {x for x in p if x in project}
+                if len(kept) > 0:
+                    c._partitions[k] = kept
+                    c._owned.add(k)
+                    for x in kept:
+                        c._index[x] = k
         return c
 
     def __str__(self):
@@ -5,11 +5,12 @@ import math
 import operator
 import textwrap
 from collections import OrderedDict
+from copy import deepcopy
 from dataclasses import dataclass
 from enum import IntEnum
 from functools import cmp_to_key, reduce
 from os import linesep
-from typing import List, Dict, Union, Optional, Callable, Set, TypeVar
+from typing import List, Dict, Union, Optional, Callable, Set, TypeVar, Tuple
 
 from zkay.config import cfg, zk_print
 from zkay.transaction.crypto.params import CryptoParams
@@ -21,16 +22,6 @@ from zkay.zkay_ast.visitor.visitor import AstVisitor
 T = TypeVar('T')
 
 
-class ChildListBuilder:
-    def __init__(self):
-        self.children = []
-
-    def add_child(self, ast: AST) -> AST:
-        if ast is not None:
-            self.children.append(ast)
-        return ast
-
-
 class AST:
     def __init__(self):
         # set later by parent setter
@@ -50,10 +41,19 @@ class AST:
         self.modified_values: OrderedDict[InstanceTarget, None] = OrderedDict()
         self.read_values: Set[InstanceTarget] = set()
 
+    # Names of the fields which contain the children of this node (an AST, None or a list of ASTs),
+    # must match the children (and order) which process_children visits
+    _child_fields: Tuple[str, ...] = ()
+
     def children(self) -> List[AST]:
-        cb = ChildListBuilder()
-        self.process_children(cb.add_child)
-        return cb.children
+        children = []
+        for name in self._child_fields:
+            c = getattr(self, name)
+            if c.__class__ is list:
+                children += c
+            elif c is not None:
+                children.append(c)
+        return children
 
     def is_parent_of(self, child: AST) -> bool:
         e = child
@@ -71,6 +71,15 @@ class AST:
     def process_children(self, f: Callable[[T], T]):
         pass
 
+    def __deepcopy__(self, memo):
+        """
+        Structurally copy the AST below (and reachable from) this node, including all annotations.
+
+        References between copied nodes (parents, targets, analysis states, ...) are remapped, immutable values are shared.
+        This is much faster than the generic copy.deepcopy implementation.
+        """
+        return _structural_copy(self, memo)
+
     def code(self) -> str:
         v = CodeVisitor()
         s = v.visit(self)
@@ -500,6 +509,8 @@ class FunctionCallExpr(Expression):
     def is_cast(self):
         return isinstance(self.func, LocationExpr) and isinstance(self.func.target, (ContractDefinition, EnumDefinition))
 
+    _child_fields = ('func', 'args')
+
     def process_children(self, f: Callable[[T], T]):
         self.func = f(self.func)
         self.args[:] = map(f, self.args)
@@ -511,6 +522,8 @@ class NewExpr(FunctionCallExpr):
         super().__init__(Identifier(f'new {annotated_type.code()}'), args)
         self.annotated_type = annotated_type
 
+    _child_fields = ('annotated_type', 'args')
+
     def process_children(self, f: Callable[[T], T]):
         self.annotated_type = f(self.annotated_type)
         self.args[:] = map(f, self.args)
@@ -523,6 +536,8 @@ class PrimitiveCastExpr(Expression):
         self.expr = expr
         self.is_implicit = is_implicit
 
+    _child_fields = ('elem_type', 'expr')
+
     def process_children(self, f: Callable[[T], T]):
         self.elem_type = f(self.elem_type)
         self.expr = f(self.expr)
@@ -562,6 +577,8 @@ class ArrayLiteralExpr(LiteralExpr):
         super().__init__()
         self.values = values
 
+    _child_fields = ('values',)
+
     def process_children(self, f: Callable[[T], T]):
         self.values[:] = map(f, self.values)
 
@@ -594,6 +611,8 @@ class TupleExpr(TupleOrLocationExpr):
         super().__init__()
         self.elements = elements
 
+    _child_fields = ('elements',)
+
     def process_children(self, f: Callable[[T], T]):
         self.elements[:] = map(f, self.elements)
 
@@ -638,6 +657,8 @@ class IdentifierExpr(LocationExpr):
     def get_annotated_type(self):
         return self.target.annotated_type
 
+    _child_fields = ('idf',)
+
     def process_children(self, f: Callable[[T], T]):
         self.idf = f(self.idf)
 
@@ -657,6 +678,8 @@ class MemberAccessExpr(LocationExpr):
         self.expr = expr
         self.member = member
 
+    _child_fields = ('expr', 'member')
+
     def process_children(self, f: Callable[[T], T]):
         self.expr = f(self.expr)
         self.member = f(self.member)
@@ -669,6 +692,8 @@ class IndexExpr(LocationExpr):
         self.arr = arr
         self.key = key
 
+    _child_fields = ('arr', 'key')
+
     def process_children(self, f: Callable[[T], T]):
         self.arr = f(self.arr)
         self.key = f(self.key)
@@ -725,6 +750,8 @@ class ReclassifyExpr(Expression):
         self.privacy = privacy
         self.homomorphism = homomorphism
 
+    _child_fields = ('expr', 'privacy')
+
     def process_children(self, f: Callable[[T], T]):
         self.expr = f(self.expr)
         self.privacy = f(self.privacy)
@@ -869,6 +896,8 @@ class IfStatement(Statement):
         self.then_branch = then_branch
         self.else_branch = else_branch
 
+    _child_fields = ('condition', 'then_branch', 'else_branch')
+
     def process_children(self, f: Callable[[T], T]):
         self.condition = f(self.condition)
         self.then_branch = f(self.then_branch)
@@ -881,6 +910,8 @@ class WhileStatement(Statement):
         self.condition = condition
         self.body = body
 
+    _child_fields = ('condition', 'body')
+
     def process_children(self, f: Callable[[T], T]):
         self.condition = f(self.condition)
         self.body = f(self.body)
@@ -892,6 +923,8 @@ class DoWhileStatement(Statement):
         self.body = body
         self.condition = condition
 
+    _child_fields = ('body', 'condition')
+
     def process_children(self, f: Callable[[T], T]):
         self.body = f(self.body)
         self.condition = f(self.condition)
@@ -905,6 +938,8 @@ class ForStatement(Statement):
         self.update = update
         self.body = body
 
+    _child_fields = ('init', 'condition', 'update', 'body')
+
     def process_children(self, f: Callable[[T], T]):
         self.init = f(self.init)
         self.condition = f(self.condition)
@@ -930,6 +965,8 @@ class ReturnStatement(Statement):
         super().__init__()
         self.expr = expr
 
+    _child_fields = ('expr',)
+
     def process_children(self, f: Callable[[T], T]):
         self.expr = f(self.expr)
 
@@ -944,6 +981,8 @@ class ExpressionStatement(SimpleStatement):
         super().__init__()
         self.expr = expr
 
+    _child_fields = ('expr',)
+
     def process_children(self, f: Callable[[T], T]):
         self.expr = f(self.expr)
 
@@ -955,6 +994,8 @@ class RequireStatement(SimpleStatement):
         self.condition = condition
         self.unmodified_code = self.code() if unmodified_code is None else unmodified_code
 
+    _child_fields = ('condition',)
+
     def process_children(self, f: Callable[[T], T]):
         self.condition = f(self.condition)
 
@@ -967,6 +1008,8 @@ class AssignmentStatement(SimpleStatement):
         self.rhs = rhs
         self.op = '' if op is None else op
 
+    _child_fields = ('lhs', 'rhs')
+
     def process_children(self, f: Callable[[T], T]):
         self.lhs = f(self.lhs)
         self.rhs = f(self.rhs)
@@ -982,9 +1025,14 @@ class StatementList(Statement):
         self.statements = statements
         self.excluded_from_simulation = excluded_from_simulation
 
+        # Maps id(statement) to its index in statements, rebuilt by index_of when outdated
+        self._statement_positions: Dict[int, int] = {}
+
         # Special case, if processing a statement returns a list of statements,
         # all statements will be integrated into this block
 
+    _child_fields = ('statements',)
+
     def process_children(self, f: Callable[[T], T]):
         new_stmts = []
         for idx, stmt in enumerate(self.statements):
@@ -999,6 +1047,24 @@ class StatementList(Statement):
     def __getitem__(self, key: int) -> Statement:
         return self.statements[key]
 
+    def index_of(self, stmt: Statement) -> int:
+        """
+        Return the index of stmt in statements.
+
+        Takes constant time unless statements was modified since the last call.
+
+        :raise ValueError: if stmt is not in statements
+        """
+        idx = self._statement_positions.get(id(stmt))
+        if idx is None or idx >= len(self.statements) or self.statements[idx] is not stmt:
+            self._statement_positions = {}
+            for i, s in enumerate(self.statements):
+                self._statement_positions.setdefault(id(s), i)
+            idx = self._statement_positions.get(id(stmt))
+            if idx is None:
+                raise ValueError(f'{stmt} is not in list')
+        return idx
+
     def __contains__(self, stmt: Statement):
         if stmt in self.statements:
             return True
@@ -1390,12 +1456,19 @@ class Mapping(TypeName):
         # set by type checker: instantiation of the key by IndexExpr
         self.instantiated_key: Optional[Expression] = None
 
+    _child_fields = ('key_type', 'key_label', 'value_type')
+
     def process_children(self, f: Callable[[T], T]):
         self.key_type = f(self.key_type)
         if isinstance(self.key_label, Identifier):
             self.key_label = f(self.key_label)
         self.value_type = f(self.value_type)
 
+    def children(self) -> List[AST]:
+        if isinstance(self.key_label, Identifier):
+            return [self.key_type, self.key_label, self.value_type]
+        return [self.key_type, self.value_type]
+
     def clone(self) -> Mapping:
         from zkay.zkay_ast.visitor.deep_copy import deep_copy
         return deep_copy(self)
@@ -1418,6 +1491,8 @@ class Array(TypeName):
         self.value_type = value_type
         self.expr = NumberLiteralExpr(expr) if isinstance(expr, int) else expr
 
+    _child_fields = ('value_type', 'expr')
+
     def process_children(self, f: Callable[[T], T]):
         self.value_type = f(self.value_type)
         self.expr = f(self.expr)
@@ -1590,6 +1665,8 @@ class FunctionTypeName(TypeName):
         self.modifiers = modifiers
         self.return_parameters = return_parameters
 
+    _child_fields = ('parameters', 'return_parameters')
+
     def process_children(self, f: Callable[[T], T]):
         self.parameters[:] = map(f, self.parameters)
         self.return_parameters[:] = map(f, self.return_parameters)
@@ -1618,6 +1695,8 @@ class AnnotatedTypeName(AST):
         if self.privacy_annotation == AllExpr() and homomorphism != Homomorphism.NON_HOMOMORPHIC:
             raise ValueError(f'Public type name cannot be homomorphic (got {homomorphism.type_annotation})')
 
+    _child_fields = ('type_name', 'privacy_annotation')
+
     def process_children(self, f: Callable[[T], T]):
         self.type_name = f(self.type_name)
         self.privacy_annotation = f(self.privacy_annotation)
@@ -1740,6 +1819,8 @@ class IdentifierDeclaration(AST):
     def is_constant(self) -> bool:
         return 'constant' in self.keywords
 
+    _child_fields = ('annotated_type', 'idf')
+
     def process_children(self, f: Callable[[T], T]):
         self.annotated_type = f(self.annotated_type)
         self.idf = f(self.idf)
@@ -1763,6 +1844,8 @@ class VariableDeclarationStatement(SimpleStatement):
         self.variable_declaration = variable_declaration
         self.expr = expr
 
+    _child_fields = ('variable_declaration', 'expr')
+
     def process_children(self, f: Callable[[T], T]):
         self.variable_declaration = f(self.variable_declaration)
         self.expr = f(self.expr)
@@ -1792,6 +1875,8 @@ class NamespaceDefinition(AST):
         super().__init__()
         self.idf = idf
 
+    _child_fields = ('idf',)
+
     def process_children(self, f: Callable[[T], T]):
         oldidf = self.idf
         self.idf = f(self.idf)
@@ -1878,6 +1963,8 @@ class ConstructorOrFunctionDefinition(NamespaceDefinition):
     def _update_fct_type(self):
         self.annotated_type = AnnotatedTypeName(FunctionTypeName(self.parameters, self.modifiers, self.return_parameters))
 
+    _child_fields = NamespaceDefinition._child_fields + ('parameters', 'return_parameters', 'body')
+
     def process_children(self, f: Callable[[T], T]):
         super().process_children(f)
         self.parameters[:] = map(f, self.parameters)
@@ -1898,6 +1985,8 @@ class StateVariableDeclaration(IdentifierDeclaration):
         super().__init__(keywords, annotated_type, idf)
         self.expr = expr
 
+    _child_fields = IdentifierDeclaration._child_fields + ('expr',)
+
     def process_children(self, f: Callable[[T], T]):
         super().process_children(f)
         self.expr = f(self.expr)
@@ -1909,6 +1998,8 @@ class EnumValue(AST):
         self.idf = idf
         self.annotated_type: Optional[AnnotatedTypeName] = None
 
+    _child_fields = ('idf',)
+
     def process_children(self, f: Callable[[T], T]):
         self.idf = f(self.idf)
 
@@ -1920,6 +2011,8 @@ class EnumDefinition(NamespaceDefinition):
 
         self.annotated_type: Optional[AnnotatedTypeName] = None
 
+    _child_fields = NamespaceDefinition._child_fields + ('values',)
+
     def process_children(self, f: Callable[[T], T]):
         super().process_children(f)
         self.values[:] = map(f, self.values)
@@ -1930,6 +2023,8 @@ class StructDefinition(NamespaceDefinition):
         super().__init__(idf)
         self.members = members
 
+    _child_fields = NamespaceDefinition._child_fields + ('members',)
+
     def process_children(self, f: Callable[[T], T]):
         super().process_children(f)
         self.members[:] = map(f, self.members)
@@ -1953,6 +2048,8 @@ class ContractDefinition(NamespaceDefinition):
         self.struct_definitions = [] if struct_definitions is None else struct_definitions
         self.used_crypto_backends: Optional[List[CryptoParams]] = None
 
+    _child_fields = NamespaceDefinition._child_fields + ('enum_definitions', 'struct_definitions', 'state_variable_declarations', 'constructor_definitions', 'function_definitions')
+
     def process_children(self, f: Callable[[T], T]):
         super().process_children(f)
         self.enum_definitions[:] = map(f, self.enum_definitions)
@@ -1989,6 +2086,8 @@ class SourceUnit(AST):
 
         self.original_code: List[str] = []
 
+    _child_fields = ('contracts',)
+
     def process_children(self, f: Callable[[T], T]):
         self.contracts[:] = map(f, self.contracts)
 
@@ -2064,6 +2163,71 @@ class InstanceTarget(tuple):
         return SymbolTableLinker.in_scope_at(self.target.idf, ast)
 
 
+# STRUCTURAL COPY
+
+_immutable_types = {str, int, float, bool, bytes, type(None), type, CryptoParams, Homomorphism}
+
+
+def _copy_object(obj, memo):
+    cpy = object.__new__(obj.__class__)
+    memo[id(obj)] = cpy
+    d = cpy.__dict__
+    for k, v in obj.__dict__.items():
+        d[k] = v if v.__class__ in _immutable_types else _structural_copy(v, memo)
+    return cpy
+
+
+def _copy_list(lst: list, memo):
+    cpy = []
+    memo[id(lst)] = cpy
+    cpy += [_structural_copy(v, memo) for v in lst]
+    return cpy
+
+
+def _copy_dict(dct: dict, memo):
+    cpy = dct.__class__()
+    memo[id(dct)] = cpy
+    for k, v in dct.items():
+        cpy[_structural_copy(k, memo)] = _structural_copy(v, memo)
+    return cpy
+
+
+def _copy_set(st: set, memo):
+    cpy = set()
+    memo[id(st)] = cpy
+    cpy.update([_structural_copy(v, memo) for v in st])
+    return cpy
+
+
+_structural_copiers = {
+    list: _copy_list,
+    dict: _copy_dict,
+    OrderedDict: _copy_dict,
+    set: _copy_set,
+    tuple: lambda t, memo: tuple([_structural_copy(v, memo) for v in t]),
+    InstanceTarget: lambda t, memo: InstanceTarget(tuple([_structural_copy(v, memo) for v in t])),
+    PartitionState: _copy_object,
+}
+
+
+def _structural_copy(val, memo):
+    """Deep copy val, memo has the same format as for copy.deepcopy."""
+    cls = val.__class__
+    if cls in _immutable_types:
+        return val
+    cpy = memo.get(id(val), memo)
+    if cpy is not memo:
+        return cpy
+
+    copier = _structural_copiers.get(cls)
+    if copier is not None:
+        return copier(val, memo)
+    elif isinstance(val, AST):
+        return _copy_object(val, memo)
+    else:
+        return deepcopy(val, memo)
+
+
 # UTIL FUNCTIONS
 
 
@@ -141,6 +141,12 @@ class SymbolTableLinker(AstVisitor):
                 assert isinstance(ast2, (ForStatement, StatementList))
                 return ast2, ancs[ast2], old_ast
 
+    @staticmethod
+    def _statement_index(lca: Union[ForStatement, StatementList], stmt: AST) -> int:
+        if isinstance(lca, StatementList):
+            return lca.index_of(stmt)
+        return lca.statements.index(stmt)
+
     @staticmethod
     def find_type_declaration(t: UserDefinedTypeName) -> NamespaceDefinition:
         return SymbolTableLinker._find_next_decl(t, t.names[0].name)[1]
@@ -153,7 +159,7 @@ class SymbolTableLinker(AstVisitor):
             if isinstance(anc, (ForStatement, Block)) and isinstance(decl, VariableDeclaration):
                 # Check if identifier really references this declaration (does not come before declaration)
                 lca, ref_anchor, decl_anchor = SymbolTableLinker._find_lca(ast, decl, anc)
-                if lca.statements.index(ref_anchor) <= lca.statements.index(decl_anchor):
+                if SymbolTableLinker._statement_index(lca, ref_anchor) <= SymbolTableLinker._statement_index(lca, decl_anchor):
                     ast = anc
                     continue
             return decl
@@ -95,6 +95,7 @@ class DeepCopyVisitor(AstVisitor):
 
         'pre_statements',
         'excluded_from_simulation',
+        '_statement_positions',
 
         # For array children (ciphertext, key etc.)
         'expr',
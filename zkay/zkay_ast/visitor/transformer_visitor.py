@@ -1,4 +1,4 @@
-from typing import List, TypeVar
+from typing import Dict, List, TypeVar
 
 from zkay.zkay_ast.ast import AST
 
@@ -13,6 +13,13 @@ class AstTransformerVisitor:
     (Corresponds to node-or-children traversal order from AstVisitor)
     """
 
+    # Name of the visit function for each visited AST node class, per visitor class
+    _visit_function_names: Dict[type, str] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._visit_function_names = {}
+
     def __init__(self, log=False):
         self.log = log
 
@@ -35,12 +42,19 @@ class AstTransformerVisitor:
         return self.get_visit_function(ast.__class__)(ast)
 
     def get_visit_function(self, c):
+        try:
+            name = self._visit_function_names[c]
+        except KeyError:
+            name = self._visit_function_names[c] = self._find_visit_function_name(c)
+        return getattr(self, name)
+
+    def _find_visit_function_name(self, c):
         visitor_function = 'visit' + c.__name__
-        if hasattr(self, visitor_function):
-            return getattr(self, visitor_function)
+        if hasattr(self.__class__, visitor_function):
+            return visitor_function
         else:
             for base in c.__bases__:
-                f = self.get_visit_function(base)
+                f = self._find_visit_function_name(base)
                 if f:
                     return f
         assert False
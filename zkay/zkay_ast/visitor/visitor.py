@@ -1,4 +1,13 @@
+from typing import Dict, Optional
+
+
 class AstVisitor:
+    # Name of the visit function for each visited AST node class (None if there is none), per visitor class
+    _visit_function_names: Dict[type, Optional[str]] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._visit_function_names = {}
 
     def __init__(self, traversal='post', log=False):
         self.traversal = traversal
@@ -30,12 +39,19 @@ class AstVisitor:
             return None
 
     def get_visit_function(self, c):
+        try:
+            name = self._visit_function_names[c]
+        except KeyError:
+            name = self._visit_function_names[c] = self._find_visit_function_name(c)
+        return None if name is None else getattr(self, name)
+
+    def _find_visit_function_name(self, c) -> Optional[str]:
         visitor_function = 'visit' + c.__name__
-        if hasattr(self, visitor_function):
-            return getattr(self, visitor_function)
+        if hasattr(self.__class__, visitor_function):
+            return visitor_function
         else:
             for base in c.__bases__:
-                f = self.get_visit_function(base)
+                f = self._find_visit_function_name(base)
                 if f:
                     return f
         return None
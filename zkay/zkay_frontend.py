@@ -24,7 +24,7 @@ from zkay.compiler.privacy.proving_scheme.backends.gm17 import ProvingSchemeGm17
 from zkay.compiler.privacy.proving_scheme.backends.groth16 import ProvingSchemeGroth16
 from zkay.compiler.privacy.proving_scheme.proving_scheme import ProvingScheme
 from zkay.compiler.privacy.transformation.zkay_contract_transformer import transform_ast
-from zkay.compiler.solidity.compiler import check_compilation
+from zkay.compiler.solidity.compiler import check_compilation, get_static_gas_estimates
 from zkay.config import cfg
 from zkay.utils.helpers import read_file, lines_of_code, without_extension
 from zkay.utils.progress_printer import print_step
@@ -162,6 +162,12 @@ def compile_zkay(code: str, output_dir: str, import_keys: bool = False, **kwargs
     for f in main_solidity_files:
         check_compilation(f, show_errors=False)
 
+    # Static gas estimates for the functions which do not verify proofs (verification gas is not part of solc's estimate)
+    if cfg.blockchain_gas_estimate_cache:
+        with print_step('Write static gas estimates'):
+            estimates = get_static_gas_estimates(os.path.join(output_dir, output_filename), [c.fct.name for c in cg.circuits_to_prove])
+            _dump_to_output(json.dumps(estimates), output_dir, 'gas_estimates.json')
+
     return cg, solidity_code_output
 
 